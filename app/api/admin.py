@@ -0,0 +1,122 @@
+"""Admin routes for model versions (deploy, activate, unload) and the remedies knowledge base."""
+
+import asyncio
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from ..config import settings
+from ..models.schemas import ModelDeployRequest
+from ..services.cascade import build_cascade_loader
+from ..services.ml_service import ModelLoader
+from ..services.model_registry import get_model_registry
+from ..services.remedy_service import get_knowledge_base, reload_remedies
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Check X-Admin-Token against ADMIN_TOKEN; without ADMIN_TOKEN the admin API is disabled."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/models")
+async def list_models() -> dict:
+    """List registered models with per-version status and counters."""
+    return get_model_registry().stats()
+
+
+@router.post("/models/{name}/versions", status_code=status.HTTP_202_ACCEPTED)
+async def deploy_model_version(name: str, request: ModelDeployRequest) -> dict:
+    """
+    Load and warm a new version in the background.
+
+    With activate=true, traffic switches to it once it is ready and the
+    previous version is unloaded after its in-flight requests finish.
+    """
+    for backend in (request.backend, request.fast_backend):
+        if backend is not None and backend not in ("mock", "pipeline", "onnx"):
+            raise HTTPException(status_code=400, detail=f"Unknown backend: {backend}")
+
+    full_options = {"backend": request.backend, "model_id": request.model_id, "model_dir": request.model_dir}
+    if request.fast_backend is not None:
+        try:
+            loader = build_cascade_loader(
+                full_options,
+                {"backend": request.fast_backend, "model_id": request.fast_model_id, "model_dir": request.fast_model_dir},
+                threshold=request.cascade_threshold,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        loader = ModelLoader(**full_options)
+    try:
+        entry = get_model_registry().deploy_in_background(
+            name, request.version, loader, loader.options(), activate=request.activate
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"Deploying model {name}:{request.version} ({loader.options()})")
+    return entry.stats()
+
+
+@router.post("/models/{name}/versions/{version}/activate")
+async def activate_model_version(name: str, version: str) -> dict:
+    """Switch traffic to an already loaded version (also used for rollback)."""
+    registry = get_model_registry()
+    if registry.get(name, version) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown model {name}:{version}")
+    try:
+        registry.activate(name, version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return registry.get(name, version).stats()
+
+
+@router.delete("/models/{name}/versions/{version}")
+async def unload_model_version(name: str, version: str) -> dict:
+    """Unload a version that is not serving traffic."""
+    try:
+        get_model_registry().unload(name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"ok": True}
+
+
+@router.get("/remedies")
+async def remedies_status() -> dict:
+    """Active knowledge base version and the languages this worker has loaded."""
+    kb = get_knowledge_base()
+    return {
+        "version": kb.version,
+        "directory": str(kb.directory),
+        "languages": kb.languages,
+        "loaded_languages": kb.loaded_languages,
+        "diseases": len(kb.diseases),
+    }
+
+
+@router.post("/remedies/reload")
+async def reload_remedies_endpoint(force: bool = False) -> dict:
+    """
+    Reload the knowledge base files of this worker and swap them in atomically.
+
+    Only reloads when a file changed, unless force=true. Invalid files are
+    rejected with 422 and the current version stays active.
+    """
+    try:
+        return await asyncio.to_thread(reload_remedies, force)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Remedies reload rejected: {e}")
+        raise HTTPException(status_code=422, detail=f"Invalid knowledge base: {e}")
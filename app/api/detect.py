@@ -1,10 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from PIL import Image
-import io
 from typing import Optional
 
-from models.detect import DetectImageRequest, DetectImageResponse
-from services.disease_detection import detect_disease, get_advisory_from_ollama
+from ..models.detect import DetectImageRequest, DetectImageResponse
+from ..services.disease_detection import detect_disease_async, get_advisory_async
+from ..utils.upload import sniff_image_type
 
 router = APIRouter()
 
@@ -18,21 +17,19 @@ async def detect_image(
     if not image.content_type in ["image/jpeg", "image/png", "image/jpg"]:
         raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG and PNG allowed.")
     
-    # Read image
-    try:
-        contents = await image.read()
-        img = Image.open(io.BytesIO(contents))
-    except Exception:
+    # Read image (checked from the magic bytes; decoded once, by the model)
+    contents = await image.read()
+    if sniff_image_type(contents[:8]) is None:
         raise HTTPException(status_code=400, detail="Invalid image file.")
     
-    # Detect disease
+    # Detect disease (off the event loop)
     try:
-        disease_name, confidence = detect_disease(img)
+        disease_name, confidence = await detect_disease_async(contents)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Disease detection failed: {str(e)}")
     
-    # Get advisory
-    advisory_text = get_advisory_from_ollama(disease_name)
+    # Get advisory (cached; generated off the event loop on a miss)
+    advisory_text = await get_advisory_async(disease_name)
     
     # For now, mock other fields as per original API
     # But extend with disease_name and advisory_text
@@ -1,8 +1,10 @@
 """Detection API routes (multipart-free)."""
 
+import json
 import logging
-import math
-from fastapi import APIRouter, File, UploadFile, Query, Depends, HTTPException, status, Body, Form
+from datetime import datetime, timezone
+from fastapi import APIRouter, File, UploadFile, Query, Depends, HTTPException, status, Body, Form, Header
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 import httpx
@@ -10,7 +12,11 @@ import httpx
 from ..config import settings
 from ..models.schemas import (
     DetectImageResponse,
+    DetectJobResponse,
+    DiseaseMapResponse,
+    DiseaseTrendsResponse,
     NearbyAlertsResponse,
+    NearbySummaryResponse,
     ScanTreatmentResponse,
     SuggestedTreatmentsResponse,
     PesticideStoreResponse,
@@ -19,39 +25,31 @@ from ..models.schemas import (
     SearchHistoryResponse,
     DiseaseSearchItem,
 )
+from ..services.detection_jobs import JobQueueFull, get_detection_jobs
 from ..services.detection_service import DetectionService
+from ..services.disease_detection import display_disease_name, stream_advisory
 from ..services.remedy_service import RemedyService
 from ..services.user_repository import UserRepository
 from ..services.search_repository import SearchRepository
-from ..db.session import get_db
+from ..db.session import AsyncSessionLocal, get_db
+from ..utils.geo import haversine_km_many
+from ..utils.upload import read_image_upload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["detection"])
 
 
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Compute distance in km between two lat/lng points."""
-    radius = 6371.0
-    d_lat = math.radians(lat2 - lat1)
-    d_lon = math.radians(lon2 - lon1)
-    a = (
-        math.sin(d_lat / 2) ** 2
-        + math.cos(math.radians(lat1))
-        * math.cos(math.radians(lat2))
-        * math.sin(d_lon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return radius * c
-
-
-@router.post("/detect-image", response_model=DetectImageResponse)
+@router.post("/detect-image", response_model=DetectImageResponse, response_model_exclude_none=True)
 async def detect_image(
     image: UploadFile = File(..., description="Image file (jpg/png)"),
     lat: Optional[float] = Query(None, description="Latitude"),
     lng: Optional[float] = Query(None, description="Longitude"),
     language: str = Query("en", description="Language: en, te, hi, kn, ml"),
     device_token: Optional[str] = Query(None, description="Device token for tracking search history"),
+    tiled: bool = Query(False, description="Tiled inference for large whole-plant/field photos"),
+    heatmap: bool = Query(False, description="Include per-tile predictions (with tiled=true)"),
+    async_job: bool = Query(False, description="Return a job id at once and poll /api/detect-jobs/{id}"),
     db_session: AsyncSession = Depends(get_db),
 ) -> DetectImageResponse:
     """
@@ -62,31 +60,79 @@ async def detect_image(
     - **lng**: Optional longitude
     - **language**: Response language (en, te, hi, kn, ml)
     - **device_token**: Optional device token to track search history
+    - **tiled**: Split large images into tiles so small lesions are not lost
+    - **heatmap**: With tiled, return the per-tile predictions
+    - **async_job**: Queue the detection and answer 202 with a job id
+      (503 with Retry-After when the queue is full)
     """
     try:
         logger.info(f"Received detect-image request - filename: {image.filename}, content_type: {image.content_type}")
         
-        # Read image bytes
-        image_bytes = await image.read()
-        
-        # Validate image type
-        if image.content_type and image.content_type not in ["image/jpeg", "image/png"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid image type: {image.content_type}. Allowed: image/jpeg, image/png"
+        # Read in chunks with a size cap; type is checked from the magic bytes
+        with await read_image_upload(image) as upload:
+            if async_job:
+                return _submit_detection_job(
+                    upload.data,
+                    latitude=lat,
+                    longitude=lng,
+                    language=language,
+                    device_token=device_token,
+                    tiled=tiled,
+                    include_tiles=heatmap,
+                )
+            result = await DetectionService.detect_disease(
+                image_bytes=upload.data,
+                latitude=lat,
+                longitude=lng,
+                language=language,
+                device_token=device_token,
+                db_session=db_session,
+                tiled=tiled,
+                include_tiles=heatmap,
             )
 
-        result = await DetectionService.detect_disease(
-            image_bytes=image_bytes,
-            latitude=lat,
-            longitude=lng,
-            language=language,
-            device_token=device_token,
-            db_session=db_session,
+        return DetectImageResponse(**result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error detecting disease: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error processing image",
         )
 
-        return DetectImageResponse(**result)
 
+@router.post("/detect-image/stream")
+async def detect_image_stream(
+    image: UploadFile = File(..., description="Image file (jpg/png)"),
+    lat: Optional[float] = Query(None, description="Latitude"),
+    lng: Optional[float] = Query(None, description="Longitude"),
+    language: str = Query("en", description="Language: en, te, hi, kn, ml"),
+    device_token: Optional[str] = Query(None, description="Device token for tracking search history"),
+    tiled: bool = Query(False, description="Tiled inference for large whole-plant/field photos"),
+    db_session: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Detect plant disease, then stream the LLM advisory as Server-Sent Events.
+
+    - `event: diagnosis`: the detect-image response, sent as soon as inference is done
+    - `event: advisory`: `{"text"}` chunks of the advisory as they are generated
+      (one chunk when it is cached)
+    - `event: done`: `{"advisory_text"}` with the full text
+    - `event: error`: `{"detail"}` if generation fails mid-stream
+    """
+    try:
+        with await read_image_upload(image) as upload:
+            result, (disease, _, crop) = await DetectionService.detect_with_prediction(
+                image_bytes=upload.data,
+                latitude=lat,
+                longitude=lng,
+                language=language,
+                device_token=device_token,
+                db_session=db_session,
+                tiled=tiled,
+            )
     except HTTPException:
         raise
     except Exception as e:
@@ -96,12 +142,155 @@ async def detect_image(
             detail="Error processing image",
         )
 
+    diagnosis = DetectImageResponse(**result).model_dump(exclude_none=True)
+
+    async def _events():
+        yield _sse_event("diagnosis", diagnosis)
+        parts = []
+        try:
+            async for chunk in stream_advisory(display_disease_name(disease, crop), result["language"]):
+                parts.append(chunk)
+                yield _sse_event("advisory", {"text": chunk})
+        except Exception as e:
+            logger.error(f"Advisory stream failed: {e}")
+            yield _sse_event("error", {"detail": "Advisory generation failed"})
+            return
+        yield _sse_event("done", {"advisory_text": "".join(parts).strip()})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _submit_detection_job(image_bytes, **params) -> JSONResponse:
+    jobs = get_detection_jobs()
+    try:
+        job = jobs.submit(image_bytes, **params)
+    except JobQueueFull as e:
+        logger.warning(str(e))
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Detection queue is full, retry later"},
+            headers={"Retry-After": str(jobs.retry_after_seconds())},
+        )
+    payload = DetectJobResponse(**job.to_dict(), poll_url=f"/api/detect-jobs/{job.id}")
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=payload.model_dump(exclude_none=True))
+
+
+@router.get("/detect-jobs/{job_id}", response_model=DetectJobResponse, response_model_exclude_none=True)
+async def get_detect_job(job_id: str) -> DetectJobResponse:
+    """
+    Poll an async detection job.
+
+    `status` is queued, running, done (with `result`) or failed (with `error`).
+    Finished jobs are kept for DETECTION_JOBS_RESULT_TTL_SECONDS, then 404.
+    """
+    job = get_detection_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired")
+    return DetectJobResponse(**job.to_dict())
+
+
+def _parse_batch_metadata(metadata: Optional[str], count: int) -> List[dict]:
+    """Per-image metadata: JSON list aligned with the uploaded images."""
+    if not metadata:
+        return [{} for _ in range(count)]
+    try:
+        entries = json.loads(metadata)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="metadata must be a JSON list")
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="metadata must be a JSON list of objects")
+    if len(entries) > count:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="More metadata entries than images")
+    return entries + [{} for _ in range(count - len(entries))]
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@router.post("/detect-images")
+async def detect_images(
+    images: List[UploadFile] = File(..., description="Image files (jpg/png)"),
+    metadata: Optional[str] = Form(
+        None, description='JSON list aligned with images: [{"lat": .., "lng": .., "timestamp": "ISO-8601", "client_id": ".."}]'
+    ),
+    language: str = Query("en", description="Language: en, te, hi, kn, ml"),
+    device_token: Optional[str] = Query(None, description="Device token for tracking search history"),
+) -> StreamingResponse:
+    """
+    Detect plant diseases for a batch of photos collected offline.
+
+    Images go through the batched inference path and results are streamed
+    back as NDJSON in completion order, one line per image
+    (`{"index", "client_id", "ok", "crop", "disease", "confidence", "remedies", "language"}`
+    or `{"index", "client_id", "ok": false, "error"}`). All detection events and
+    search history rows are then written in one transaction, and a final
+    `{"done": true, "images", "errors", "saved"}` line is sent. The writes
+    happen even if the connection drops mid-stream.
+    """
+    if len(images) > settings.batch_detect_max_images:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many images. Maximum per request: {settings.batch_detect_max_images}",
+        )
+    entries = _parse_batch_metadata(metadata, len(images))
+    logger.info(f"Received detect-images request - {len(images)} images")
+
+    # Validate everything before streaming; the uploads stay readable after the
+    # request ends, so a batch whose client disconnects is still detected and saved
+    items = []
+    uploads = []
+    for index, (image, entry) in enumerate(zip(images, entries)):
+        item = {"index": index, "client_id": entry.get("client_id"), "image": None}
+        try:
+            item["latitude"] = float(entry["lat"]) if entry.get("lat") is not None else None
+            item["longitude"] = float(entry["lng"]) if entry.get("lng") is not None else None
+            item["created_at"] = _parse_timestamp(entry.get("timestamp"))
+            upload = await read_image_upload(image)
+            uploads.append(upload)
+            item["image"] = upload.data
+        except HTTPException as e:
+            item["error"] = e.detail
+        except (TypeError, ValueError) as e:
+            item["error"] = f"Invalid metadata: {e}"
+        items.append(item)
+
+    def _release_uploads() -> None:
+        for upload in uploads:
+            upload.close()
+
+    results = DetectionService.detect_batch(
+        items,
+        language=language,
+        device_token=device_token,
+        session_factory=AsyncSessionLocal,
+        release=_release_uploads,
+    )
+
+    async def _stream():
+        async for result in results:
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
 
 @router.get("/nearby-alerts", response_model=NearbyAlertsResponse)
 async def get_nearby_alerts(
     lat: Optional[float] = Query(None, description="Latitude"),
     lng: Optional[float] = Query(None, description="Longitude"),
     radius: float = Query(10.0, description="Search radius in km"),
+    order: str = Query("recent", pattern="^(recent|distance)$", description="recent (newest first) or distance"),
     db_session: AsyncSession = Depends(get_db),
 ) -> NearbyAlertsResponse:
     """
@@ -113,6 +302,7 @@ async def get_nearby_alerts(
             longitude=lng,
             radius_km=radius,
             db_session=db_session,
+            order_by=order,
         )
         return NearbyAlertsResponse(**result)
 
@@ -124,6 +314,111 @@ async def get_nearby_alerts(
         )
 
 
+@router.get("/nearby-alerts/summary", response_model=NearbySummaryResponse)
+async def get_nearby_summary(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude"),
+    radius: float = Query(10.0, gt=0, le=100, description="Radius in km"),
+    hours: int = Query(72, ge=1, le=24 * 90, description="Window in hours"),
+    db_session: AsyncSession = Depends(get_db),
+) -> NearbySummaryResponse:
+    """
+    Reports per disease around a location, with outbreak flags.
+
+    Served from hourly rollups; the area is the set of ~5 km grid cells
+    whose centers are within the radius.
+    """
+    try:
+        result = await DetectionService.get_nearby_summary(
+            latitude=lat,
+            longitude=lng,
+            radius_km=radius,
+            hours=hours,
+            db_session=db_session,
+        )
+        return NearbySummaryResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error summarizing nearby reports: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error summarizing nearby reports",
+        )
+
+
+@router.get("/disease-trends", response_model=DiseaseTrendsResponse)
+async def get_disease_trends(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude"),
+    radius: float = Query(10.0, gt=0, le=100, description="Radius in km"),
+    days: int = Query(14, ge=1, le=366, description="Days, including today"),
+    bucket: str = Query("day", pattern="^(hour|day)$", description="hour or day (UTC)"),
+    disease: Optional[str] = Query(None, description="Only this disease (English name)"),
+    db_session: AsyncSession = Depends(get_db),
+) -> DiseaseTrendsResponse:
+    """
+    Report counts over time per disease around a location, for trend charts.
+    """
+    try:
+        result = await DetectionService.get_disease_trends(
+            latitude=lat,
+            longitude=lng,
+            radius_km=radius,
+            days=days,
+            bucket=bucket,
+            db_session=db_session,
+            disease=disease,
+        )
+        return DiseaseTrendsResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error building disease trends: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error building disease trends",
+        )
+
+
+@router.get("/disease-map", response_model=DiseaseMapResponse)
+async def get_disease_map(
+    south: float = Query(..., ge=-90, le=90, description="Viewport south latitude"),
+    west: float = Query(..., ge=-180, le=180, description="Viewport west longitude"),
+    north: float = Query(..., ge=-90, le=90, description="Viewport north latitude"),
+    east: float = Query(..., ge=-180, le=180, description="Viewport east longitude (< west crosses 180)"),
+    zoom: int = Query(8, ge=0, le=22, description="Map zoom level"),
+    days: int = Query(7, ge=1, le=366, description="Days of detections, including today"),
+    disease: Optional[str] = Query(None, description="Only this disease (English name)"),
+    db_session: AsyncSession = Depends(get_db),
+) -> DiseaseMapResponse:
+    """
+    Detection counts per grid cell and disease for the map viewport.
+
+    Served from daily rollups maintained on write, so the cost depends on
+    the viewport and window, not on how many detections an area has.
+    """
+    if south > north:
+        raise HTTPException(status_code=422, detail="south must not be greater than north")
+    try:
+        result = await DetectionService.get_disease_map(
+            south=south,
+            west=west,
+            north=north,
+            east=east,
+            zoom=zoom,
+            days=days,
+            db_session=db_session,
+            disease=disease,
+        )
+        return DiseaseMapResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error building disease map: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error building disease map",
+        )
+
+
 @router.post("/scan-treatment", response_model=ScanTreatmentResponse)
 async def scan_treatment(
     image: UploadFile = File(...),
@@ -143,20 +438,9 @@ async def scan_treatment(
         logger.info(f"Received scan-treatment request - filename: {image.filename}, content_type: {image.content_type}")
         logger.info(f"Disease: {disease}, Item Label: '{item_label}', Language: {language}")
 
-        if not image.content_type or image.content_type not in ["image/jpeg", "image/png"]:
-            logger.warning(f"Invalid content type: {image.content_type}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid image format. Please upload JPG or PNG."
-            )
-
-        max_size = settings.max_image_size_mb * 1024 * 1024
-        contents = await image.read()
-        if len(contents) > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_413_PAYLOAD_TOO_LARGE,
-                detail=f"Image too large. Maximum size: {settings.max_image_size_mb}MB"
-            )
+        # Validates size and JPEG/PNG magic bytes; the image itself is not used yet
+        upload = await read_image_upload(image)
+        upload.close()
 
         result = RemedyService.evaluate_treatment(
             disease=disease,
@@ -215,13 +499,26 @@ async def get_suggested_treatments(
     language: str = Query("en", description="Language: en, te, hi, kn, ml"),
     lat: Optional[float] = Query(None, description="Latitude"),
     lng: Optional[float] = Query(None, description="Longitude"),
+    if_none_match: Optional[str] = Header(None),
 ) -> SuggestedTreatmentsResponse:
     """
     Get suggested remedies and nearby pesticide stores.
+
+    Without a location the response only depends on (disease, language): it is
+    served pre-serialized with a strong ETag, and `If-None-Match` with that
+    ETag returns 304 Not Modified.
     """
     try:
         language = RemedyService.validate_language(language)
         normalized_disease = RemedyService.normalize_disease_name(disease)
+
+        if lat is None or lng is None:
+            fragment = RemedyService.get_treatment_fragment(normalized_disease, language)
+            headers = {"ETag": fragment.etag, "Cache-Control": "no-cache"}
+            if _etag_matches(if_none_match, fragment.etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return Response(content=fragment.body, media_type="application/json", headers=headers)
+
         remedies = RemedyService.get_remedies_list(normalized_disease, language)
 
         store_responses: List[PesticideStoreResponse] = []
@@ -250,6 +547,16 @@ async def get_suggested_treatments(
         )
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
 async def _fetch_nearby_stores(
     lat: float,
     lng: float,
@@ -315,7 +622,6 @@ async def _fetch_nearby_stores(
                         address = ", ".join([p for p in parts if p]) if any(parts) else None
 
                     phone = tags.get("phone") or tags.get("contact:phone")
-                    distance = _haversine_km(lat, lng, elem_lat, elem_lng)
 
                     stores.append(
                         PesticideStoreResponse(
@@ -324,10 +630,16 @@ async def _fetch_nearby_stores(
                             phone=phone,
                             latitude=elem_lat,
                             longitude=elem_lng,
-                            distance_km=distance,
                         )
                     )
 
+                # Distances for all stores in one vectorized pass
+                distances = haversine_km_many(
+                    lat, lng, [s.latitude for s in stores], [s.longitude for s in stores]
+                )
+                for store, distance in zip(stores, distances.tolist()):
+                    store.distance_km = distance
+
                 stores.sort(key=lambda s: s.distance_km or float("inf"))
                 return stores[:max_results]
             except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ConnectError) as e:
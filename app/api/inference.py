@@ -0,0 +1,35 @@
+"""Inference monitoring routes."""
+
+import logging
+from fastapi import APIRouter
+
+from ..config import settings
+from ..services.advisory_cache import get_advisory_cache
+from ..services.ml_service import get_inference_stats
+from ..services.ollama_client import get_ollama_client
+from ..services.detection_jobs import get_detection_jobs
+from ..services.result_cache import get_result_cache
+from ..services.user_index import get_user_index
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/inference", tags=["inference"])
+
+
+@router.get("/stats")
+async def inference_stats() -> dict:
+    """
+    Expose inference scheduler metrics for tuning.
+
+    Includes queue depth, batch-size histogram, per-request wait time and
+    detection result and advisory cache hit/miss counters, and the size of the
+    nearby-alert user index.
+    """
+    stats = get_inference_stats()
+    cache = get_result_cache()
+    stats["result_cache"] = cache.stats() if cache is not None else None
+    stats["detection_jobs"] = get_detection_jobs().stats()
+    stats["advisory_cache"] = get_advisory_cache().stats() if settings.advisory_cache_enabled else None
+    stats["ollama"] = get_ollama_client().stats() if settings.advisory_backend == "http" else None
+    stats["user_index"] = get_user_index().stats() if settings.user_index_enabled else None
+    return stats
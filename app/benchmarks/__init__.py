@@ -0,0 +1 @@
+"""Benchmarks for the detection pipeline (run with python -m app.benchmarks.<name>)."""
@@ -0,0 +1,63 @@
+"""Deterministic synthetic image corpus for benchmarks.
+
+The same (width, height, format, seed) always produces the same bytes, so
+results from different commits are measured on identical inputs.
+"""
+
+import io
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_SIZES: Tuple[Tuple[int, int], ...] = ((320, 240), (1024, 768), (3000, 2000))
+DEFAULT_FORMATS: Tuple[str, ...] = ("JPEG", "PNG")
+
+
+def synthetic_pixels(width: int, height: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Smooth gradient plus noise so the image is not trivially compressible
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // max(1, width - 1), y * 255 // max(1, height - 1), (x + y) % 256], axis=-1)
+    noise = rng.integers(0, 40, size=(height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def make_image(width: int, height: int, fmt: str = "JPEG", seed: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    image = Image.fromarray(synthetic_pixels(width, height, seed), "RGB")
+    if fmt.upper() == "JPEG":
+        image.save(buffer, "JPEG", quality=90)
+    else:
+        image.save(buffer, fmt.upper())
+    return buffer.getvalue()
+
+
+def make_jpeg(width: int, height: int, seed: int = 0) -> bytes:
+    return make_image(width, height, "JPEG", seed)
+
+
+def make_corpus(
+    sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    per_variant: int = 4,
+    seed: int = 0,
+) -> List[Dict]:
+    """Images for every (size, format) pair: [{"name", "format", "size", "bytes"}]."""
+    corpus = []
+    for width, height in sizes:
+        for fmt in formats:
+            for index in range(per_variant):
+                data = make_image(width, height, fmt, seed=seed + index)
+                corpus.append({
+                    "name": f"{width}x{height}-{fmt.lower()}-{index}",
+                    "format": fmt.upper(),
+                    "size": f"{width}x{height}",
+                    "bytes": data,
+                })
+    return corpus
+
+
+def parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    """"640x480,1600x1200" -> [(640, 480), (1600, 1200)]"""
+    return [tuple(int(v) for v in part.lower().split("x")) for part in spec.split(",") if part]
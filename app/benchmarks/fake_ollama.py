@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Stand-in for Ollama, to exercise the advisory path without a model.
+
+CLI backend (ADVISORY_BACKEND=cli):
+    OLLAMA_COMMAND=/path/to/app/benchmarks/fake_ollama.py
+  Reads the prompt from stdin like `ollama run <model>`.
+
+HTTP backend (ADVISORY_BACKEND=http):
+    python app/benchmarks/fake_ollama.py serve --port 11434
+  Serves POST /api/generate, streaming NDJSON chunks like the real server
+  (or one JSON object with "stream": false).
+
+Both answer with a canned advisory in the expected six-section format.
+Environment variables:
+- FAKE_OLLAMA_DELAY: seconds to sleep before answering (simulates model load)
+- FAKE_OLLAMA_TOKEN_DELAY: seconds between streamed tokens (serve only)
+- FAKE_OLLAMA_LOG: file that gets one line per generation (to count them)
+- FAKE_OLLAMA_FAIL: fail instead of answering
+"""
+import json
+import os
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _disease(prompt: str) -> str:
+    return prompt.splitlines()[0].split(":", 1)[-1].strip() if prompt else "Unknown"
+
+
+def _log(model: str, disease: str) -> None:
+    log_path = os.environ.get("FAKE_OLLAMA_LOG")
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(f"{time.time():.3f}\t{model}\t{disease}\n")
+
+
+def advisory(disease: str) -> str:
+    sections = ["Cause", "Symptoms", "Treatment Steps", "Prevention", "Best Pesticide Types", "Spray Schedule"]
+    numbers = [1, 2, 3, 4, 5, 7]
+    return "\n\n".join(
+        f"{number} {section}\n{section} for {disease}.\nGenerated by fake ollama."
+        for number, section in zip(numbers, sections)
+    )
+
+
+def run(model: str) -> int:
+    disease = _disease(sys.stdin.read())
+    _log(model, disease)
+    time.sleep(float(os.environ.get("FAKE_OLLAMA_DELAY", "0")))
+    if os.environ.get("FAKE_OLLAMA_FAIL"):
+        print("fake ollama failure", file=sys.stderr)
+        return 1
+    print(advisory(disease))
+    return 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = request.get("model", "")
+        disease = _disease(request.get("prompt", ""))
+        _log(model, disease)
+        time.sleep(float(os.environ.get("FAKE_OLLAMA_DELAY", "0")))
+
+        if os.environ.get("FAKE_OLLAMA_FAIL"):
+            self._send_json(500, {"error": "fake ollama failure"})
+            return
+
+        text = advisory(disease)
+        if not request.get("stream", True):
+            self._send_json(200, {"model": model, "response": text, "done": True})
+            return
+
+        token_delay = float(os.environ.get("FAKE_OLLAMA_TOKEN_DELAY", "0"))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in re.findall(r"\S+\s*", text):
+            self._write_chunk({"model": model, "response": token, "done": False})
+            time.sleep(token_delay)
+        self._write_chunk({"model": model, "response": "", "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: dict) -> None:
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int) -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    print(f"Fake Ollama listening on http://127.0.0.1:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) >= 3 and sys.argv[1] == "run":
+        return run(sys.argv[2])
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        port = int(sys.argv[3]) if len(sys.argv) >= 4 and sys.argv[2] == "--port" else 11434
+        return serve(port)
+    print("usage: fake_ollama.py run <model> | serve [--port N]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
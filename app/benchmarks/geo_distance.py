@@ -0,0 +1,128 @@
+"""Haversine benchmark: per-point Python loop vs NumPy over coordinate arrays.
+
+For each size, times with random points spread over India:
+- one_to_many: distances from one point (haversine_km in a loop vs
+  haversine_km_many)
+- within_radius: points within --radius km (loop with a filter vs
+  within_radius)
+- matrix: --origins points to every point (nested loop vs
+  haversine_km_matrix), only for sizes up to --matrix-max
+
+Reports the median of --repeat runs per variant, the speedup, and the
+largest difference between the two results.
+
+Usage:
+    python -m app.benchmarks.geo_distance [--sizes 10000,1000000] [--repeat 5]
+        [--radius 10] [--origins 100] [--output results.json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.utils.geo import coordinate_arrays, haversine_km, haversine_km_many, haversine_km_matrix, within_radius
+
+LAT_RANGE = (8.0, 35.0)
+LNG_RANGE = (68.0, 97.0)
+
+
+def _median_ms(fn: Callable, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - began) * 1000.0)
+    return round(statistics.median(timings), 3), result
+
+
+def _compare(name: str, loop: Callable, vectorized: Callable, repeat: int, diff: Callable) -> Dict:
+    loop_ms, expected = _median_ms(loop, repeat)
+    numpy_ms, actual = _median_ms(vectorized, repeat)
+    return {
+        "case": name,
+        "loop_ms": loop_ms,
+        "numpy_ms": numpy_ms,
+        "speedup": round(loop_ms / numpy_ms, 1) if numpy_ms > 0 else None,
+        "max_diff": diff(expected, actual),
+    }
+
+
+def run(args) -> List[Dict]:
+    rng = random.Random(args.seed)
+    results = []
+    for size in args.sizes:
+        lats = [rng.uniform(*LAT_RANGE) for _ in range(size)]
+        lngs = [rng.uniform(*LNG_RANGE) for _ in range(size)]
+        lat_array, lng_array = coordinate_arrays(lats, lngs)
+        origin = (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+
+        def max_abs(expected, actual):
+            return float(np.max(np.abs(np.asarray(expected) - actual))) if len(expected) else 0.0
+
+        row = {"points": size, "cases": []}
+        row["cases"].append(_compare(
+            "one_to_many",
+            lambda: [haversine_km(origin[0], origin[1], a, b) for a, b in zip(lats, lngs)],
+            lambda: haversine_km_many(origin[0], origin[1], lat_array, lng_array),
+            args.repeat,
+            max_abs,
+        ))
+        row["cases"].append(_compare(
+            "within_radius",
+            lambda: [i for i, (a, b) in enumerate(zip(lats, lngs))
+                     if haversine_km(origin[0], origin[1], a, b) <= args.radius],
+            lambda: within_radius(origin[0], origin[1], lat_array, lng_array, args.radius)[0],
+            args.repeat,
+            lambda expected, actual: float(len(set(expected) ^ set(actual.tolist()))),
+        ))
+        if size <= args.matrix_max:
+            origins = list(zip(lats[: args.origins], lngs[: args.origins]))
+            row["cases"].append(_compare(
+                f"matrix_{len(origins)}x{size}",
+                lambda: [[haversine_km(o[0], o[1], a, b) for a, b in zip(lats, lngs)] for o in origins],
+                lambda: haversine_km_matrix(lat_array[: args.origins], lng_array[: args.origins], lat_array, lng_array),
+                args.repeat,
+                max_abs,
+            ))
+        results.append(row)
+    return results
+
+
+def _print_results(results: List[Dict]) -> None:
+    for row in results:
+        print(f"{row['points']} points")
+        for case in row["cases"]:
+            print(
+                f"  {case['case']:22s} loop {case['loop_ms']:10.3f} ms  numpy {case['numpy_ms']:9.3f} ms  "
+                f"x{case['speedup']}  max diff {case['max_diff']:.2e}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,1000000", help="Comma-separated point counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--radius", type=float, default=10.0, help="Radius for within_radius, km")
+    parser.add_argument("--origins", type=int, default=100, help="Origins for the matrix case")
+    parser.add_argument("--matrix-max", type=int, default=10000, help="Largest size for the matrix case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = run(args)
+    _print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Radius query benchmark: lat/lng bounding box vs geo_cell ranges.
+
+Seeds detection_events with synthetic points clustered around farming
+districts, like real traffic, and times both ways of answering
+"events within R km, newest first":
+- bbox: the previous query, latitude/longitude BETWEEN on the separate
+  single-column indexes, no exact distance;
+- cell: the DetectionRepository.get_events_near() query, geo_cell ranges
+  on the (geo_cell, created_at) index plus the haversine filter in SQL.
+
+Also checks the cell query against an exact NumPy haversine over the bbox
+candidates and prints both query plans. Without DATABASE_URL a throwaway
+SQLite file is used; point it at a scratch Postgres database for numbers
+that mean anything (seeding 2M rows takes a few minutes).
+
+Usage:
+    python -m app.benchmarks.geo_query [--rows 2000000] [--queries 200]
+        [--radius 10] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Rough bounds of India, where the clusters are placed
+LAT_RANGE = (8.0, 35.0)
+LNG_RANGE = (68.0, 97.0)
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def _summarize(latencies_ms: List[float]) -> Dict:
+    ordered = sorted(latencies_ms)
+    return {
+        "queries": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": _percentile(ordered, 0.50),
+        "p95_ms": _percentile(ordered, 0.95),
+        "p99_ms": _percentile(ordered, 0.99),
+    }
+
+
+def _clusters(rng: random.Random, count: int = 400) -> List[Tuple[float, float]]:
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(count)]
+
+
+def _seed_rows(rng: random.Random, clusters, rows: int, batch: int):
+    now = datetime.now(timezone.utc)
+    crops = ["tomato", "potato", "rice", "corn", "pepper"]
+    for start in range(0, rows, batch):
+        chunk = []
+        for _ in range(min(batch, rows - start)):
+            lat, lng = rng.choice(clusters)
+            chunk.append({
+                "crop": rng.choice(crops),
+                "disease": "Early Blight",
+                "confidence": rng.random(),
+                "latitude": lat + rng.gauss(0, 0.3),
+                "longitude": lng + rng.gauss(0, 0.3),
+                "created_at": now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            })
+        yield chunk
+
+
+def _bbox_query(latitude: float, longitude: float, radius_km: float, limit: int):
+    from sqlalchemy import select
+
+    from app.db.models import DetectionEvent
+
+    lat_delta = radius_km / 111.0
+    lng_delta = radius_km / (111.0 * math.cos(math.radians(latitude)))
+    return select(DetectionEvent).where(
+        (DetectionEvent.latitude >= latitude - lat_delta) &
+        (DetectionEvent.latitude <= latitude + lat_delta) &
+        (DetectionEvent.longitude >= longitude - lng_delta) &
+        (DetectionEvent.longitude <= longitude + lng_delta)
+    ).order_by(DetectionEvent.created_at.desc()).limit(limit)
+
+
+def _cell_query(latitude: float, longitude: float, radius_km: float, limit: int):
+    from sqlalchemy import select
+
+    from app.db.models import DetectionEvent
+    from app.services.detection_repository import cell_candidates, haversine_sql
+
+    distance = haversine_sql(latitude, longitude, DetectionEvent.latitude, DetectionEvent.longitude)
+    return (
+        select(DetectionEvent.id, distance.label("distance_km"))
+        .where(DetectionEvent.id.in_(cell_candidates(latitude, longitude, radius_km)))
+        .where(distance <= radius_km)
+        .order_by(DetectionEvent.created_at.desc())
+        .limit(limit)
+    )
+
+
+async def _explain(session, query, dialect: str) -> List[str]:
+    from sqlalchemy import text
+
+    compiled = query.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if dialect == "sqlite" else "EXPLAIN ANALYZE"
+    result = await session.execute(text(f"{prefix} {compiled}"))
+    return [" ".join(str(value) for value in row) for row in result.all()]
+
+
+async def run(args) -> Dict:
+    from sqlalchemy import func, select, text
+
+    from app.db.models import DetectionEvent
+    from app.db.session import AsyncSessionLocal, Base, engine
+    from app.services.detection_repository import DetectionRepository
+    from app.utils.geo import within_radius
+
+    rng = random.Random(args.seed)
+    clusters = _clusters(rng)
+    dialect = engine.dialect.name
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        existing = await session.scalar(select(func.count()).select_from(DetectionEvent))
+        if existing < args.rows:
+            started = time.perf_counter()
+            for chunk in _seed_rows(rng, clusters, args.rows - existing, args.batch):
+                await DetectionRepository.save_events_bulk(session, chunk)
+            print(f"Seeded {args.rows - existing} rows in {time.perf_counter() - started:.1f}s")
+        if dialect == "postgresql":
+            await session.execute(text("ANALYZE detection_events"))
+            await session.commit()
+
+        points = [
+            (lat + rng.gauss(0, 0.3), lng + rng.gauss(0, 0.3))
+            for lat, lng in (rng.choice(clusters) for _ in range(args.queries))
+        ]
+
+        report = {"dialect": dialect, "rows": max(existing, args.rows), "radius_km": args.radius}
+        for name, build in (("bbox", _bbox_query), ("cell", _cell_query)):
+            latencies = []
+            for lat, lng in points:
+                began = time.perf_counter()
+                (await session.execute(build(lat, lng, args.radius, 100))).all()
+                latencies.append((time.perf_counter() - began) * 1000.0)
+            report[name] = _summarize(latencies)
+            report[name]["plan"] = await _explain(session, build(*points[0], args.radius, 100), dialect)
+
+        # Exact check: every event within the radius, and nothing outside it
+        mismatches = 0
+        for lat, lng in points[: args.verify]:
+            candidates = (await session.execute(_bbox_query(lat, lng, args.radius * 1.1, 10 ** 9))).scalars().all()
+            inside, _ = within_radius(
+                lat, lng, [event.latitude for event in candidates], [event.longitude for event in candidates], args.radius
+            )
+            expected = {candidates[i].id for i in inside.tolist()}
+            found = {row.id for row in (await session.execute(_cell_query(lat, lng, args.radius, 10 ** 9))).all()}
+            mismatches += len(expected ^ found)
+        report["verified_queries"] = min(args.verify, len(points))
+        report["mismatched_events"] = mismatches
+    await engine.dispose()
+    return report
+
+
+def _print_report(report: Dict) -> None:
+    print(f"{report['rows']} rows on {report['dialect']}, radius {report['radius_km']} km")
+    for name in ("bbox", "cell"):
+        result = report[name]
+        print(
+            f"  {name:5s} p50 {result['p50_ms']:8.3f} ms  p95 {result['p95_ms']:8.3f} ms  "
+            f"p99 {result['p99_ms']:8.3f} ms"
+        )
+        for line in result["plan"]:
+            print(f"        {line}")
+    print(f"  exactness: {report['mismatched_events']} mismatched events over {report['verified_queries']} queries")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius", type=float, default=10.0, help="Search radius in km")
+    parser.add_argument("--verify", type=int, default=20, help="Queries checked against exact haversine")
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows per seeding insert")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Local stand-in for Postgres; must be set before app.db.session is imported
+    if "DATABASE_URL" not in os.environ:
+        db_path = Path(tempfile.mkdtemp(prefix="arogya-geo-")) / "bench.sqlite"
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+
+    report = asyncio.run(run(args))
+    _print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
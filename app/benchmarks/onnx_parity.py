@@ -0,0 +1,94 @@
+"""Parity and latency comparison: transformers pipeline vs ONNX Runtime backend.
+
+Exports the model if needed, then runs the same images through the
+pipeline, the fp32 ONNX model and the int8 ONNX model. Reports top-1
+label agreement with the pipeline, max score difference and latency.
+
+Usage:
+    python -m app.benchmarks.onnx_parity [--images DIR] [--count 32] [--batch 8]
+"""
+
+import argparse
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from app.benchmarks.corpus import make_jpeg
+from app.config import settings
+from app.services.disease_detection import MODEL_ID
+from app.services.onnx_backend import (
+    FP32_FILE,
+    INT8_FILE,
+    METADATA_FILE,
+    OnnxClassifier,
+    default_model_dir,
+    export_onnx,
+)
+
+
+def _load_images(directory, count):
+    if directory:
+        paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png"})
+        return [p.read_bytes() for p in paths[:count]]
+    sizes = [(640, 480), (1600, 1200), (4000, 3000)]
+    return [make_jpeg(*sizes[i % len(sizes)], seed=i) for i in range(count)]
+
+
+def _run(model, images, batch):
+    timings, outputs = [], []
+    for start in range(0, len(images), batch):
+        chunk = images[start:start + batch]
+        if not isinstance(model, OnnxClassifier):
+            chunk = [Image.open(io.BytesIO(b)) for b in chunk]  # served ONNX path gets the encoded bytes
+        began = time.perf_counter()
+        result = model(chunk)
+        timings.append((time.perf_counter() - began) * 1000.0 / len(chunk))
+        outputs.extend(r[0] for r in result)
+    return outputs, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", help="Directory of jpg/png leaf photos (default: synthetic)")
+    parser.add_argument("--count", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    from transformers import pipeline
+
+    model_dir = default_model_dir(MODEL_ID)
+    if not (model_dir / INT8_FILE).exists() or not (model_dir / FP32_FILE).exists():
+        export_onnx(MODEL_ID, model_dir, quantize=True)
+    metadata = json.loads((model_dir / METADATA_FILE).read_text())
+
+    images = _load_images(args.images, args.count)
+    backends = {
+        "pipeline": pipeline("image-classification", model=MODEL_ID, device=-1),
+        "onnx-fp32": OnnxClassifier(model_dir / FP32_FILE, metadata, settings.onnx_intra_op_threads, settings.onnx_inter_op_threads),
+        "onnx-int8": OnnxClassifier(model_dir / INT8_FILE, metadata, settings.onnx_intra_op_threads, settings.onnx_inter_op_threads),
+    }
+
+    reference = None
+    report = {"model_id": MODEL_ID, "images": len(images), "batch": args.batch, "backends": {}}
+    print(f"{'backend':>10} {'ms/image':>9} {'top-1 agree':>12} {'max score diff':>15}")
+    for name, model in backends.items():
+        _run(model, images[:args.batch], args.batch)  # warm-up
+        outputs, ms_per_image = _run(model, images, args.batch)
+        if reference is None:
+            reference = outputs
+        agree = sum(o["label"] == r["label"] for o, r in zip(outputs, reference)) / len(outputs)
+        diff = max(abs(o["score"] - r["score"]) for o, r in zip(outputs, reference) if o["label"] == r["label"]) if agree else None
+        report["backends"][name] = {"ms_per_image": ms_per_image, "top1_agreement": agree, "max_score_diff": diff}
+        print(f"{name:>10} {ms_per_image:>9.2f} {agree:>11.1%} {diff if diff is not None else float('nan'):>15.4f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
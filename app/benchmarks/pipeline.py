@@ -0,0 +1,363 @@
+"""End-to-end benchmark of the detection pipeline on a synthetic corpus.
+
+Stages (each reports p50/p95/p99 latency, throughput, and the peak RSS
+sampled while that stage ran plus how much RSS it added):
+- preprocess: preprocess_image() on the decoded upload
+- inference:  ModelLoader.predict() (one image per call)
+- batch:      ModelLoader.predict_batch() in chunks of --batch
+- detect:     DetectionService.detect_disease() including the DB writes
+- http:       POST /api/detect-image through the ASGI app (--concurrency clients)
+
+The database is replaced by a throwaway SQLite file (needs aiosqlite) unless
+DATABASE_URL is already set, and the result cache is disabled so every
+request runs inference. Results are written as JSON together with the git
+commit, so runs can be compared with --compare.
+
+Usage:
+    python -m app.benchmarks.pipeline [--sizes 320x240,1024x768] [--per-variant 4]
+        [--repeat 3] [--batch 8] [--concurrency 8] [--stages preprocess,http]
+        [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.benchmarks.corpus import make_corpus, parse_sizes
+
+STAGES = ("preprocess", "inference", "batch", "detect", "http")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1)
+
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size right now (Linux /proc), or None where it is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * resource.getpagesize() / (1024.0 * 1024.0)
+
+
+class _StageRss:
+    """
+    RSS of one stage: peak sampled from a background thread while it runs.
+
+    ru_maxrss is a process-wide high-water mark, so after the first stage it
+    would report the largest peak so far instead of the stage's own. Without
+    /proc (macOS) the peak is left out and the delta is how far the stage
+    raised that high-water mark.
+    """
+
+    def __init__(self, interval_seconds: float = 0.01):
+        self.interval_seconds = interval_seconds
+        self._start: Optional[float] = None
+        self._end: Optional[float] = None
+        self._peak: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "_StageRss":
+        self._start = _current_rss_mb()
+        if self._start is None:
+            self._start = _peak_rss_mb()
+            return self
+        self._peak = self._start
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._thread is None:
+            self._end = _peak_rss_mb()
+            return
+        self._stop.set()
+        self._thread.join()
+        self._end = _current_rss_mb()
+        self._peak = max(self._peak, self._end)
+
+    def result(self) -> Dict:
+        return {
+            "peak_rss_mb": round(self._peak, 1) if self._peak is not None else None,
+            "rss_delta_mb": round(self._end - self._start, 1),
+        }
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            rss = _current_rss_mb()
+            if rss is not None and rss > self._peak:
+                self._peak = rss
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(p * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def _summarize(latencies_ms: List[float], items: int, wall_seconds: float, errors: int = 0) -> Dict:
+    ordered = sorted(latencies_ms)
+    return {
+        "calls": len(ordered),
+        "items": items,
+        "errors": errors,
+        "mean_ms": round(statistics.fmean(ordered), 3) if ordered else None,
+        "p50_ms": _percentile(ordered, 0.50) if ordered else None,
+        "p95_ms": _percentile(ordered, 0.95) if ordered else None,
+        "p99_ms": _percentile(ordered, 0.99) if ordered else None,
+        "throughput_per_s": round(items / wall_seconds, 3) if wall_seconds > 0 else None,
+    }
+
+
+def _time_calls(fn: Callable, inputs: List, repeat: int) -> Dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for value in inputs:
+            began = time.perf_counter()
+            fn(value)
+            latencies.append((time.perf_counter() - began) * 1000.0)
+    return _summarize(latencies, len(latencies), time.perf_counter() - started)
+
+
+def _bench_preprocess(images: List[bytes], repeat: int) -> Dict:
+    from PIL import Image
+
+    from app.utils.image_processing import preprocess_image
+
+    return _time_calls(lambda data: preprocess_image(Image.open(io.BytesIO(data))), images, repeat)
+
+
+def _bench_inference(images: List[bytes], repeat: int) -> Dict:
+    from app.services.ml_service import get_model_loader
+
+    return _time_calls(get_model_loader().predict, images, repeat)
+
+
+def _bench_batch(images: List[bytes], repeat: int, batch: int) -> Dict:
+    from app.services.ml_service import get_model_loader
+
+    loader = get_model_loader()
+    chunks = [images[i:i + batch] for i in range(0, len(images), batch)]
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for chunk in chunks:
+            began = time.perf_counter()
+            loader.predict_batch(chunk)
+            latencies.append((time.perf_counter() - began) * 1000.0)
+    return _summarize(latencies, len(images) * repeat, time.perf_counter() - started)
+
+
+async def _bench_detect(images: List[bytes], repeat: int) -> Dict:
+    from app.db.session import AsyncSessionLocal
+    from app.services.detection_service import DetectionService
+
+    latencies = []
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        for _ in range(repeat):
+            for index, data in enumerate(images):
+                began = time.perf_counter()
+                await DetectionService.detect_disease(
+                    image_bytes=data,
+                    latitude=17.385 + index * 0.001,
+                    longitude=78.486,
+                    language="en",
+                    db_session=session,
+                )
+                latencies.append((time.perf_counter() - began) * 1000.0)
+    return _summarize(latencies, len(latencies), time.perf_counter() - started)
+
+
+async def _bench_http(corpus: List[Dict], repeat: int, concurrency: int) -> Dict:
+    import httpx
+
+    from app.main import app
+
+    requests = [entry for _ in range(repeat) for entry in corpus]
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def _one(index: int, entry: Dict) -> None:
+            nonlocal errors
+            content_type = "image/jpeg" if entry["format"] == "JPEG" else "image/png"
+            async with semaphore:
+                began = time.perf_counter()
+                response = await client.post(
+                    "/api/detect-image",
+                    params={"lat": 17.385 + index * 0.001, "lng": 78.486, "language": "en"},
+                    files={"image": (entry["name"], entry["bytes"], content_type)},
+                )
+                latencies.append((time.perf_counter() - began) * 1000.0)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[_one(i, entry) for i, entry in enumerate(requests)])
+        wall = time.perf_counter() - started
+    return _summarize(latencies, len(latencies), wall, errors)
+
+
+async def _prepare_database() -> None:
+    from app.db.session import Base, engine
+
+    # Register every table on the metadata before create_all
+    import app.models.detection_event  # noqa: F401
+    import app.models.sent_alert  # noqa: F401
+    import app.models.user  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def run(args) -> Dict:
+    from app.config import settings
+    from app.services.ml_service import shutdown_models, warm_up_models
+
+    # Measure inference, not cache hits
+    settings.detection_cache_enabled = args.with_cache
+
+    corpus = make_corpus(parse_sizes(args.sizes), per_variant=args.per_variant, seed=args.seed)
+    images = [entry["bytes"] for entry in corpus]
+    stages = [s for s in args.stages.split(",") if s]
+
+    report = {
+        "benchmark": "pipeline",
+        "git_commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "inference_backend": "mock" if settings.use_mock_inference else settings.inference_backend,
+            "inference_executor": settings.inference_executor,
+            "inference_batching_enabled": settings.inference_batching_enabled,
+            "inference_batch_max_size": settings.inference_batch_max_size,
+            "detection_cache_enabled": settings.detection_cache_enabled,
+            "repeat": args.repeat,
+            "batch": args.batch,
+            "concurrency": args.concurrency,
+        },
+        "corpus": {
+            "images": len(corpus),
+            "sizes": sorted({entry["size"] for entry in corpus}),
+            "formats": sorted({entry["format"] for entry in corpus}),
+            "total_bytes": sum(len(data) for data in images),
+        },
+        "stages": {},
+    }
+
+    await _prepare_database()
+    report["warmup"] = await asyncio.to_thread(warm_up_models)
+    report["rss_after_warmup_mb"] = _current_rss_mb() or _peak_rss_mb()
+
+    try:
+        for stage in stages:
+            with _StageRss() as rss:
+                if stage == "preprocess":
+                    result = _bench_preprocess(images, args.repeat)
+                elif stage == "inference":
+                    result = _bench_inference(images, args.repeat)
+                elif stage == "batch":
+                    result = _bench_batch(images, args.repeat, args.batch)
+                elif stage == "detect":
+                    result = await _bench_detect(images, args.repeat)
+                elif stage == "http":
+                    result = await _bench_http(corpus, args.repeat, args.concurrency)
+                else:
+                    raise SystemExit(f"Unknown stage: {stage} (choose from {', '.join(STAGES)})")
+            result.update(rss.result())
+            report["stages"][stage] = result
+            _print_stage(stage, result)
+    finally:
+        await shutdown_models()
+    return report
+
+
+def _print_stage(stage: str, result: Dict) -> None:
+    print(
+        f"{stage:>10} calls={result['calls']:<5} p50={result['p50_ms']:>9.2f}ms "
+        f"p95={result['p95_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+        f"{result['throughput_per_s']:>9.1f} img/s  "
+        + (f"peak_rss={result['peak_rss_mb']:.0f}MB " if result["peak_rss_mb"] is not None else "")
+        + f"rss_delta={result['rss_delta_mb']:+.0f}MB"
+        + (f"  errors={result['errors']}" if result["errors"] else "")
+    )
+
+
+def _print_comparison(report: Dict, baseline: Dict) -> None:
+    print(f"\nvs {baseline.get('git_commit') or 'baseline'}:")
+    for stage, result in report["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        parts = []
+        for key in ("p50_ms", "p95_ms", "throughput_per_s"):
+            if before.get(key) and result.get(key) is not None:
+                change = (result[key] - before[key]) / before[key] * 100.0
+                parts.append(f"{key} {before[key]:.2f} -> {result[key]:.2f} ({change:+.1f}%)")
+        print(f"{stage:>10} " + "  ".join(parts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(f"{w}x{h}" for w, h in ((320, 240), (1024, 768), (3000, 2000))))
+    parser.add_argument("--per-variant", type=int, default=4, help="Images per (size, format)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--with-cache", action="store_true", help="Keep the detection result cache enabled")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    # Local stand-in for Postgres; must be set before app.db.session is imported
+    if "DATABASE_URL" not in os.environ:
+        db_path = Path(tempfile.mkdtemp(prefix="arogya-bench-")) / "bench.sqlite"
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+    if args.compare:
+        _print_comparison(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Microbenchmark: preprocessing engine vs the original preprocess_image.
+
+Usage:
+    python -m app.benchmarks.preprocess [--iterations 50] [--sizes 640x480,4000x3000]
+"""
+
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from app.benchmarks.corpus import make_jpeg
+from app.utils.image_processing import ImagePreprocessor
+
+
+def reference_preprocess(image_bytes: bytes, target_size=(224, 224)) -> np.ndarray:
+    """The original implementation (full decode, float64 intermediates)."""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(target_size, Image.Resampling.LANCZOS)
+    img_array = np.array(image) / 255.0
+    img_array = img_array.transpose(2, 0, 1)
+    return img_array.astype(np.float32)
+
+
+def _measure(fn, iterations: int):
+    timings = []
+    tracemalloc.start()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--sizes", default="640x480,1600x1200,4000x3000")
+    args = parser.parse_args()
+
+    engine = ImagePreprocessor((224, 224))
+    print(f"{'size':>10} {'reference ms':>13} {'engine ms':>10} {'speedup':>8} {'ref py KiB':>11} {'eng py KiB':>11} {'max abs diff':>13}")
+    for spec in args.sizes.split(","):
+        width, height = (int(v) for v in spec.lower().split("x"))
+        data = make_jpeg(width, height)
+
+        ref_ms, ref_peak = _measure(lambda: reference_preprocess(data), args.iterations)
+        eng_ms, eng_peak = _measure(lambda: engine.process(data), args.iterations)
+        diff = float(np.abs(reference_preprocess(data) - engine.process(data)).max())
+
+        print(f"{spec:>10} {ref_ms:>13.2f} {eng_ms:>10.2f} {ref_ms / eng_ms:>7.1f}x {ref_peak:>11.0f} {eng_peak:>11.0f} {diff:>13.4f}")
+
+    batch = [make_jpeg(1600, 1200, seed) for seed in range(8)]
+    out = np.empty((len(batch), 3, 224, 224), dtype=np.float32)
+    batch_ms, _ = _measure(lambda: engine.process_batch(batch, out=out), max(1, args.iterations // 5))
+    print(f"process_batch(8 x 1600x1200): {batch_ms:.2f} ms ({batch_ms / len(batch):.2f} ms/image)")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,12 +24,96 @@ class Settings(BaseSettings):
     
     # Image upload
     max_image_size_mb: int = 10
+    batch_detect_max_images: int = 50  # per /api/detect-images request
     allowed_image_types: str = "image/jpeg,image/png"
+
+    # Async detection jobs (/api/detect-image?async_job=true, poll /api/detect-jobs/{id})
+    detection_jobs_max_queue: int = 100  # 503 once this many jobs are waiting
+    detection_jobs_workers: int = 4
+    detection_jobs_result_ttl_seconds: int = 600
     
     # ML Model
     use_mock_inference: bool = True
     model_path: Optional[str] = None
     confidence_threshold: float = 0.5
+
+    # Mock inference latency (capacity testing): "none", "sleep" or "cpu"
+    mock_latency_mode: str = "none"
+    mock_latency_profile: Optional[str] = None  # JSON recorded with app.services.mock_latency
+    mock_latency_ms: float = 0.0  # fixed per-image latency when no profile is set
+
+    # Real model backend (when mock is off): "pipeline" (transformers) or "onnx"
+    inference_backend: str = "pipeline"
+    onnx_model_dir: str = "data/models/onnx"  # one export subdirectory per model id
+    onnx_quantize_int8: bool = True
+    onnx_intra_op_threads: int = 0  # 0 = ONNX Runtime default
+    onnx_inter_op_threads: int = 1
+
+    # Model cascade: fast tier first, full model only below the threshold
+    inference_cascade_enabled: bool = False
+    cascade_fast_backend: str = "onnx"
+    cascade_fast_model_id: Optional[str] = None  # default: full tier model, so only with another backend
+    cascade_fast_model_dir: Optional[str] = None
+    cascade_confidence_threshold: Optional[float] = None  # default: confidence_threshold
+
+    # Model warm-up at startup (readiness stays false until done)
+    model_warmup_in_background: bool = True
+    model_warmup_passes: int = 3
+
+    # Tiled inference for large photos (?tiled=true on /api/detect-image)
+    tiled_tile_size: int = 640  # tile edge in source pixels
+    tiled_overlap: float = 0.25
+    tiled_max_tiles: int = 16  # caps model work per request
+    tiled_min_std: float = 8.0  # grayscale std below which a tile is background
+    tiled_input_size: int = 256  # tiles are resized to this before inference
+
+    # Inference executor: "inline", "thread" or "process"
+    # (inline runs batches on the event loop, blocking other requests)
+    inference_executor: str = "thread"
+    inference_workers: int = 2
+    inference_threads_per_worker: int = 1
+
+    # Detection result cache (repeated uploads skip inference)
+    detection_cache_enabled: bool = True
+    detection_cache_max_entries: int = 1024
+    detection_cache_ttl_seconds: int = 3600
+    detection_cache_phash_enabled: bool = False
+    detection_cache_phash_max_distance: int = 4
+
+    # Inference batching (coalesce concurrent predict calls)
+    inference_batching_enabled: bool = True
+    inference_batch_max_size: int = 8
+    inference_batch_max_wait_ms: float = 10.0
+
+    # Ollama advisories, cached per (disease, language, prompt version)
+    advisory_backend: str = "http"  # "http" (Ollama server API, streamed) or "cli" (ollama run subprocess)
+    ollama_url: str = "http://localhost:11434"
+    ollama_command: str = "ollama"
+    ollama_model: str = "llama3.1:8b"
+    ollama_timeout_seconds: float = 30.0  # per request
+    ollama_max_concurrency: int = 2  # generations in flight, process-wide
+    ollama_queue_timeout_seconds: float = 10.0  # max wait for a free slot
+    ollama_max_tokens: int = 512
+    advisory_cache_enabled: bool = True
+    advisory_cache_max_entries: int = 256
+    advisory_cache_persist: bool = True
+    advisory_cache_dir: str = "data/cache/advisories"  # relative to the app package
+    advisory_prewarm_enabled: bool = True
+    advisory_prewarm_languages: str = "en"  # comma-separated
+
+    # Remedies knowledge base (versioned JSON files, languages loaded on first use)
+    remedies_dir: str = "data/remedies"  # relative to the app package
+    remedies_watch_interval_seconds: float = 30.0  # reload on file changes; 0 = off
+
+    # Nearby-alert fan-out: in-memory grid of notifiable users per worker
+    user_index_enabled: bool = True
+    user_index_reconcile_seconds: float = 300.0  # rebuild from the DB (other workers' registrations)
+
+    # Nearby outbreak summaries (from the hourly detection rollups)
+    outbreak_min_reports: int = 10  # reports of one disease in the area and window that flag an outbreak
+
+    # Admin API (model deploy/activate); unset = admin endpoints return 403
+    admin_token: Optional[str] = None
     
     # LLM (optional)
     openai_api_key: Optional[str] = None
@@ -5,12 +5,21 @@ All persistent data for the application is managed through these models:
 - DiseaseSearch: Search history of diseases for users to review
 - User: Device/user profiles for push notifications (optional, for future expansion)
 - SentAlert: Tracking of alerts sent to users (optional, for future expansion)
+- DetectionDailyRollup: Per-cell, per-disease daily counts for disease maps
+- DetectionHourlyRollup: Per-cell, per-disease, per-crop hourly counts for analytics
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Integer, Boolean, ForeignKey, func
+from sqlalchemy import BigInteger, Column, Date, String, Float, DateTime, Index, Integer, Boolean, ForeignKey, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .session import Base
+from ..utils.geo_grid import cell_id
+
+
+def _geo_cell_default(context) -> int:
+    """Grid cell from the inserted latitude/longitude (also for bulk inserts)."""
+    params = context.get_current_parameters()
+    return cell_id(params.get("latitude"), params.get("longitude"))
 
 
 class DetectionEvent(Base):
@@ -31,8 +40,15 @@ class DetectionEvent(Base):
     confidence = Column(Float, nullable=False)
     latitude = Column(Float, nullable=True, index=True)
     longitude = Column(Float, nullable=True, index=True)
+    # Grid cell at geo_grid.CELL_LEVEL, set from latitude/longitude on insert
+    geo_cell = Column(BigInteger, nullable=True, default=_geo_cell_default)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
+    __table_args__ = (
+        # Radius queries: cell ranges, newest first
+        Index("ix_detection_events_geo_cell_created_at", "geo_cell", "created_at"),
+    )
+
 
 class User(Base):
     """
@@ -105,3 +121,50 @@ class SentAlert(Base):
 
     # Relationship back to user
     user = relationship("User", back_populates="sent_alerts")
+
+
+class DetectionDailyRollup(Base):
+    """
+    Detection counts per grid cell, disease and UTC day.
+
+    Maintained on write by RollupRepository (same transaction as the
+    events) so disease maps read a few rollup rows instead of scanning
+    detection_events.
+    """
+
+    __tablename__ = "detection_daily_rollups"
+
+    # Grid cell at rollup_repository.MAP_ROLLUP_LEVEL (geo_grid ids)
+    cell = Column(BigInteger, primary_key=True)
+    disease = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Time-window maps over many cells
+        Index("ix_detection_daily_rollups_day", "day"),
+    )
+
+
+class DetectionHourlyRollup(Base):
+    """
+    Detection counts and confidence sums per grid cell, disease, crop and UTC hour.
+
+    Maintained on write alongside DetectionDailyRollup. Used for nearby
+    outbreak summaries and trend charts (average confidence is
+    confidence_sum / count).
+    """
+
+    __tablename__ = "detection_hourly_rollups"
+
+    # Grid cell at rollup_repository.ANALYTICS_ROLLUP_LEVEL (geo_grid ids)
+    cell = Column(BigInteger, primary_key=True)
+    disease = Column(String, primary_key=True)
+    crop = Column(String, primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_detection_hourly_rollups_hour", "hour"),
+    )
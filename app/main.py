@@ -6,16 +6,25 @@ FastAPI app with detection endpoints, database setup, ML model integration.
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import time as _time
 
 from app.config import settings
-from app.db.session import engine, Base
+from app.db.session import AsyncSessionLocal, engine, Base
 from sqlalchemy import text
-from app.services.ml_service import load_models
-from app.services.remedy_service import load_remedies
+from app.services.ml_service import models_ready, shutdown_models, warm_up_models
+from app.services.detection_jobs import get_detection_jobs
+from app.services.detection_repository import DetectionRepository
+from app.services.advisory_cache import prewarm_advisories
+from app.services.ollama_client import close_ollama_client
+from app.services.remedy_service import load_remedies, watch_remedies
+from app.services.user_index import watch_user_index
 from app.api.detection import router as detection_router
 from app.api.chat import router as chat_router
+from app.api.inference import router as inference_router
+from app.api.admin import router as admin_router
+from app.utils.upload import MULTIPART_OVERHEAD_BYTES, UploadSizeLimitMiddleware, max_upload_bytes
 
 APP_VERSION = "0.1.0"
 
@@ -42,6 +51,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before the multipart body is parsed
+UPLOAD_PATHS = ("/api/detect-image", "/api/scan-treatment")
+app.add_middleware(UploadSizeLimitMiddleware, path_prefixes=UPLOAD_PATHS)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefixes=("/api/detect-images",),
+    max_body_bytes=settings.batch_detect_max_images * (max_upload_bytes() + MULTIPART_OVERHEAD_BYTES),
+)
+
+
+# Columns and indexes added after tables were first created (create_all skips existing tables)
+_SCHEMA_UPGRADES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS language VARCHAR",
+    "ALTER TABLE detection_events ADD COLUMN IF NOT EXISTS geo_cell BIGINT",
+    "CREATE INDEX IF NOT EXISTS ix_detection_events_geo_cell_created_at ON detection_events (geo_cell, created_at)",
+]
+
 
 @app.on_event("startup")
 async def on_startup() -> None:
@@ -55,19 +81,28 @@ async def on_startup() -> None:
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
-            await conn.execute(
-                text("ALTER TABLE users ADD COLUMN IF NOT EXISTS language VARCHAR")
-            )
         logger.info("Database initialized")
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
+    for statement in _SCHEMA_UPGRADES:
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(statement))
+        except Exception as e:
+            logger.error(f"Database initialization error: {e}")
+    app.state.geo_cell_backfill = asyncio.create_task(_backfill_geo_cells())
     
-    # Load ML models
-    try:
-        load_models()
-        logger.info("ML models loaded")
-    except Exception as e:
-        logger.warning(f"ML model loading error: {e}")
+    # Notifiable users for nearby alerts (loaded now, reconciled periodically)
+    if settings.user_index_enabled:
+        app.state.user_index_watcher = asyncio.create_task(
+            watch_user_index(settings.user_index_reconcile_seconds, AsyncSessionLocal)
+        )
+    
+    # Load and warm ML models (in the background so the worker starts serving)
+    if settings.model_warmup_in_background:
+        app.state.model_warmup = asyncio.create_task(_warm_up_models())
+    else:
+        await _warm_up_models()
     
     # Load remedies
     try:
@@ -75,12 +110,52 @@ async def on_startup() -> None:
         logger.info("Remedies loaded")
     except Exception as e:
         logger.warning(f"Remedies loading error: {e}")
+    if settings.remedies_watch_interval_seconds > 0:
+        app.state.remedies_watcher = asyncio.create_task(
+            watch_remedies(settings.remedies_watch_interval_seconds)
+        )
+
+
+async def _backfill_geo_cells() -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            updated = await DetectionRepository.backfill_geo_cells(session)
+        if updated:
+            logger.info(f"Backfilled geo_cell for {updated} detection events")
+    except Exception as e:
+        logger.warning(f"geo_cell backfill error: {e}")
+
+
+async def _warm_up_models() -> None:
+    try:
+        await asyncio.to_thread(warm_up_models)
+    except Exception as e:
+        logger.warning(f"ML model loading error: {e}")
+        return
+
+    # Advisories for every model class; may take minutes, so never block startup
+    if settings.advisory_cache_enabled and settings.advisory_prewarm_enabled:
+        app.state.advisory_prewarm = asyncio.create_task(_prewarm_advisories())
+
+
+async def _prewarm_advisories() -> None:
+    try:
+        await prewarm_advisories()
+    except Exception as e:
+        logger.warning(f"Advisory prewarm error: {e}")
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
     """Cleanup on shutdown."""
     logger.info("Shutting down ArogyaKrishi backend")
+    for name in ("remedies_watcher", "user_index_watcher"):
+        watcher = getattr(app.state, name, None)
+        if watcher is not None:
+            watcher.cancel()
+    await get_detection_jobs().stop()
+    await close_ollama_client()
+    await shutdown_models()
     await engine.dispose()
 
 
@@ -91,10 +166,19 @@ async def health() -> JSONResponse:
     uptime = None
     if start:
         uptime = round(_time.time() - start, 2)
-    payload = {"status": "ok", "uptime_seconds": uptime}
+    payload = {"status": "ok", "uptime_seconds": uptime, "model_ready": models_ready()}
     return JSONResponse(content=payload)
 
 
+@app.get("/ready", response_class=JSONResponse)
+async def ready() -> JSONResponse:
+    """Readiness probe: 503 until the ML model is loaded and warmed up."""
+    is_ready = models_ready()
+    payload = {"ready": is_ready}
+    code = status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(content=payload, status_code=code)
+
+
 @app.get("/version", response_class=JSONResponse, status_code=status.HTTP_200_OK)
 async def version() -> JSONResponse:
     """Return application version."""
@@ -105,5 +189,7 @@ async def version() -> JSONResponse:
 # Include routers
 app.include_router(detection_router)
 app.include_router(chat_router)
+app.include_router(inference_router)
+app.include_router(admin_router)
 
 __all__ = ["app"]
@@ -1,10 +1,32 @@
 """Pydantic models for API requests/responses."""
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
+class TilePrediction(BaseModel):
+    """Prediction for one tile of a tiled detection (English keys)."""
+    x: int
+    y: int
+    width: int
+    height: int
+    crop: str
+    disease: str
+    confidence: float
+
+
+class TileHeatmap(BaseModel):
+    """Per-tile results of a tiled detection."""
+    image_width: int
+    image_height: int
+    tile_size: int
+    tiles_total: int
+    tiles_skipped: int
+    tiles_dropped: int
+    tiles: List[TilePrediction]
+
+
 class DetectImageResponse(BaseModel):
     """Response model for /detect-image endpoint."""
     crop: str
@@ -12,6 +34,19 @@ class DetectImageResponse(BaseModel):
     confidence: float
     remedies: List[str]
     language: str
+    tiles: Optional[TileHeatmap] = None
+
+
+class DetectJobResponse(BaseModel):
+    """Response model for async detection jobs."""
+    job_id: str
+    status: str  # queued, running, done, failed
+    result: Optional[DetectImageResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    poll_url: Optional[str] = None
 
 
 class DiseaseSearchItem(BaseModel):
@@ -44,6 +79,61 @@ class NearbyAlertsResponse(BaseModel):
     alerts: List[AlertData]
 
 
+class DiseaseMapCell(BaseModel):
+    """Detections of one disease in one grid cell."""
+    cell: int
+    latitude: float
+    longitude: float
+    disease: str
+    count: int
+
+
+class DiseaseMapResponse(BaseModel):
+    """Response model for /disease-map endpoint."""
+    level: int
+    cell_size_deg: float
+    since: str
+    cells: List[DiseaseMapCell]
+
+
+class AreaDiseaseSummary(BaseModel):
+    """Reports of one disease around a location."""
+    disease: str
+    count: int
+    avg_confidence: float
+    crops: Dict[str, int]
+    last_seen: datetime
+    outbreak: bool
+
+
+class NearbySummaryResponse(BaseModel):
+    """Response model for /nearby-alerts/summary endpoint."""
+    radius_km: float
+    since: datetime
+    diseases: List[AreaDiseaseSummary]
+
+
+class TrendPoint(BaseModel):
+    """Reports in one time bucket."""
+    start: datetime
+    count: int
+    avg_confidence: float
+
+
+class DiseaseTrend(BaseModel):
+    """Time series of one disease."""
+    disease: str
+    points: List[TrendPoint]
+
+
+class DiseaseTrendsResponse(BaseModel):
+    """Response model for /disease-trends endpoint."""
+    bucket: str
+    radius_km: float
+    since: datetime
+    series: List[DiseaseTrend]
+
+
 class ScanTreatmentResponse(BaseModel):
     """Response model for /scan-treatment endpoint."""
     disease: str
@@ -83,3 +173,17 @@ class RegisterDeviceRequest(BaseModel):
 class RegisterDeviceResponse(BaseModel):
     """Response model for /register-device endpoint."""
     ok: bool
+
+
+class ModelDeployRequest(BaseModel):
+    """Request model for deploying a new model version."""
+    version: str
+    backend: Optional[str] = None  # "mock", "pipeline" or "onnx"
+    model_id: Optional[str] = None
+    model_dir: Optional[str] = None
+    activate: bool = True
+    # Set fast_backend to serve this version as a cascade (fast tier + the model above)
+    fast_backend: Optional[str] = None
+    fast_model_id: Optional[str] = None
+    fast_model_dir: Optional[str] = None
+    cascade_threshold: Optional[float] = None
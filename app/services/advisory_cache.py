@@ -0,0 +1,346 @@
+"""
+Two-level cache for LLM disease advisories.
+
+The advisory prompt only depends on the disease name, the language and the
+prompt template, so generated texts are cached under that key:
+- an in-memory LRU for the hot set;
+- a persistent on-disk store (one JSON file per entry, written atomically)
+  that survives restarts and is shared by all workers on the host.
+
+Concurrent misses for the same key are single-flighted: one caller
+generates, the others wait for its result. Failed generations (the
+fallback text) are not cached. astream() yields the tokens of a miss as they
+are generated (a hit is one chunk). prewarm() generates every known class
+label ahead of time, typically in a background task at startup.
+
+Exports:
+- AdvisoryCache, AdvisoryUnavailable
+- get_advisory_cache(): process-wide cache
+- prewarm_advisories(): prewarm every class of the active model
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Generator returns the advisory text, or None when generation failed
+Generator = Callable[[str, str], Optional[str]]
+# Streamer yields the advisory tokens and raises when generation fails
+Streamer = Callable[[str, str], AsyncIterator[str]]
+
+
+class AdvisoryUnavailable(Exception):
+    """Advisory generation failed (the caller should use the fallback text)."""
+
+
+def default_cache_dir() -> Path:
+    path = Path(settings.advisory_cache_dir)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent / path
+    return path
+
+
+class AdvisoryCache:
+    """LRU + on-disk cache of advisories with single-flight generation.
+
+    Args:
+        generate: Callable (disease_name, language) -> text or None.
+        stream: Optional async token streamer (disease_name, language) used
+            by astream()/aget(); without it they run generate in a thread.
+        prompt_version: Part of the key; bump it when the prompt changes.
+        max_entries: In-memory LRU size.
+        directory: On-disk store (None disables persistence).
+    """
+
+    def __init__(
+        self,
+        generate: Generator,
+        prompt_version: str,
+        max_entries: int = 256,
+        directory: Optional[Path] = None,
+        stream: Optional[Streamer] = None,
+    ):
+        self.generate = generate
+        self.stream = stream
+        self.prompt_version = prompt_version
+        self.max_entries = max(1, int(max_entries))
+        self.directory = Path(directory) if directory is not None else None
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._shared_waits = 0
+        self._failures = 0
+
+    # -----------------------------------
+    # Public API
+    # -----------------------------------
+    def get(self, disease_name: str, language: str = "en") -> Optional[str]:
+        """Cached advisory text, generating it on a miss. None if generation failed."""
+        key = self._key(disease_name, language)
+        with self._lock:
+            text = self._memory_get(key)
+            if text is not None:
+                self._memory_hits += 1
+                return text
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self._shared_waits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            text = self._load(key)
+            if text is not None:
+                self._disk_hits += 1
+            else:
+                self._misses += 1
+                text = self.generate(disease_name, language)
+                if text is None:
+                    self._failures += 1
+                else:
+                    self._store(key, disease_name, language, text)
+            if text is not None:
+                with self._lock:
+                    self._memory_put(key, text)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget(self, disease_name: str, language: str = "en") -> Optional[str]:
+        """get() without blocking the event loop."""
+        if self.stream is None:
+            return await asyncio.to_thread(self.get, disease_name, language)
+        try:
+            return "".join([token async for token in self.astream(disease_name, language)])
+        except AdvisoryUnavailable:
+            return None
+
+    async def astream(self, disease_name: str, language: str = "en") -> AsyncIterator[str]:
+        """
+        Yield the advisory: one chunk on a hit, tokens as generated on a miss.
+        Raises AdvisoryUnavailable if generation fails (possibly after some tokens).
+        """
+        if self.stream is None:
+            text = await self.aget(disease_name, language)
+            if text is None:
+                raise AdvisoryUnavailable(f"No advisory for {disease_name}")
+            yield text
+            return
+
+        key = self._key(disease_name, language)
+        with self._lock:
+            text = self._memory_get(key)
+            if text is not None:
+                self._memory_hits += 1
+            else:
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+                else:
+                    self._shared_waits += 1
+        if text is not None:
+            yield text
+            return
+
+        if not owner:
+            try:
+                text = await asyncio.wrap_future(future)
+            except Exception as e:
+                raise AdvisoryUnavailable(str(e)) from e
+            if text is None:
+                raise AdvisoryUnavailable(f"No advisory for {disease_name}")
+            yield text
+            return
+
+        try:
+            text = await asyncio.to_thread(self._load, key)
+            if text is not None:
+                self._disk_hits += 1
+                yield text
+            else:
+                self._misses += 1
+                parts = []
+                try:
+                    async for token in self.stream(disease_name, language):
+                        parts.append(token)
+                        yield token
+                except Exception as e:
+                    self._failures += 1
+                    future.set_result(None)
+                    raise AdvisoryUnavailable(str(e)) from e
+                text = "".join(parts).strip()
+                if not text:
+                    self._failures += 1
+                    future.set_result(None)
+                    raise AdvisoryUnavailable(f"Empty advisory for {disease_name}")
+                await asyncio.to_thread(self._store, key, disease_name, language, text)
+            with self._lock:
+                self._memory_put(key, text)
+            future.set_result(text)
+        except BaseException as e:
+            # Consumer went away mid-stream, or an unexpected error
+            if not future.done():
+                future.set_exception(e if isinstance(e, Exception) else AdvisoryUnavailable("Generation abandoned"))
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def prewarm(self, disease_names: Iterable[str], languages: Iterable[str] = ("en",)) -> Dict:
+        """
+        Generate every (disease, language) not cached yet.
+
+        Stops at the first failed generation: the backend is most likely
+        missing or down, and the remaining entries fill in on demand.
+        """
+        started = time.perf_counter()
+        generated = 0
+        failed = None
+        languages = list(languages)
+        for disease_name in disease_names:
+            for language in languages:
+                before = self._misses
+                if await self.aget(disease_name, language) is None:
+                    failed = f"{disease_name} ({language})"
+                    break
+                if self._misses > before:
+                    generated += 1
+            if failed is not None:
+                break
+        report = {"generated": generated, "failed": failed, "seconds": round(time.perf_counter() - started, 3)}
+        logger.info(f"Advisory cache prewarmed: {report}")
+        return report
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "prompt_version": self.prompt_version,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "directory": str(self.directory) if self.directory is not None else None,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "shared_waits": self._shared_waits,
+            "failures": self._failures,
+        }
+
+    # -----------------------------------
+    # Internals
+    # -----------------------------------
+    def _key(self, disease_name: str, language: str) -> str:
+        return f"{self.prompt_version}|{language}|{disease_name.strip().casefold()}"
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        text = self._memory.get(key)
+        if text is not None:
+            self._memory.move_to_end(key)
+        return text
+
+    def _memory_put(self, key: str, text: str) -> None:
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable advisory cache entry {path}: {e}")
+            return None
+        return entry.get("text") if entry.get("key") == key else None
+
+    def _store(self, key: str, disease_name: str, language: str, text: str) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+        entry = {
+            "key": key,
+            "disease": disease_name,
+            "language": language,
+            "prompt_version": self.prompt_version,
+            "created_at": time.time(),
+            "text": text,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(entry, handle, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not persist advisory cache entry: {e}")
+
+
+# -----------------------------------
+# Singleton
+# -----------------------------------
+_advisory_cache: Optional[AdvisoryCache] = None
+_singleton_lock = threading.Lock()
+
+
+def get_advisory_cache() -> AdvisoryCache:
+    global _advisory_cache
+    if _advisory_cache is None:
+        with _singleton_lock:
+            if _advisory_cache is None:
+                from .disease_detection import ADVISORY_PROMPT_VERSION, generate_advisory, stream_advisory_tokens
+
+                _advisory_cache = AdvisoryCache(
+                    generate=generate_advisory,
+                    prompt_version=ADVISORY_PROMPT_VERSION,
+                    max_entries=settings.advisory_cache_max_entries,
+                    directory=default_cache_dir() if settings.advisory_cache_persist else None,
+                    stream=stream_advisory_tokens,
+                )
+    return _advisory_cache
+
+
+async def prewarm_advisories() -> Dict:
+    """Generate advisories for every class of the active model in the configured languages."""
+    from .disease_detection import known_disease_names
+
+    languages = [code.strip() for code in settings.advisory_prewarm_languages.split(",") if code.strip()]
+    names = await asyncio.to_thread(known_disease_names)
+    return await get_advisory_cache().prewarm(names, languages or ["en"])
@@ -13,11 +13,10 @@ from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.user import User
 from app.models.sent_alert import SentAlert
 from app.models.detection_event import DetectionEvent
 from app.services.notification_service import send_push_notification
-from app.utils.geo import haversine_km
+from app.services.user_repository import UserRepository
 
 
 # Notification message constants
@@ -49,26 +48,16 @@ async def process_detection_event(event: DetectionEvent, session: AsyncSession)
     now = datetime.now(timezone.utc)
     cutoff = now - timedelta(hours=24)
 
-    # Load all users who have notifications enabled
-    stmt = select(User).where(User.notifications_enabled.is_(True))
-    result = await session.execute(stmt)
-    users = result.scalars().all()
+    if event.latitude is None or event.longitude is None:
+        return
+
+    # Notifiable users (enabled, with a device token) within 2 km, from the user index
+    users = await UserRepository.get_notifiable_users_near(
+        session, event.latitude, event.longitude, radius_km=2.0
+    )
 
     # Loop through candidates and process each one
     for user in users:
-        # Must have a device token to receive push
-        if not user.device_token:
-            continue
-
-        # Compute distance (in km) using the Haversine formula
-        distance_km = haversine_km(
-            event.latitude, event.longitude, user.latitude, user.longitude
-        )
-
-        # Skip users outside the 2 km radius
-        if distance_km > 2.0:
-            continue
-
         # Check if we've already sent an alert for this disease to this user in the last 24 hours
         dup_stmt = (
             select(SentAlert)
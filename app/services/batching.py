@@ -0,0 +1,202 @@
+"""
+Dynamic micro-batching scheduler for model inference.
+
+Concurrent predict calls are queued and collected for up to ``max_wait_ms``
+(or until ``max_batch_size`` items are waiting), then run as a single batched
+forward pass. Each caller awaits its own future and receives only its result.
+
+Exports:
+- BatchScheduler: asyncio scheduler wrapping an async ``batch_fn(items) -> results``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BatchFn = Callable[[List[Any]], Awaitable[List[Any]]]
+
+# Number of recent per-item wait times kept for percentile reporting
+_WAIT_SAMPLES = 1024
+
+
+@dataclass
+class _PendingItem:
+    payload: Any
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchScheduler:
+    """Collect concurrent requests into batches for one model call.
+
+    Args:
+        batch_fn: Async callable taking a list of payloads and returning a list
+            of results in the same order.
+        max_batch_size: Maximum number of items dispatched in one batch.
+        max_wait_ms: Maximum time the oldest queued item waits for companions.
+        max_concurrent_batches: Batches allowed in flight at the same time
+            (raise this when the backend has several workers).
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 1,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+
+        # Metrics
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._histogram: Dict[int, int] = {}
+        self._waits_ms: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._in_flight = 0
+
+    # -----------------------------------
+    # Public API
+    # -----------------------------------
+    async def submit(self, payload: Any) -> Any:
+        """Queue one payload and wait for its result."""
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        item = _PendingItem(payload=payload, future=loop.create_future())
+        await self._queue.put(item)
+        return await item.future
+
+    async def stop(self) -> None:
+        """Stop the dispatcher and fail any requests still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if not item.future.done():
+                    item.future.set_exception(RuntimeError("Batch scheduler stopped"))
+            self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch-size histogram and wait-time figures."""
+        waits = sorted(self._waits_ms)
+
+        def _pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            index = min(len(waits) - 1, int(round(p * (len(waits) - 1))))
+            return round(waits[index], 3)
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000.0, 3),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight_batches": self._in_flight,
+            "batches": self._batches,
+            "items": self._items,
+            "errors": self._errors,
+            "avg_batch_size": round(self._items / self._batches, 3) if self._batches else None,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._histogram.items())},
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else None,
+                "p50": _pct(0.50),
+                "p95": _pct(0.95),
+                "max": round(waits[-1], 3) if waits else None,
+            },
+        }
+
+    # -----------------------------------
+    # Internals
+    # -----------------------------------
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def _collect(self) -> List[_PendingItem]:
+        """Wait for the first item, then gather more until size or deadline."""
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Drop callers that went away while waiting (client disconnects)
+        return [item for item in batch if not item.future.done()]
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[_PendingItem]) -> None:
+        dispatched_at = time.perf_counter()
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._histogram[size] = self._histogram.get(size, 0) + 1
+        for item in batch:
+            self._waits_ms.append((dispatched_at - item.enqueued_at) * 1000.0)
+
+        self._in_flight += 1
+        try:
+            results = await self.batch_fn([item.payload for item in batch])
+            if len(results) != size:
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {size} inputs"
+                )
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Batched inference failed (size={size}): {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
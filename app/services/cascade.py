@@ -0,0 +1,213 @@
+"""
+Confidence-gated model cascade.
+
+A cheap fast tier (e.g. the int8 ONNX export or a smaller checkpoint) runs on
+every image; only images whose top-1 confidence is below the threshold are
+escalated to the full model. CascadeLoader has the same interface as
+ModelLoader, so the registry and batch scheduler serve it unchanged.
+
+Exports:
+- CascadeLoader
+- build_cascade_loader(): cascade from settings (or explicit tier options)
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[str, float, str]
+
+_LATENCY_SAMPLES = 1024
+
+
+class _TierStats:
+    """Call/item counters and recent per-image latency for one tier."""
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+        self._latencies_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def record(self, items: int, seconds: float) -> None:
+        self.calls += 1
+        self.items += items
+        self.seconds += seconds
+        self._latencies_ms.append(seconds * 1000.0 / max(1, items))
+
+    def stats(self) -> Dict:
+        latencies = sorted(self._latencies_ms)
+
+        def _pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))], 3)
+
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "busy_seconds": round(self.seconds, 3),
+            "ms_per_image": {"p50": _pct(0.50), "p95": _pct(0.95)},
+        }
+
+
+class CascadeLoader:
+    """Fast model first, full model only when the fast tier is unsure.
+
+    Args:
+        fast: Loader for the cheap tier.
+        full: Loader for the full model.
+        threshold: Fast-tier confidence below which an image is escalated
+            (default: settings.cascade_confidence_threshold, falling back
+            to settings.confidence_threshold).
+    """
+
+    def __init__(self, fast, full, threshold: Optional[float] = None):
+        self.fast = fast
+        self.full = full
+        self._threshold = threshold
+        self.use_mock = fast.use_mock and full.use_mock
+        self._lock = threading.Lock()
+        self._tiers = {"fast": _TierStats(), "full": _TierStats()}
+        self._images = 0
+        self._escalated = 0
+
+    @property
+    def threshold(self) -> float:
+        if self._threshold is not None:
+            return self._threshold
+        if settings.cascade_confidence_threshold is not None:
+            return settings.cascade_confidence_threshold
+        return settings.confidence_threshold
+
+    def options(self) -> Dict:
+        return {
+            "cascade": True,
+            "threshold": self.threshold,
+            "fast": self.fast.options(),
+            "full": self.full.options(),
+        }
+
+    def labels(self) -> List[str]:
+        return self.full.labels()
+
+    def load_model(self) -> None:
+        self.fast.load_model()
+        self.full.load_model()
+
+    def warm_up(self, passes: int = 3) -> None:
+        self.fast.warm_up(passes)
+        self.full.warm_up(passes)
+
+    def close(self) -> None:
+        self.fast.close()
+        self.full.close()
+
+    def predict(self, image_bytes: bytes) -> Prediction:
+        return self.predict_batch([image_bytes])[0]
+
+    def predict_batch(self, images: List[bytes]) -> List[Prediction]:
+        started = time.perf_counter()
+        results = self.fast.predict_batch(images)
+        self._record("fast", len(images), time.perf_counter() - started)
+
+        escalate = self._to_escalate(results)
+        if escalate:
+            started = time.perf_counter()
+            full = self.full.predict_batch([images[i] for i in escalate])
+            self._record("full", len(escalate), time.perf_counter() - started)
+            results = self._merge(results, escalate, full)
+        self._count(len(images), len(escalate))
+        return results
+
+    async def apredict_batch(self, images: List[bytes]) -> List[Prediction]:
+        started = time.perf_counter()
+        results = await self.fast.apredict_batch(images)
+        self._record("fast", len(images), time.perf_counter() - started)
+
+        escalate = self._to_escalate(results)
+        if escalate:
+            started = time.perf_counter()
+            full = await self.full.apredict_batch([images[i] for i in escalate])
+            self._record("full", len(escalate), time.perf_counter() - started)
+            results = self._merge(results, escalate, full)
+        self._count(len(images), len(escalate))
+        return results
+
+    def stats(self) -> Dict:
+        """Escalation rate and per-tier latency."""
+        return {
+            "threshold": self.threshold,
+            "images": self._images,
+            "escalated": self._escalated,
+            "escalation_rate": round(self._escalated / self._images, 4) if self._images else None,
+            "tiers": {name: tier.stats() for name, tier in self._tiers.items()},
+        }
+
+    def _to_escalate(self, results: List[Prediction]) -> List[int]:
+        threshold = self.threshold
+        return [index for index, (_, confidence, _) in enumerate(results) if confidence < threshold]
+
+    @staticmethod
+    def _merge(results: List[Prediction], escalate: List[int], full: List[Prediction]) -> List[Prediction]:
+        merged = list(results)
+        for index, prediction in zip(escalate, full):
+            merged[index] = prediction
+        return merged
+
+    def _record(self, tier: str, items: int, seconds: float) -> None:
+        with self._lock:
+            self._tiers[tier].record(items, seconds)
+
+    def _count(self, images: int, escalated: int) -> None:
+        with self._lock:
+            self._images += images
+            self._escalated += escalated
+
+
+def build_cascade_loader(
+    full_options: Optional[Dict] = None,
+    fast_options: Optional[Dict] = None,
+    threshold: Optional[float] = None,
+) -> CascadeLoader:
+    """Cascade whose tiers are ModelLoaders (fast tier from the cascade_fast_* settings).
+
+    Raises ValueError when both tiers would serve the same model: every
+    escalated image would then run the same inference twice.
+    """
+    from .ml_service import ModelLoader
+
+    if fast_options is None:
+        fast_options = {
+            "backend": "mock" if settings.use_mock_inference else settings.cascade_fast_backend,
+            "model_id": settings.cascade_fast_model_id,
+            "model_dir": settings.cascade_fast_model_dir,
+        }
+    full = ModelLoader(**(full_options or {}))
+    fast = ModelLoader(**fast_options)
+    if fast.backend != "mock" and _served_model(fast) == _served_model(full):
+        raise ValueError(
+            f"Cascade fast tier is the same model as the full tier ({fast.backend} {_served_model(fast)[1]}); "
+            "set a smaller fast model id (or a different backend) for the fast tier"
+        )
+    logger.info(f"Model cascade: fast={fast.options()} full={full.options()}")
+    return CascadeLoader(fast, full, threshold=threshold)
+
+
+def _served_model(loader) -> Tuple[str, str, Optional[str]]:
+    """Backend, model id and ONNX export directory a loader serves, defaults resolved."""
+    from .disease_detection import MODEL_ID
+    from .onnx_backend import default_model_dir
+
+    model_id = loader.model_id or MODEL_ID
+    model_dir = None
+    if loader.backend == "onnx":
+        model_dir = str(loader.model_dir or default_model_dir(model_id))
+    return loader.backend, model_id, model_dir
@@ -0,0 +1,258 @@
+"""
+Asynchronous detection jobs.
+
+With async mode a detect request returns a job id immediately; a bounded
+in-process queue feeds worker tasks that run the regular
+DetectionService.detect_disease flow, and the client polls for the result.
+Admission control rejects new jobs once the queue is full, finished results
+are kept for a TTL, and a retried upload (same image and parameters) is
+attached to the existing job instead of being processed again.
+
+Exports:
+- DetectionJobQueue, DetectionJob
+- JobQueueFull
+- get_detection_jobs(): process-wide queue
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import heapq
+import logging
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+@dataclass
+class DetectionJob:
+    id: str
+    key: str
+    params: Dict
+    image_bytes: Optional[bytes]
+    status: str = "queued"  # queued, running, done, failed
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class DetectionJobQueue:
+    """Bounded queue of detection jobs processed by asyncio worker tasks.
+
+    Args:
+        max_queue: Jobs allowed to wait; submit() raises JobQueueFull beyond it.
+        workers: Concurrent worker tasks.
+        result_ttl_seconds: How long finished jobs stay retrievable.
+    """
+
+    def __init__(self, max_queue: int = 100, workers: int = 4, result_ttl_seconds: float = 600.0):
+        self.max_queue = max(1, int(max_queue))
+        self.workers = max(1, int(workers))
+        self.result_ttl_seconds = float(result_ttl_seconds)
+
+        self._jobs: Dict[str, DetectionJob] = {}
+        self._by_key: Dict[str, str] = {}
+        # (expires_at, job id) of finished jobs, soonest first
+        self._deadlines: List[Tuple[float, str]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self._submitted = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._avg_job_seconds: Optional[float] = None
+
+    # -----------------------------------
+    # Public API
+    # -----------------------------------
+    def submit(self, image_bytes: bytes, **params) -> DetectionJob:
+        """Queue a detection, or return the live job for an identical retry."""
+        self._ensure_started()
+        self._expire()
+
+        key = self._key_for(image_bytes, params)
+        existing = self._jobs.get(self._by_key.get(key, ""))
+        if existing is not None and existing.status != "failed":
+            self._deduplicated += 1
+            return existing
+
+        if self._queue.qsize() >= self.max_queue:
+            self._rejected += 1
+            raise JobQueueFull(f"Detection queue is full ({self.max_queue} jobs waiting)")
+
+        job = DetectionJob(
+            id=uuid.uuid4().hex,
+            key=key,
+            params=params,
+            image_bytes=bytes(image_bytes),
+        )
+        self._jobs[job.id] = job
+        self._by_key[key] = job.id
+        self._queue.put_nowait(job)
+        self._submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[DetectionJob]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def retry_after_seconds(self) -> int:
+        """Estimated time for the current queue to drain, for Retry-After."""
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return max(1, math.ceil(depth * (self._avg_job_seconds or 1.0) / self.workers))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            # Jobs nobody will pick up: fail them instead of leaving them queued
+            for job in self._drain(self._queue):
+                job.status = "failed"
+                job.error = "Service shutting down"
+                job.image_bytes = None
+                job.finished_at = time.time()
+                self._set_expiry(job)
+        self._queue = None
+
+    def stats(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "result_ttl_seconds": self.result_ttl_seconds,
+            "jobs": counts,
+            "submitted": self._submitted,
+            "deduplicated": self._deduplicated,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_job_seconds": round(self._avg_job_seconds, 3) if self._avg_job_seconds is not None else None,
+        }
+
+    # -----------------------------------
+    # Internals
+    # -----------------------------------
+    def _ensure_started(self) -> None:
+        if self._queue is not None and self._tasks and not all(task.done() for task in self._tasks):
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        if self._queue is not None:
+            # The workers died (e.g. their event loop closed): hand their backlog to the new ones
+            for job in self._drain(self._queue):
+                queue.put_nowait(job)
+        self._queue = queue
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    @staticmethod
+    def _drain(queue: asyncio.Queue) -> List[DetectionJob]:
+        jobs = []
+        while not queue.empty():
+            jobs.append(queue.get_nowait())
+        return jobs
+
+    @staticmethod
+    def _key_for(image_bytes: bytes, params: Dict) -> str:
+        digest = hashlib.sha256(image_bytes)
+        for name in sorted(params):
+            digest.update(f"|{name}={params[name]}".encode())
+        return digest.hexdigest()
+
+    def _set_expiry(self, job: DetectionJob) -> None:
+        job.expires_at = job.finished_at + self.result_ttl_seconds
+        heapq.heappush(self._deadlines, (job.expires_at, job.id))
+
+    def _expire(self) -> None:
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, job_id = heapq.heappop(self._deadlines)
+            job = self._jobs.pop(job_id, None)
+            if job is not None and self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    async def _worker(self) -> None:
+        from ..db.session import AsyncSessionLocal
+        from .detection_service import DetectionService
+
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                async with AsyncSessionLocal() as session:
+                    job.result = await DetectionService.detect_disease(
+                        image_bytes=job.image_bytes,
+                        db_session=session,
+                        **job.params,
+                    )
+                job.status = "done"
+                self._completed += 1
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Service shutting down"
+                raise
+            except Exception as e:
+                logger.error(f"Detection job {job.id} failed: {e}")
+                job.status = "failed"
+                job.error = "Error processing image"
+                self._failed += 1
+            finally:
+                job.image_bytes = None
+                job.finished_at = time.time()
+                self._set_expiry(job)
+                duration = job.finished_at - job.started_at
+                if self._avg_job_seconds is None:
+                    self._avg_job_seconds = duration
+                else:
+                    self._avg_job_seconds = 0.9 * self._avg_job_seconds + 0.1 * duration
+                queue.task_done()
+
+
+# -----------------------------------
+# Singleton
+# -----------------------------------
+_detection_jobs: Optional[DetectionJobQueue] = None
+
+
+def get_detection_jobs() -> DetectionJobQueue:
+    global _detection_jobs
+    if _detection_jobs is None:
+        _detection_jobs = DetectionJobQueue(
+            max_queue=settings.detection_jobs_max_queue,
+            workers=settings.detection_jobs_workers,
+            result_ttl_seconds=settings.detection_jobs_result_ttl_seconds,
+        )
+    return _detection_jobs
@@ -1,13 +1,39 @@
 """Repository for detection events."""
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.sql import func
+from sqlalchemy import bindparam, func, insert, select, union_all, update
 from ..db.models import DetectionEvent
-from typing import List
+from ..utils.geo_grid import EARTH_RADIUS_KM, cell_id, covering_ranges
+from .rollup_repository import RollupRepository
+from typing import Dict, List, Tuple
 import math
 
 
+def haversine_sql(latitude: float, longitude: float, lat_column, lng_column):
+    """Great-circle distance in km from a point to a row, as a SQL expression."""
+    lat_rad = math.radians(latitude)
+    d_lat = func.radians(lat_column - latitude) / 2
+    d_lng = func.radians(lng_column - longitude) / 2
+    a = (
+        func.sin(d_lat) * func.sin(d_lat)
+        + math.cos(lat_rad) * func.cos(func.radians(lat_column)) * func.sin(d_lng) * func.sin(d_lng)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(a))
+
+
+def cell_candidates(latitude: float, longitude: float, radius_km: float):
+    """Ids of events in the grid cells covering the circle, one index range scan per cell range.
+
+    A UNION ALL rather than OR-ed BETWEENs: with several OR-ed ranges
+    planners may give up on the geo_cell index and walk created_at instead.
+    """
+    ranges = covering_ranges(latitude, longitude, radius_km)
+    return union_all(*[
+        select(DetectionEvent.id).where(DetectionEvent.geo_cell.between(lo, hi))
+        for lo, hi in ranges
+    ])
+
+
 class DetectionRepository:
     """Repository for detection events."""
     
@@ -20,7 +46,7 @@ class DetectionRepository:
         latitude: float = None,
         longitude: float = None
     ) -> DetectionEvent:
-        """Save a detection event to database."""
+        """Save a detection event to database, with its rollups in the same transaction."""
         event = DetectionEvent(
             crop=crop,
             disease=disease,
@@ -29,10 +55,33 @@ class DetectionRepository:
             longitude=longitude
         )
         session.add(event)
+        await RollupRepository.record_events(session, [{
+            "crop": crop,
+            "disease": disease,
+            "confidence": confidence,
+            "latitude": latitude,
+            "longitude": longitude,
+        }])
         await session.commit()
         await session.refresh(event)
         return event
     
+    @staticmethod
+    async def save_events_bulk(session: AsyncSession, rows: List[Dict], commit: bool = True) -> int:
+        """Insert many detection events in one statement.
+
+        Each row has crop, disease, confidence, latitude, longitude and
+        created_at. Rollups are updated in the same transaction. With
+        commit=False the caller owns the transaction.
+        """
+        if not rows:
+            return 0
+        await session.execute(insert(DetectionEvent), rows)
+        await RollupRepository.record_events(session, rows)
+        if commit:
+            await session.commit()
+        return len(rows)
+
     @staticmethod
     async def get_events_within_radius(
         session: AsyncSession,
@@ -44,22 +93,65 @@ class DetectionRepository:
         if latitude is None or longitude is None:
             # If no location provided, return recent events
             query = select(DetectionEvent).order_by(DetectionEvent.created_at.desc()).limit(50)
+            result = await session.execute(query)
+            return result.scalars().all()
+
+        rows = await DetectionRepository.get_events_near(session, latitude, longitude, radius_km)
+        return [event for event, _ in rows]
+
+    @staticmethod
+    async def get_events_near(
+        session: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 10.0,
+        order_by: str = "recent",
+        limit: int = 100,
+    ) -> List[Tuple[DetectionEvent, float]]:
+        """Events within radius_km, with their distance in km.
+
+        The geo_cell ranges covering the circle select candidates through the
+        (geo_cell, created_at) index; the exact haversine distance is then
+        filtered in SQL. order_by is "recent" (newest first) or "distance".
+        """
+        distance = haversine_sql(latitude, longitude, DetectionEvent.latitude, DetectionEvent.longitude)
+        query = (
+            select(DetectionEvent, distance.label("distance_km"))
+            .where(DetectionEvent.id.in_(cell_candidates(latitude, longitude, radius_km)))
+            .where(distance <= radius_km)
+        )
+        if order_by == "distance":
+            query = query.order_by(distance, DetectionEvent.created_at.desc())
         else:
-            # Haversine formula approximation for distance
-            # For simplicity, using basic lat/lng distance
-            lat_delta = radius_km / 111.0  # 1 degree latitude ≈ 111 km
-            lng_delta = radius_km / (111.0 * math.cos(math.radians(latitude)))
-            
-            query = select(DetectionEvent).where(
-                (DetectionEvent.latitude >= latitude - lat_delta) &
-                (DetectionEvent.latitude <= latitude + lat_delta) &
-                (DetectionEvent.longitude >= longitude - lng_delta) &
-                (DetectionEvent.longitude <= longitude + lng_delta)
-            ).order_by(DetectionEvent.created_at.desc()).limit(100)
-        
-        result = await session.execute(query)
-        return result.scalars().all()
-    
+            query = query.order_by(DetectionEvent.created_at.desc())
+
+        result = await session.execute(query.limit(limit))
+        return [(event, float(distance_km)) for event, distance_km in result.all()]
+
+    @staticmethod
+    async def backfill_geo_cells(session: AsyncSession, batch_size: int = 5000) -> int:
+        """Set geo_cell on events stored before the column existed. Returns rows updated."""
+        updated = 0
+        while True:
+            result = await session.execute(
+                select(DetectionEvent.id, DetectionEvent.latitude, DetectionEvent.longitude)
+                .where(DetectionEvent.geo_cell.is_(None))
+                .where(DetectionEvent.latitude.is_not(None))
+                .where(DetectionEvent.longitude.is_not(None))
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return updated
+            await session.execute(
+                update(DetectionEvent.__table__)
+                .where(DetectionEvent.__table__.c.id == bindparam("event_id"))
+                .values(geo_cell=bindparam("cell")),
+                [{"event_id": row.id, "cell": cell_id(row.latitude, row.longitude)} for row in rows],
+            )
+            await session.commit()
+            updated += len(rows)
+
     @staticmethod
     async def get_recent_events(
         session: AsyncSession,
@@ -1,18 +1,33 @@
 """Detection service orchestrates image processing and ML inference."""
 
+import asyncio
 import logging
-from typing import Tuple, Dict, List, Optional
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Tuple, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..utils.geo_grid import cell_center, cell_size_deg
 from ..utils.image_processor import preprocess_image
-from .ml_service import get_model_loader
+from .ml_service import predict_async, predict_tiled_async
+from .result_cache import get_result_cache
 from .remedy_service import RemedyService
 from .detection_repository import DetectionRepository
+from .rollup_repository import HEALTHY, MAP_ROLLUP_LEVEL, RollupRepository
 from .search_repository import SearchRepository
 from .user_repository import UserRepository
 from .notification_service import send_push_notification
 
 logger = logging.getLogger(__name__)
 
+# Running detect_batch work, referenced so it is not garbage collected mid-batch
+_batch_tasks: set = set()
+
+# Nearby-alert rounds sent after a detection was saved, kept referenced the same way
+_alert_tasks: set = set()
+# One round per disease at a time, so overlapping rounds see each other's logged alerts
+_alert_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
 
 class DetectionService:
     """Orchestrate detection workflow."""
@@ -24,10 +39,40 @@ class DetectionService:
         longitude: Optional[float] = None,
         language: str = "en",
         device_token: Optional[str] = None,
-        db_session: Optional[AsyncSession] = None
+        db_session: Optional[AsyncSession] = None,
+        tiled: bool = False,
+        include_tiles: bool = False,
     ) -> Dict:
         """
         Detect disease from image and return results.
+
+        See detect_with_prediction for the arguments.
+        """
+        response, _ = await DetectionService.detect_with_prediction(
+            image_bytes,
+            latitude=latitude,
+            longitude=longitude,
+            language=language,
+            device_token=device_token,
+            db_session=db_session,
+            tiled=tiled,
+            include_tiles=include_tiles,
+        )
+        return response
+
+    @staticmethod
+    async def detect_with_prediction(
+        image_bytes: bytes,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        language: str = "en",
+        device_token: Optional[str] = None,
+        db_session: Optional[AsyncSession] = None,
+        tiled: bool = False,
+        include_tiles: bool = False,
+    ) -> Tuple[Dict, Tuple[str, float, str]]:
+        """
+        Detect disease from image; also return the untranslated prediction.
         
         Args:
             image_bytes: Raw image file bytes
@@ -36,30 +81,52 @@ class DetectionService:
             language: Language code (en, te, hi)
             device_token: Optional device token for search history tracking
             db_session: Optional database session to save event
+            tiled: Run tiled inference (large whole-plant/field photos)
+            include_tiles: Add the per-tile heatmap to the response (tiled only)
         
         Returns:
-            Detection response dict
+            (detection response dict, (disease_key, confidence, crop))
         """
         try:
             # Validate language
             language = RemedyService.validate_language(language)
             
-            # Preprocess image
-            logger.info("Preprocessing image...")
-            image_array = preprocess_image(image_bytes)
-            
-            # Run inference
-            logger.info("Running inference...")
-            model_loader = get_model_loader()
-            disease, confidence, crop = model_loader.predict(image_array)
+            # Repeated uploads (retries, re-scans) skip inference
+            # (the tile heatmap is not cached, so those requests always run)
+            cache = get_result_cache() if not (tiled and include_tiles) else None
+            cache_key = None
+            cached = None
+            plan = None
+            if cache is not None:
+                cache_key = await cache.akey_for(image_bytes, variant="tiled" if tiled else None)
+                cached = cache.get(cache_key)
+
+            if cached is not None:
+                logger.info("Detection cache hit, skipping inference")
+                disease, confidence, crop = cached.prediction
+            else:
+                # Preprocess image
+                logger.info("Preprocessing image...")
+                image_array = preprocess_image(image_bytes)
+                
+                # Run inference
+                logger.info("Running inference...")
+                if tiled:
+                    (disease, confidence, crop), plan = await predict_tiled_async(image_array)
+                else:
+                    disease, confidence, crop = await predict_async(image_array)
+                if cache is not None:
+                    cached = cache.put(cache_key, (disease, confidence, crop))
             
-            # Get translated names and remedies
-            translated_crop = RemedyService.get_translated_crop(crop, language)
-            translated_disease = RemedyService.get_translated_disease(disease, language)
-            translated_remedies = RemedyService.get_remedies_list(disease, language)
+            # Get translated names and remedies (built once per crop, disease and language)
+            translated = RemedyService.get_detection_fragment(crop, disease, language)
             
             # Save to database if session provided (store English names)
-            if db_session is not None and confidence >= 0.5:
+            # Retry of an upload this device already stored here (anonymous uploads always write)
+            already_recorded = cached is not None and cached.was_recorded(device_token, latitude, longitude)
+            if already_recorded:
+                logger.info("Detection already recorded for this device and location, skipping DB writes")
+            if db_session is not None and confidence >= 0.5 and not already_recorded:
                 logger.info(f"Saving detection event: {disease} (confidence: {confidence})")
                 try:
                     await DetectionRepository.save_event(
@@ -82,80 +149,271 @@ class DetectionService:
                         latitude=latitude,
                         longitude=longitude
                     )
+                    if cached is not None:
+                        cached.mark_recorded(device_token, latitude, longitude)
                     
-                    await DetectionService._notify_nearby_users(
-                        disease=disease,
-                        latitude=latitude,
-                        longitude=longitude,
-                        db_session=db_session,
-                    )
+                    DetectionService._spawn_nearby_alerts(disease, latitude, longitude)
                 except Exception as e:
                     logger.warning(f"Failed to save detection event: {e}")
-                async def _notify_nearby_users(
-                    disease: str,
-                    latitude: Optional[float],
-                    longitude: Optional[float],
-                    db_session: AsyncSession,
-                    radius_km: float = 10.0,
-                ) -> None:
-                    """Send soft alerts to nearby users (stub push)."""
-                    if latitude is None or longitude is None:
-                        return
-
-                    users = await UserRepository.get_users_within_radius(
-                        db_session,
-                        latitude=latitude,
-                        longitude=longitude,
-                        radius_km=radius_km,
-                    )
-
-                    title = "Nearby crop health advisory"
-                    body = (
-                        f"A nearby report mentioned {disease}. "
-                        "Please monitor your crop and follow recommended practices."
-                    )
-
-                    for user in users:
-                        if not user.device_token:
-                            continue
-                        recently_sent = await UserRepository.was_alert_sent(
-                            db_session,
-                            user_id=user.id,
-                            disease=disease,
-                            within_hours=6,
-                        )
-                        if recently_sent:
-                            continue
-
-                        sent = await send_push_notification(user.device_token, title, body)
-                        if sent:
-                            await UserRepository.log_alert(
-                                db_session,
-                                user_id=user.id,
-                                disease=disease,
-                            )
             
             # Build response with translated content
             response = {
-                "crop": translated_crop,
-                "disease": translated_disease,
+                "crop": translated["crop"],
+                "disease": translated["disease"],
                 "confidence": round(confidence, 3),
-                "remedies": translated_remedies,
+                "remedies": translated["remedies"],
                 "language": language
             }
+            if include_tiles and plan is not None:
+                response["tiles"] = DetectionService._tile_heatmap(plan)
             
-            return response
+            return response, (disease, confidence, crop)
         
         except Exception as e:
             logger.error(f"Detection error: {e}", exc_info=True)
             raise
     
+    @staticmethod
+    def detect_batch(
+        items: List[Dict],
+        language: str = "en",
+        device_token: Optional[str] = None,
+        session_factory=None,
+        release: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        Detect diseases for many images; iterate the result for one dict per image as it completes.
+
+        Inference and the DB writes start right away in a background task, so
+        results are still saved when the consumer stops early or never reads
+        them (client disconnected).
+
+        Args:
+            items: Dicts with index, image (bytes/memoryview, or None with an
+                error), latitude, longitude, created_at and client_id
+            language: Language code for the translated results
+            device_token: Optional device token for search history tracking
+            session_factory: Async session factory; all events and searches
+                are bulk inserted in one transaction after inference
+            release: Called once no image is needed anymore (e.g. to close the uploads)
+
+        Returns:
+            Async iterator of per-image result dicts, then a final summary dict
+        """
+        language = RemedyService.validate_language(language)
+        results: asyncio.Queue = asyncio.Queue()
+        task = asyncio.get_running_loop().create_task(
+            DetectionService._run_batch(items, language, device_token, session_factory, release, results.put_nowait)
+        )
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+        return DetectionService._drain_results(results)
+
+    @staticmethod
+    async def _drain_results(results: asyncio.Queue) -> AsyncIterator[Dict]:
+        while True:
+            result = await results.get()
+            yield result
+            if result.get("done"):
+                return
+
+    @staticmethod
+    async def _run_batch(
+        items: List[Dict],
+        language: str,
+        device_token: Optional[str],
+        session_factory,
+        release: Optional[Callable[[], None]],
+        emit: Callable[[Dict], None],
+    ) -> None:
+        """Body of detect_batch: emits per-image results, saves them, then emits the summary."""
+        cache = get_result_cache()
+
+        async def _predict(item: Dict):
+            cached = None
+            try:
+                if cache is not None:
+                    cache_key = await cache.akey_for(item["image"])
+                    cached = cache.get(cache_key)
+                if cached is not None:
+                    return item, cached.prediction, cached, None
+                prediction = await predict_async(item["image"])
+                if cache is not None:
+                    cached = cache.put(cache_key, prediction)
+                return item, prediction, cached, None
+            except Exception as e:
+                logger.error(f"Batch detection failed for image {item['index']}: {e}")
+                return item, None, None, "Error processing image"
+
+        events: List[Dict] = []
+        searches: List[Dict] = []
+        recorded = []
+        errors = 0
+        saved = 0
+
+        try:
+            try:
+                for item in items:
+                    if item.get("error"):
+                        errors += 1
+                        emit({"index": item["index"], "client_id": item.get("client_id"), "ok": False, "error": item["error"]})
+
+                tasks = [_predict(item) for item in items if not item.get("error")]
+                for next_done in asyncio.as_completed(tasks):
+                    item, prediction, cached, error = await next_done
+                    if error is not None:
+                        errors += 1
+                        emit({"index": item["index"], "client_id": item.get("client_id"), "ok": False, "error": error})
+                        continue
+
+                    disease, confidence, crop = prediction
+                    translated = RemedyService.get_detection_fragment(crop, disease, language)
+                    emit({
+                        "index": item["index"],
+                        "client_id": item.get("client_id"),
+                        "ok": True,
+                        "crop": translated["crop"],
+                        "disease": translated["disease"],
+                        "confidence": round(confidence, 3),
+                        "remedies": translated["remedies"],
+                        "language": language,
+                    })
+
+                    if confidence < 0.5 or (
+                        cached is not None and cached.was_recorded(device_token, item.get("latitude"), item.get("longitude"))
+                    ):
+                        continue
+                    row = {
+                        "crop": crop,
+                        "disease": disease,
+                        "confidence": confidence,
+                        "latitude": item.get("latitude"),
+                        "longitude": item.get("longitude"),
+                        "created_at": item.get("created_at") or datetime.now(timezone.utc),
+                    }
+                    events.append(row)
+                    searches.append({**row, "language": language, "device_token": device_token})
+                    recorded.append((cached, row))
+            finally:
+                if release is not None:
+                    release()
+
+            if session_factory is not None and events:
+                try:
+                    async with session_factory() as session:
+                        await DetectionRepository.save_events_bulk(session, events, commit=False)
+                        await SearchRepository.save_searches_bulk(session, searches, commit=False)
+                        await session.commit()
+                        saved = len(events)
+                        for cached, row in recorded:
+                            if cached is not None:
+                                cached.mark_recorded(device_token, row["latitude"], row["longitude"])
+                except Exception as e:
+                    logger.warning(f"Failed to save batch detection events: {e}")
+                else:
+                    # One alert round per disease and area, not per photo
+                    areas = {}
+                    for row in events:
+                        if row["latitude"] is None or row["longitude"] is None:
+                            continue
+                        area = (row["disease"], round(row["latitude"], 2), round(row["longitude"], 2))
+                        areas.setdefault(area, row)
+                    for row in areas.values():
+                        DetectionService._spawn_nearby_alerts(
+                            row["disease"], row["latitude"], row["longitude"], session_factory
+                        )
+        finally:
+            emit({"done": True, "images": len(items), "errors": errors, "saved": saved})
+
+    @staticmethod
+    def _spawn_nearby_alerts(
+        disease: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        session_factory=None,
+    ) -> None:
+        """Alert nearby users in a background task, so the request does not wait on the pushes."""
+        if latitude is None or longitude is None or disease == HEALTHY:
+            return
+        task = asyncio.get_running_loop().create_task(
+            DetectionService._notify_nearby_users(disease, latitude, longitude, session_factory)
+        )
+        _alert_tasks.add(task)
+        task.add_done_callback(_alert_tasks.discard)
+
+    @staticmethod
+    async def _notify_nearby_users(
+        disease: str,
+        latitude: float,
+        longitude: float,
+        session_factory=None,
+        radius_km: float = 10.0,
+    ) -> None:
+        """Send soft alerts to nearby users (stub push), at most one per user and disease every 6 hours."""
+        if session_factory is None:
+            from ..db.session import AsyncSessionLocal as session_factory
+
+        title = "Nearby crop health advisory"
+        body = (
+            f"A nearby report mentioned {disease}. "
+            "Please monitor your crop and follow recommended practices."
+        )
+
+        try:
+            async with _alert_locks[disease], session_factory() as session:
+                users = await UserRepository.get_notifiable_users_near(
+                    session,
+                    latitude=latitude,
+                    longitude=longitude,
+                    radius_km=radius_km,
+                )
+                recently_sent = await UserRepository.get_recently_alerted(
+                    session, [user.id for user in users], disease, within_hours=6
+                )
+
+                sent_to = []
+                for user in users:
+                    if not user.device_token or user.id in recently_sent:
+                        continue
+                    if await send_push_notification(user.device_token, title, body):
+                        sent_to.append(user.id)
+                if sent_to:
+                    await UserRepository.log_alerts(session, sent_to, disease)
+        except Exception as e:
+            logger.warning(f"Failed to send nearby alerts for {disease}: {e}")
+
+    @staticmethod
+    def _tile_heatmap(plan) -> Dict:
+        """Per-tile predictions of a tiled detection for the response."""
+        return {
+            "image_width": plan.width,
+            "image_height": plan.height,
+            "tile_size": plan.tile_size,
+            "tiles_total": plan.total,
+            "tiles_skipped": plan.skipped,
+            "tiles_dropped": plan.dropped,
+            "tiles": [
+                {
+                    "x": tile.x,
+                    "y": tile.y,
+                    "width": tile.width,
+                    "height": tile.height,
+                    "crop": tile.prediction[2],
+                    "disease": tile.prediction[0],
+                    "confidence": round(tile.prediction[1], 3),
+                }
+                for tile in plan.tiles
+                if tile.prediction is not None
+            ],
+        }
+
     @staticmethod
     async def get_nearby_alerts(
         latitude: Optional[float] = None,
         longitude: Optional[float] = None,
         radius_km: float = 10.0,
-        db_session: Optional[AsyncSession] = None
+        db_session: Optional[AsyncSession] = None,
+        order_by: str = "recent",
     ) -> Dict:
         """
         Get nearby disease alerts.
@@ -165,6 +423,7 @@ class DetectionService:
             longitude: Optional user longitude
             radius_km: Search radius in kilometers
             db_session: Database session
+            order_by: "recent" (newest first) or "distance" (closest first)
         
         Returns:
             Alerts response dict
@@ -173,24 +432,30 @@ class DetectionService:
             if db_session is None:
                 return {"alerts": []}
             
-            # Get events within radius
+            # Get events within radius (exact distance computed in SQL)
             logger.info(f"Fetching alerts within {radius_km}km...")
-            events = await DetectionRepository.get_events_within_radius(
-                db_session,
-                latitude=latitude,
-                longitude=longitude,
-                radius_km=radius_km
-            )
+            if latitude is not None and longitude is not None:
+                rows = await DetectionRepository.get_events_near(
+                    db_session,
+                    latitude=latitude,
+                    longitude=longitude,
+                    radius_km=radius_km,
+                    order_by=order_by,
+                )
+            else:
+                events = await DetectionRepository.get_events_within_radius(
+                    db_session,
+                    latitude=latitude,
+                    longitude=longitude,
+                    radius_km=radius_km
+                )
+                rows = [(event, None) for event in events]
             
             # Build alerts list
             alerts = []
-            for event in events:
-                # Calculate distance if we have coordinates
-                distance_km = None
-                if latitude is not None and longitude is not None and event.latitude and event.longitude:
-                    distance_km = DetectionService._calculate_distance(
-                        latitude, longitude, event.latitude, event.longitude
-                    )
+            for event, distance_km in rows:
+                if distance_km is not None:
+                    distance_km = round(distance_km, 2)
                 
                 alert = {
                     "disease": event.disease,
@@ -204,22 +469,137 @@ class DetectionService:
         except Exception as e:
             logger.error(f"Alert retrieval error: {e}", exc_info=True)
             return {"alerts": []}
-    
+
     @staticmethod
-    def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two coordinates (simplified)."""
-        import math
-        
-        # Haversine formula (simplified)
-        R = 6371  # Earth radius in kilometers
-        
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (
-            math.sin(delta_lat / 2) ** 2 +
-            math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(delta_lon / 2) ** 2
+    async def get_disease_map(
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        zoom: int,
+        days: int,
+        db_session: AsyncSession,
+        disease: Optional[str] = None,
+    ) -> Dict:
+        """
+        Detection counts per grid cell and disease for a map viewport.
+
+        Args:
+            south, west, north, east: Viewport bounds in degrees
+            zoom: Web map zoom level; picks cells of about 1/8 of a map tile
+            days: Window in UTC days, including today
+            db_session: Database session
+            disease: Optional English disease name to filter on
+
+        Returns:
+            Map response dict, read from the daily rollups
+        """
+        level = max(1, min(zoom + 3, MAP_ROLLUP_LEVEL))
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        rows = await RollupRepository.get_map_cells(
+            db_session,
+            south=south,
+            west=west,
+            north=north,
+            east=east,
+            level=level,
+            since=since,
+            disease=disease,
         )
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return round(R * c, 2)
+
+        cells = []
+        for cell, name, count in rows:
+            latitude, longitude = cell_center(cell, level)
+            cells.append({
+                "cell": cell,
+                "latitude": round(latitude, 5),
+                "longitude": round(longitude, 5),
+                "disease": name,
+                "count": count,
+            })
+        return {
+            "level": level,
+            "cell_size_deg": cell_size_deg(level),
+            "since": since.isoformat(),
+            "cells": cells,
+        }
+
+    @staticmethod
+    async def get_nearby_summary(
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        hours: int,
+        db_session: AsyncSession,
+    ) -> Dict:
+        """
+        Per-disease report totals around a location, with outbreak flags.
+
+        Args:
+            latitude: User latitude
+            longitude: User longitude
+            radius_km: Radius in km (grid cells whose centers are inside)
+            hours: Window in hours, counted from the start of the current hour
+            db_session: Database session
+
+        Returns:
+            Summary response dict, read from the hourly rollups
+        """
+        since = datetime.now(timezone.utc) - timedelta(hours=hours - 1)
+        diseases = await RollupRepository.get_area_summary(
+            db_session, latitude, longitude, radius_km, since
+        )
+        for summary in diseases:
+            summary["avg_confidence"] = round(summary["avg_confidence"], 3)
+            summary["outbreak"] = summary["disease"] != HEALTHY and summary["count"] >= settings.outbreak_min_reports
+        return {
+            "radius_km": radius_km,
+            "since": since.replace(minute=0, second=0, microsecond=0),
+            "diseases": diseases,
+        }
+
+    @staticmethod
+    async def get_disease_trends(
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        days: int,
+        bucket: str,
+        db_session: AsyncSession,
+        disease: Optional[str] = None,
+    ) -> Dict:
+        """
+        Report counts over time around a location, per disease.
+
+        Args:
+            latitude: User latitude
+            longitude: User longitude
+            radius_km: Radius in km (grid cells whose centers are inside)
+            days: Window in UTC days, including today
+            bucket: "hour" or "day"
+            db_session: Database session
+            disease: Optional English disease name to filter on
+
+        Returns:
+            Trends response dict, read from the hourly rollups
+        """
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        since = today - timedelta(days=days - 1)
+        series = await RollupRepository.get_trend(
+            db_session, latitude, longitude, radius_km, since, bucket=bucket, disease=disease
+        )
+        return {
+            "bucket": bucket,
+            "radius_km": radius_km,
+            "since": since,
+            "series": [
+                {
+                    "disease": name,
+                    "points": [
+                        {**point, "avg_confidence": round(point["avg_confidence"], 3)}
+                        for point in points
+                    ],
+                }
+                for name, points in sorted(series.items())
+            ],
+        }
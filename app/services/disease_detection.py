@@ -1,55 +1,84 @@
+"""
+Disease detection with a pretrained image classifier.
+
+Heavy dependencies (transformers, torch, PIL, onnxruntime) are imported on
+first use, so importing this module is cheap and worker startup is not
+blocked; ml_service.warm_up_models() loads and warms the model in the
+background.
+"""
+import asyncio
 import logging
-from transformers import pipeline
-import torch
-from PIL import Image
-import numpy as np
 import subprocess
 import json
-from typing import Tuple, Optional
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, List, Tuple, Optional
+
+from ..config import settings
 
-from utils.image_processing import preprocess_image
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+MODEL_ID = settings.model_path or "linkanjarad/mobilenet_v2_1.0_224-plant-disease-identification"
+
 # Global model
 disease_model = None
+_model_lock = threading.Lock()
+
+def build_disease_model(backend: Optional[str] = None, model_id: Optional[str] = None, model_dir: Optional[str] = None):
+    """
+    Build a classifier for the given backend ("pipeline" or "onnx").
+    Both backends are called the same way: model(image) -> [{'label', 'score'}, ...]
+    """
+    backend = backend or settings.inference_backend
+    model_id = model_id or MODEL_ID
+    logger.info(f"Loading disease detection model {model_id} ({backend} backend)...")
+    if backend == "onnx":
+        from pathlib import Path
+
+        from .onnx_backend import load_onnx_classifier
+
+        return load_onnx_classifier(model_id, Path(model_dir) if model_dir else None)
+
+    import torch
+    from transformers import pipeline
+
+    return pipeline(
+        "image-classification",
+        model=model_id,
+        device=0 if torch.cuda.is_available() else -1
+    )
 
 def load_disease_model():
+    """
+    Load the default classifier (configured backend and model) once.
+    Only for direct callers of detect_disease/predict_bytes: registry versions
+    (ModelLoader) load their own instance.
+    """
     global disease_model
-    if disease_model is None:
-        logger.info("Loading disease detection model...")
-        try:
-            disease_model = pipeline(
-                "image-classification",
-                model="linkanjarad/mobilenet_v2_1.0_224-plant-disease-identification",
-                device=0 if torch.cuda.is_available() else -1
-            )
-            logger.info("Model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load model: {e}")
-            raise
+    if disease_model is not None:
+        return disease_model
+    # Warm-up thread and first requests may race here; load only once
+    with _model_lock:
+        if disease_model is None:
+            try:
+                disease_model = build_disease_model()
+                logger.info("Model loaded successfully")
+            except Exception as e:
+                logger.error(f"Failed to load model: {e}")
+                raise
     return disease_model
 
-def detect_disease(image: Image.Image) -> Tuple[str, float]:
+def detect_disease(image: "Image.Image") -> Tuple[str, float]:
     """
     Detect disease from image.
     Returns: (disease_label, confidence)
     """
     model = load_disease_model()
     
-    # Preprocess
-    img_array = preprocess_image(image)
-    
-    # Convert back to PIL for pipeline
-    # Pipeline expects PIL Image
-    # Actually, pipeline can take PIL or numpy, but let's use PIL
-    # Wait, preprocess returns numpy, but pipeline can take tensor or PIL.
-    # To be safe, pass the PIL image directly, as pipeline handles preprocessing.
-    
-    # Actually, the model is trained on certain preprocessing, but let's assume pipeline handles it.
-    # But to be precise, perhaps pass the numpy array, but pipeline expects PIL or path.
-    # Let's check: pipeline("image-classification") can take PIL.Image
-    
+    # The pipeline does its own preprocessing (resize, crop, normalize),
+    # so the PIL image is passed directly.
     results = model(image)
     
     # Get top prediction
@@ -62,36 +91,266 @@ def detect_disease(image: Image.Image) -> Tuple[str, float]:
     
     return disease_name, confidence
 
-def get_advisory_from_ollama(disease_name: str) -> str:
+def split_label(label: str) -> Tuple[str, str]:
+    """
+    Split a model label into (crop, disease_key).
+    Handles PlantVillage style labels ("Tomato___Early_blight") and
+    readable ones ("Tomato with Early Blight", "Healthy Tomato").
+    """
+    if '___' in label:
+        crop, disease = label.split('___', 1)
+    elif ' with ' in label:
+        crop, disease = label.split(' with ', 1)
+    elif label.lower().startswith('healthy '):
+        crop, disease = label[len('healthy '):], 'healthy'
+    else:
+        crop, disease = 'Unknown', label
+
+    # "Corn_(maize)" -> "Corn", "Pepper,_bell" -> "Pepper"
+    crop = crop.replace('_', ' ').split('(')[0].split(',')[0].strip().title()
+    words = disease.replace('_', ' ').split()
+    disease_key = '_'.join(word.capitalize() for word in words) or 'Healthy'
+    return crop, disease_key
+
+def _model_input(model, image_bytes):
+    """
+    What the model is called with: the ONNX backend decodes encoded images
+    itself (at reduced scale), the pipeline needs a PIL image.
+    """
+    from ..utils.image_processing import open_image
+    from .onnx_backend import OnnxClassifier
+
+    if isinstance(model, OnnxClassifier):
+        return image_bytes
+    return open_image(image_bytes)
+
+def predict_bytes(image_bytes, model=None) -> Tuple[str, float, str]:
+    """
+    Run the model (default: load_disease_model()) on encoded image bytes.
+    Returns: (disease_key, confidence, crop) like ModelLoader.predict
+    """
+    model = model or load_disease_model()
+    results = model(_model_input(model, image_bytes))
+    top = results[0]
+    crop, disease_key = split_label(top['label'])
+    return disease_key, float(top['score']), crop
+
+def predict_batch_bytes(images, model=None) -> list:
+    """
+    Run the model (default: load_disease_model()) on several encoded images in one call.
+    Returns a list of (disease_key, confidence, crop)
+    """
+    model = model or load_disease_model()
+    results = model([_model_input(model, image_bytes) for image_bytes in images])
+    predictions = []
+    for result in results:
+        top = result[0]
+        crop, disease_key = split_label(top['label'])
+        predictions.append((disease_key, float(top['score']), crop))
+    return predictions
+
+async def detect_disease_async(image_bytes: bytes) -> Tuple[str, float]:
+    """
+    Detect disease without blocking the event loop.
+    Runs through the shared inference executor (thread or process pool).
+    Returns: (disease_label, confidence)
+    """
+    from .ml_service import predict_async
+
+    disease_key, confidence, crop = await predict_async(image_bytes)
+    return display_disease_name(disease_key, crop), confidence
+
+def display_disease_name(disease_key: str, crop: str) -> str:
+    """
+    Readable name used in advisories, e.g. ("Early_Blight", "Tomato") -> "Tomato Early Blight"
+    """
+    disease_name = disease_key.replace('_', ' ')
+    if crop and crop != 'Unknown':
+        disease_name = f"{crop} {disease_name}"
+    return disease_name
+
+def model_labels(backend: Optional[str] = None, model_id: Optional[str] = None, model_dir: Optional[str] = None) -> List[str]:
     """
-    Get advisory from Ollama using llama3.1:8b
+    Class labels of a model without loading its weights
+    (ONNX metadata file, or the Hugging Face config for the pipeline backend).
     """
+    backend = backend or settings.inference_backend
+    model_id = model_id or MODEL_ID
+    if backend == "onnx":
+        from pathlib import Path
+
+        from .onnx_backend import METADATA_FILE, default_model_dir
+
+        metadata_path = (Path(model_dir) if model_dir else default_model_dir(model_id)) / METADATA_FILE
+        if metadata_path.exists():
+            return list(json.loads(metadata_path.read_text())["labels"].values())
+
+    from transformers import AutoConfig
+
+    return list(AutoConfig.from_pretrained(model_id).id2label.values())
+
+def known_disease_names() -> List[str]:
+    """
+    Readable names of every class the active model can predict
+    """
+    from .ml_service import get_model_loader
+
+    names = []
+    for label in get_model_loader().labels():
+        name = display_disease_name(*reversed(split_label(label)))
+        if name not in names:
+            names.append(name)
+    return names
+
+# -----------------------------------
+# Advisories (Ollama)
+# -----------------------------------
+# Bump when the prompt below changes, so cached advisories are regenerated
+ADVISORY_PROMPT_VERSION = "1"
+
+ADVISORY_LANGUAGE_NAMES = {
+    "en": "English",
+    "te": "Telugu",
+    "hi": "Hindi",
+    "kn": "Kannada",
+    "ml": "Malayalam",
+}
+
+def build_advisory_prompt(disease_name: str, language: str = "en") -> str:
     prompt = f"Disease: {disease_name}\n\nReturn ONLY this format with exactly two lines per section:\n\n1 Cause\n2 Symptoms\n3 Treatment Steps\n4 Prevention\n5 Best Pesticide Types\n7 Spray Schedule\n\nUse simple farmer-friendly language.\nNo extra paragraphs.\nNo markdown formatting.\nNo explanations outside sections."
+    if language != "en":
+        prompt += f"\nRespond in {ADVISORY_LANGUAGE_NAMES.get(language, language)}."
+    return prompt
+
+def generate_advisory(disease_name: str, language: str = "en") -> Optional[str]:
+    """
+    Generate one advisory, blocking (ADVISORY_BACKEND: "http" or "cli").
+    Returns None if it fails.
+    """
+    if settings.advisory_backend == "http":
+        return _generate_advisory_http(disease_name, language)
+    return _generate_advisory_cli(disease_name, language)
+
+def _generate_advisory_http(disease_name: str, language: str) -> Optional[str]:
+    """
+    One non-streaming request to the Ollama server (sync callers only;
+    request handlers use stream_advisory_tokens)
+    """
+    import httpx
+
+    payload = {
+        "model": settings.ollama_model,
+        "prompt": build_advisory_prompt(disease_name, language),
+        "stream": False,
+        "options": {"num_predict": settings.ollama_max_tokens},
+    }
+    try:
+        response = httpx.post(
+            f"{settings.ollama_url.rstrip('/')}/api/generate",
+            json=payload,
+            timeout=settings.ollama_timeout_seconds,
+        )
+        response.raise_for_status()
+        return response.json().get("response", "").strip() or None
+    except Exception as e:
+        logger.error(f"Ollama failed: {e}")
+        return None
+
+def _generate_advisory_cli(disease_name: str, language: str) -> Optional[str]:
+    """
+    Run the ollama CLI once for this disease
+    """
+    prompt = build_advisory_prompt(disease_name, language)
     
     try:
         # Run Ollama subprocess
         result = subprocess.run(
-            ['ollama', 'run', 'llama3.1:8b'],
+            [settings.ollama_command, 'run', settings.ollama_model],
             input=prompt,
             text=True,
             capture_output=True,
-            timeout=30  # 30 seconds timeout
+            timeout=settings.ollama_timeout_seconds
         )
         
-        if result.returncode == 0:
+        if result.returncode == 0 and result.stdout.strip():
             return result.stdout.strip()
         else:
             logger.error(f"Ollama error: {result.stderr}")
-            return get_fallback_advisory(disease_name)
+            return None
     except subprocess.TimeoutExpired:
         logger.error("Ollama timeout")
-        return get_fallback_advisory(disease_name)
+        return None
     except FileNotFoundError:
         logger.error("Ollama not installed")
-        return get_fallback_advisory(disease_name)
+        return None
     except Exception as e:
         logger.error(f"Ollama failed: {e}")
-        return get_fallback_advisory(disease_name)
+        return None
+
+async def stream_advisory_tokens(disease_name: str, language: str = "en") -> AsyncIterator[str]:
+    """
+    Yield advisory tokens as they are generated (uncached).
+    The HTTP backend streams from the Ollama server; the CLI backend yields
+    the whole text once. Raises OllamaError on failure.
+    """
+    from .ollama_client import OllamaError, get_ollama_client
+
+    if settings.advisory_backend == "http":
+        async for token in get_ollama_client().stream(build_advisory_prompt(disease_name, language)):
+            yield token
+        return
+
+    text = await asyncio.to_thread(_generate_advisory_cli, disease_name, language)
+    if text is None:
+        raise OllamaError(f"Ollama CLI failed for {disease_name}")
+    yield text
+
+async def stream_advisory(disease_name: str, language: str = "en") -> AsyncIterator[str]:
+    """
+    Advisory text in chunks, through the advisory cache when enabled.
+    Falls back to the static advisory if generation fails before any token;
+    a failure mid-stream is raised to the caller.
+    """
+    from .advisory_cache import get_advisory_cache
+
+    if settings.advisory_cache_enabled:
+        tokens = get_advisory_cache().astream(disease_name, language)
+    else:
+        tokens = stream_advisory_tokens(disease_name, language)
+
+    started = False
+    try:
+        async for token in tokens:
+            started = True
+            yield token
+    except Exception as e:
+        if started:
+            raise
+        logger.error(f"Advisory generation failed: {e}")
+        yield get_fallback_advisory(disease_name)
+
+def get_advisory_from_ollama(disease_name: str, language: str = "en") -> str:
+    """
+    Get advisory from Ollama, through the advisory cache when enabled.
+    Blocking; request handlers use get_advisory_async.
+    """
+    advisory = None
+    try:
+        if settings.advisory_cache_enabled:
+            from .advisory_cache import get_advisory_cache
+
+            advisory = get_advisory_cache().get(disease_name, language)
+        else:
+            advisory = generate_advisory(disease_name, language)
+    except Exception as e:
+        logger.error(f"Advisory generation failed: {e}")
+    return advisory or get_fallback_advisory(disease_name)
+
+async def get_advisory_async(disease_name: str, language: str = "en") -> str:
+    """
+    Get advisory without blocking the event loop
+    """
+    return "".join([chunk async for chunk in stream_advisory(disease_name, language)]).strip()
 
 def get_fallback_advisory(disease_name: str) -> str:
     """
@@ -0,0 +1,137 @@
+"""
+Process-pool inference workers.
+
+Runs the model in a pool of worker processes so inference never blocks the
+event loop. Each worker loads its own ModelLoader (inline executor) once and
+pins its math library thread count. Images are handed over through a
+shared-memory segment per batch; only the segment name and byte spans are
+pickled.
+
+Exports:
+- InferencePool: sync and async batch prediction over the worker pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[str, float, str]
+
+# Per-process model used inside workers
+_worker_loader = None
+
+
+def _init_worker(threads: int, loader_options: Dict) -> None:
+    """Pin thread pools and load the model once per worker process."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    global _worker_loader
+    from ..config import settings
+    from ..utils.import_timing import format_timings, time_imports
+    from .ml_service import ModelLoader, backend_modules
+
+    _worker_loader = ModelLoader(executor="inline", **loader_options)
+    if not _worker_loader.use_mock:
+        imports = time_imports(backend_modules(_worker_loader.backend))
+        logger.info(f"Worker {os.getpid()} import breakdown: {format_timings(imports)}")
+
+    # ONNX Runtime has its own thread pool; torch reads its setting at runtime
+    settings.onnx_intra_op_threads = threads
+    settings.onnx_inter_op_threads = 1
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    _worker_loader.load_model()
+
+
+def _predict_shared(name: str, spans: Sequence[Tuple[int, int]]) -> List[Prediction]:
+    """Worker entrypoint: read each image from shared memory and predict."""
+    shm = shared_memory.SharedMemory(name=name)
+    views = [shm.buf[offset:offset + size] for offset, size in spans]
+    try:
+        return _worker_loader.predict_batch(views)
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+
+
+class InferencePool:
+    """Pool of model worker processes.
+
+    Args:
+        workers: Number of worker processes.
+        threads_per_worker: Math library threads pinned in each worker.
+        loader_options: ModelLoader options (backend, model) used in workers.
+    """
+
+    def __init__(self, workers: int = 2, threads_per_worker: int = 1, loader_options: Optional[Dict] = None):
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.loader_options = dict(loader_options or {})
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        logger.info(
+            f"Starting inference pool: {self.workers} workers x "
+            f"{self.threads_per_worker} threads"
+        )
+        # spawn: never fork a process holding an event loop or torch threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker, self.loader_options),
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit_batch(self, images: Sequence[bytes]) -> Future:
+        """Copy images into one shared-memory segment and submit the batch."""
+        self.start()
+        total = sum(len(image) for image in images)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, total))
+
+        spans = []
+        offset = 0
+        try:
+            for image in images:
+                size = len(image)
+                shm.buf[offset:offset + size] = image
+                spans.append((offset, size))
+                offset += size
+            future = self._executor.submit(_predict_shared, shm.name, spans)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def _release(_: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(_release)
+        return future
+
+    def predict_batch(self, images: Sequence[bytes]) -> List[Prediction]:
+        return self.submit_batch(images).result()
+
+    async def apredict_batch(self, images: Sequence[bytes]) -> List[Prediction]:
+        return await asyncio.wrap_future(self.submit_batch(images))
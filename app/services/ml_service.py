@@ -1,16 +1,33 @@
 """
-Pure-Python ML stub for hackathon MVP.
+ML service for hackathon MVP.
 
+Mock mode is a pure-Python stub:
 - NO numpy
 - NO torch
 - ZERO external ML dependencies
 - Safe on low disk environments
+- Deterministic: the result depends only on the image bytes, and inference
+  latency can be replayed from a profile recorded on the real model
+  (see mock_latency)
+
+The real model (disease_detection) is only imported when mock mode is off.
 """
 
+import asyncio
+import io
 import logging
-import random
-from typing import Tuple
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from ..config import settings
+from ..utils.import_timing import format_timings, time_imports
+from .batching import BatchScheduler
+from .mock_latency import simulate_batch, stable_hash
+from .model_registry import DEFAULT_MODEL, ModelVersion, get_model_registry
+from .result_cache import get_result_cache
+
+if TYPE_CHECKING:
+    from .tiling import TilePlan
 
 logger = logging.getLogger(__name__)
 
@@ -35,41 +52,360 @@ CROP_TYPES = [
 ]
 
 
+def mock_prediction(image_bytes) -> Tuple[str, float, str]:
+    """Fake prediction that mimics real output, fixed for given image bytes."""
+    digest = stable_hash(image_bytes)
+    disease = DISEASE_CLASSES[digest % len(DISEASE_CLASSES)]
+    crop = CROP_TYPES[(digest >> 16) % len(CROP_TYPES)]
+    confidence = round(0.80 + ((digest >> 32) % 16) / 100.0, 2)  # 0.80 - 0.95
+    return disease, confidence, crop
+
+
 class ModelLoader:
     """
-    Stub ML loader.
+    ML loader.
+
+    Mock mode (default) needs no ML deps. With USE_MOCK_INFERENCE=False the
+    real model from disease_detection is used. The executor decides where
+    inference runs:
+    - inline: in the calling thread (blocks the event loop; debugging only)
+    - thread: in the default thread pool (event loop stays free; default)
+    - process: in a pool of worker processes (see inference_pool)
     """
 
-    def __init__(self):
-        self.use_mock = True
+    def __init__(
+        self,
+        executor: Optional[str] = None,
+        backend: Optional[str] = None,
+        model_id: Optional[str] = None,
+        model_dir: Optional[str] = None,
+    ):
+        # backend: "mock", "pipeline" or "onnx" (default from settings)
+        if backend is None:
+            backend = "mock" if settings.use_mock_inference else settings.inference_backend
+        self.backend = backend
+        self.use_mock = backend == "mock"
+        self.model_id = model_id
+        self.model_dir = model_dir
+        self.executor = executor or settings.inference_executor
+        self._pool = None
+        self._model = None
+        # Warm-up and the first requests may race to load the model
+        self._model_lock = threading.Lock()
+
+    def options(self) -> Dict[str, Optional[str]]:
+        """Constructor options (without executor) to rebuild this loader elsewhere."""
+        return {"backend": self.backend, "model_id": self.model_id, "model_dir": self.model_dir}
+
+    def labels(self) -> List[str]:
+        """Class labels this loader can predict."""
+        if self.use_mock:
+            return [f"{crop}___{disease}" for crop in CROP_TYPES for disease in DISEASE_CLASSES]
+        from .disease_detection import model_labels
+
+        return model_labels(self.backend, self.model_id, self.model_dir)
 
     def load_model(self) -> None:
-        logger.info("ML service running in PURE MOCK mode (no ML deps).")
+        if self.executor == "process":
+            self._get_pool()
+            return
+
+        if self.use_mock:
+            logger.info("ML service running in PURE MOCK mode (no ML deps).")
+        else:
+            self._get_model()
 
     def predict(self, image_bytes: bytes) -> Tuple[str, float, str]:
         """
-        Fake prediction that mimics real output.
+        Predict one image. Returns (disease, confidence, crop).
+        """
+        if self.executor == "process":
+            return self._get_pool().predict_batch([image_bytes])[0]
+        return self._predict_local(image_bytes)
+
+    def predict_batch(self, images: List[bytes]) -> List[Tuple[str, float, str]]:
+        """
+        Predict a batch of images in one call.
+        """
+        if self.executor == "process":
+            return self._get_pool().predict_batch(images)
+        if not self.use_mock:
+            from .disease_detection import predict_batch_bytes
+
+            return predict_batch_bytes(images, model=self._get_model())
+        simulate_batch(images)
+        return [mock_prediction(image) for image in images]
+
+    async def apredict_batch(self, images: List[bytes]) -> List[Tuple[str, float, str]]:
         """
-        disease = random.choice(DISEASE_CLASSES)
-        crop = random.choice(CROP_TYPES)
-        confidence = round(random.uniform(0.80, 0.95), 2)
+        Predict a batch according to the configured executor.
+        """
+        if self.executor == "process":
+            return await self._get_pool().apredict_batch(images)
+        if self.executor == "thread":
+            return await asyncio.to_thread(self.predict_batch, images)
+        return self.predict_batch(images)
+
+    def warm_up(self, passes: int = 3) -> None:
+        """
+        Run dummy forward passes so the first real request is not a cold one.
+        """
+        dummy = _dummy_image_bytes(self.use_mock)
+        if self.executor == "process":
+            # One pass per worker and round, so every process loads its model
+            pool = self._get_pool()
+            futures = [pool.submit_batch([dummy]) for _ in range(pool.workers * passes)]
+            for future in futures:
+                future.result()
+            return
+        for _ in range(passes):
+            self.predict_batch([dummy])
+
+    def close(self) -> None:
+        """Release the model and stop worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._model = None
 
-        return disease, confidence, crop
+    def _get_model(self):
+        # Every loader owns its model (never the disease_detection global),
+        # so unloading a registry version frees its weights
+        model = self._model
+        if model is None:
+            from .disease_detection import build_disease_model
+
+            with self._model_lock:
+                if self._model is None:
+                    self._model = build_disease_model(self.backend, self.model_id, self.model_dir)
+                model = self._model
+        return model
+
+    def _get_pool(self):
+        if self._pool is None:
+            from .inference_pool import InferencePool
+
+            self._pool = InferencePool(
+                workers=settings.inference_workers,
+                threads_per_worker=settings.inference_threads_per_worker,
+                loader_options=self.options(),
+            )
+            self._pool.start()
+        return self._pool
+
+    def _predict_local(self, image_bytes: bytes) -> Tuple[str, float, str]:
+        if not self.use_mock:
+            from .disease_detection import predict_bytes
+
+            return predict_bytes(image_bytes, model=self._get_model())
+
+        simulate_batch([image_bytes])
+        return mock_prediction(image_bytes)
 
 
 # -----------------------------------
-# Singleton
+# Default model (served through the registry)
 # -----------------------------------
-_model_loader: ModelLoader | None = None
+DEFAULT_VERSION = "default"
+_default_lock = threading.Lock()
+
+
+def _on_model_activated(entry: ModelVersion) -> None:
+    # Cached predictions came from the previous version
+    cache = get_result_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def build_default_loader():
+    """ModelLoader from settings, wrapped in a cascade when enabled."""
+    if settings.inference_cascade_enabled:
+        from .cascade import build_cascade_loader
+
+        return build_cascade_loader()
+    return ModelLoader()
+
+
+def _ensure_default_model() -> ModelVersion:
+    """Active version of the disease model, registering the configured one if none."""
+    registry = get_model_registry()
+    entry = registry.active(DEFAULT_MODEL)
+    if entry is not None:
+        return entry
+    with _default_lock:
+        entry = registry.active(DEFAULT_MODEL)
+        if entry is None:
+            registry.add_activation_listener(_on_model_activated)
+            loader = build_default_loader()
+            registry.register(DEFAULT_MODEL, DEFAULT_VERSION, loader, loader.options(), status="ready")
+            registry.activate(DEFAULT_MODEL, DEFAULT_VERSION)
+            entry = registry.active(DEFAULT_MODEL)
+    return entry
 
 
 def get_model_loader() -> ModelLoader:
-    global _model_loader
-    if _model_loader is None:
-        _model_loader = ModelLoader()
-    return _model_loader
+    """Loader of the currently active disease model version."""
+    return _ensure_default_model().loader
 
 
 def load_models() -> None:
     loader = get_model_loader()
     loader.load_model()
+
+
+# -----------------------------------
+# Warm-up / readiness
+# -----------------------------------
+_models_ready = False
+_warmup_report: Dict = {}
+
+
+def backend_modules(backend: Optional[str] = None) -> List[str]:
+    """Heavy modules a real backend imports (default: configured backend)."""
+    backend = backend or settings.inference_backend
+    if backend == "mock":
+        return []
+    if backend == "onnx":
+        return ["numpy", "PIL.Image", "onnxruntime"]
+    return ["numpy", "PIL.Image", "torch", "transformers"]
+
+
+def heavy_modules() -> List[str]:
+    """Heavy modules needed in this process (process-pool workers import their own)."""
+    if settings.use_mock_inference or settings.inference_executor == "process":
+        return []
+    return backend_modules()
+
+
+def _dummy_image_bytes(use_mock: bool) -> bytes:
+    if use_mock:
+        return b"warm-up"
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (224, 224), (96, 128, 64)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def warm_up_models(passes: Optional[int] = None) -> Dict:
+    """
+    Import, load and warm the model, then mark the service ready.
+    Blocking; run it in a background thread at startup.
+    """
+    global _models_ready, _warmup_report
+    passes = settings.model_warmup_passes if passes is None else passes
+    started = time.perf_counter()
+
+    imports = time_imports(heavy_modules())
+    if imports:
+        logger.info(f"Import breakdown: {format_timings(imports)}")
+
+    loaded_at = time.perf_counter()
+    loader = get_model_loader()
+    loader.load_model()
+    warm_at = time.perf_counter()
+    loader.warm_up(passes)
+    finished = time.perf_counter()
+
+    _warmup_report = {
+        "imports_seconds": imports,
+        "import_total_seconds": round(loaded_at - started, 3),
+        "load_seconds": round(warm_at - loaded_at, 3),
+        "warmup_seconds": round(finished - warm_at, 3),
+        "warmup_passes": passes,
+        "total_seconds": round(finished - started, 3),
+    }
+    _models_ready = True
+    logger.info(
+        f"ML models ready in {_warmup_report['total_seconds']}s "
+        f"(imports {_warmup_report['import_total_seconds']}s, load {_warmup_report['load_seconds']}s, "
+        f"warm-up {_warmup_report['warmup_seconds']}s)"
+    )
+    return _warmup_report
+
+
+def models_ready() -> bool:
+    return _models_ready
+
+
+# -----------------------------------
+# Batched inference
+# -----------------------------------
+_batch_scheduler: BatchScheduler | None = None
+
+
+async def _run_batch(images: List[bytes]) -> List[Tuple[str, float, str]]:
+    """Run one batch on the active model version, pinned until it completes."""
+    _ensure_default_model()
+    with get_model_registry().acquire(DEFAULT_MODEL) as entry:
+        started = time.perf_counter()
+        try:
+            results = await entry.loader.apredict_batch(images)
+        except Exception:
+            entry.errors += 1
+            raise
+        entry.record(len(images), (time.perf_counter() - started) * 1000.0)
+        return results
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    global _batch_scheduler
+    if _batch_scheduler is None:
+        _batch_scheduler = BatchScheduler(
+            _run_batch,
+            max_batch_size=settings.inference_batch_max_size,
+            max_wait_ms=settings.inference_batch_max_wait_ms,
+            # keep every pool worker busy
+            max_concurrent_batches=(
+                settings.inference_workers if settings.inference_executor == "process" else 1
+            ),
+        )
+    return _batch_scheduler
+
+
+async def predict_tiled_async(image_bytes) -> Tuple[Tuple[str, float, str], Optional["TilePlan"]]:
+    """
+    Tiled prediction for large images: background-filtered tiles run as one
+    batch and are merged. Small images fall back to predict_async.
+    Returns (prediction, plan); plan is None when the image was not tiled.
+    """
+    from .tiling import merge_tile_predictions, plan_tiles
+
+    plan = await asyncio.to_thread(plan_tiles, image_bytes)
+    if plan is None or not plan.tiles:
+        return await predict_async(image_bytes), plan
+
+    predictions = await _run_batch(plan.images)
+    plan.images = []
+    for tile, prediction in zip(plan.tiles, predictions):
+        tile.prediction = prediction
+    return merge_tile_predictions(predictions), plan
+
+
+async def predict_async(image_bytes: bytes) -> Tuple[str, float, str]:
+    """
+    Predict one image, coalescing concurrent calls into batches when enabled.
+    """
+    if not settings.inference_batching_enabled:
+        results = await _run_batch([image_bytes])
+        return results[0]
+    return await get_batch_scheduler().submit(image_bytes)
+
+
+async def shutdown_models() -> None:
+    global _batch_scheduler
+    if _batch_scheduler is not None:
+        await _batch_scheduler.stop()
+        _batch_scheduler = None
+    await get_model_registry().shutdown()
+
+
+def get_inference_stats() -> dict:
+    return {
+        "ready": _models_ready,
+        "warmup": _warmup_report or None,
+        "executor": settings.inference_executor,
+        "batching_enabled": settings.inference_batching_enabled,
+        "batching": get_batch_scheduler().stats() if _batch_scheduler is not None else None,
+        "models": get_model_registry().stats(),
+    }
@@ -0,0 +1,171 @@
+"""
+Latency profiles for the mock inference backend.
+
+A profile is recorded once on the real model (per-call overhead plus a list
+of per-image latency samples) and replayed by the mock backend, so load
+tests of the API, database and notification path see realistic inference
+cost without the ML stack installed. The sample used for an image is
+chosen from a hash of its bytes, so runs are reproducible.
+
+Modes (MOCK_LATENCY_MODE):
+- none:  no delay (default)
+- sleep: time.sleep, the worker stays idle (like native code releasing the GIL)
+- cpu:   busy loop holding the GIL (worst case for the event loop)
+
+Record a profile with:
+    python -m app.services.mock_latency --output profile.json [--backend onnx] [--count 48]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def stable_hash(data) -> int:
+    """64-bit hash of image bytes (bytes, memoryview or mmap), stable across processes."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+@dataclass
+class LatencyProfile:
+    batch_overhead_ms: float = 0.0
+    per_image_ms: List[float] = field(default_factory=list)
+    metadata: Dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyProfile":
+        data = json.loads(Path(path).read_text())
+        return cls(
+            batch_overhead_ms=float(data.get("batch_overhead_ms", 0.0)),
+            per_image_ms=[float(v) for v in data.get("per_image_ms", [])],
+            metadata={k: v for k, v in data.items() if k not in ("batch_overhead_ms", "per_image_ms")},
+        )
+
+    def to_dict(self) -> Dict:
+        return {**self.metadata, "batch_overhead_ms": self.batch_overhead_ms, "per_image_ms": self.per_image_ms}
+
+    def batch_seconds(self, images: List) -> float:
+        """Simulated duration of one batched call on these images."""
+        if not self.per_image_ms:
+            return self.batch_overhead_ms / 1000.0
+        samples = self.per_image_ms
+        total = self.batch_overhead_ms + sum(samples[stable_hash(image) % len(samples)] for image in images)
+        return total / 1000.0
+
+
+def simulate(seconds: float, mode: str) -> None:
+    if seconds <= 0 or mode == "none":
+        return
+    if mode == "cpu":
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+    else:
+        time.sleep(seconds)
+
+
+_profile: Optional[LatencyProfile] = None
+_profile_path: Optional[str] = None
+
+
+def get_latency_profile() -> Optional[LatencyProfile]:
+    """Profile from MOCK_LATENCY_PROFILE, or a fixed MOCK_LATENCY_MS, or None."""
+    global _profile, _profile_path
+    if settings.mock_latency_mode == "none":
+        return None
+    if settings.mock_latency_profile:
+        if _profile is None or _profile_path != settings.mock_latency_profile:
+            _profile = LatencyProfile.load(settings.mock_latency_profile)
+            _profile_path = settings.mock_latency_profile
+            logger.info(
+                f"Mock latency profile {_profile_path}: overhead {_profile.batch_overhead_ms:.1f} ms, "
+                f"{len(_profile.per_image_ms)} samples"
+            )
+        return _profile
+    if settings.mock_latency_ms > 0:
+        return LatencyProfile(per_image_ms=[settings.mock_latency_ms])
+    return None
+
+
+def simulate_batch(images: List) -> None:
+    """Sleep or burn CPU for as long as the profiled model would take on this batch."""
+    profile = get_latency_profile()
+    if profile is not None:
+        simulate(profile.batch_seconds(images), settings.mock_latency_mode)
+
+
+def record_profile(backend: str, count: int = 48, batch: int = 8, passes: int = 3) -> LatencyProfile:
+    """Measure the real model on the synthetic corpus and fit overhead + per-image samples."""
+    from ..benchmarks.corpus import make_corpus
+    from .ml_service import ModelLoader
+
+    loader = ModelLoader(executor="inline", backend=backend)
+    loader.load_model()
+    loader.warm_up(passes)
+
+    corpus = make_corpus(per_variant=max(1, -(-count // 6)))  # 3 sizes x 2 formats
+    images = [entry["bytes"] for entry in corpus][:count]
+
+    singles = []
+    for image in images:
+        started = time.perf_counter()
+        loader.predict_batch([image])
+        singles.append((time.perf_counter() - started) * 1000.0)
+
+    batched = []
+    for start in range(0, len(images) - batch + 1, batch):
+        started = time.perf_counter()
+        loader.predict_batch(images[start:start + batch])
+        batched.append((time.perf_counter() - started) * 1000.0)
+    loader.close()
+
+    # single = overhead + x, batch of n = overhead + n * x  =>  overhead = (n * single - batch) / (n - 1)
+    single_ms = statistics.median(singles)
+    overhead = 0.0
+    if batched and batch > 1:
+        overhead = max(0.0, (batch * single_ms - statistics.median(batched)) / (batch - 1))
+
+    return LatencyProfile(
+        batch_overhead_ms=round(overhead, 3),
+        per_image_ms=[round(max(0.0, value - overhead), 3) for value in singles],
+        metadata={
+            "backend": backend,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "images": len(images),
+            "batch": batch,
+            "single_p50_ms": round(single_ms, 3),
+            "batch_p50_ms": round(statistics.median(batched), 3) if batched else None,
+        },
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record a mock inference latency profile on the real model")
+    parser.add_argument("--backend", default=settings.inference_backend, choices=["pipeline", "onnx"])
+    parser.add_argument("--count", type=int, default=48)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    profile = record_profile(args.backend, count=args.count, batch=args.batch)
+    Path(args.output).write_text(json.dumps(profile.to_dict(), indent=2))
+    print(
+        f"Profile written to {args.output}: overhead {profile.batch_overhead_ms:.1f} ms, "
+        f"per image p50 {statistics.median(profile.per_image_ms):.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,275 @@
+"""
+Model registry with versioned hot-swap.
+
+Holds several named models, each with any number of versions. A new version
+is loaded and warmed in the background, then traffic is switched to it
+atomically; the previous version keeps serving the requests it already
+accepted and is unloaded once they drain. Every version keeps its own
+latency and throughput counters.
+
+Exports:
+- ModelRegistry
+- ModelVersion
+- get_model_registry(): process-wide registry
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "disease"
+
+# Window used for rolling throughput
+_THROUGHPUT_WINDOW_SECONDS = 60.0
+_LATENCY_SAMPLES = 1024
+
+
+@dataclass
+class ModelVersion:
+    """One loaded (or loading) model version and its counters."""
+
+    name: str
+    version: str
+    loader: Optional[object]
+    options: Dict = field(default_factory=dict)
+    status: str = "loading"  # loading, ready, active, draining, retired, failed
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    activated_at: Optional[float] = None
+    in_flight: int = 0
+    batches: int = 0
+    items: int = 0
+    errors: int = 0
+    _latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_SAMPLES))
+    _recent: Deque[Tuple[float, int]] = field(default_factory=deque)
+
+    def record(self, items: int, latency_ms: float) -> None:
+        now = time.monotonic()
+        self.batches += 1
+        self.items += items
+        self._latencies_ms.append(latency_ms)
+        self._recent.append((now, items))
+        while self._recent and self._recent[0][0] < now - _THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def stats(self) -> Dict:
+        latencies = sorted(self._latencies_ms)
+        loader_stats = getattr(self.loader, "stats", None)
+
+        def _pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))], 3)
+
+        now = time.monotonic()
+        recent_items = sum(n for t, n in self._recent if t >= now - _THROUGHPUT_WINDOW_SECONDS)
+        return {
+            "name": self.name,
+            "version": self.version,
+            "status": self.status,
+            "error": self.error,
+            "options": self.options,
+            "created_at": self.created_at,
+            "activated_at": self.activated_at,
+            "in_flight": self.in_flight,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "items_per_second": round(recent_items / _THROUGHPUT_WINDOW_SECONDS, 3),
+            "latency_ms": {"p50": _pct(0.50), "p95": _pct(0.95), "p99": _pct(0.99)},
+            "cascade": loader_stats() if loader_stats is not None else None,
+        }
+
+
+class ModelRegistry:
+    """Named, versioned models with atomic activation and drain-then-unload."""
+
+    def __init__(self, drain_timeout_seconds: float = 60.0):
+        self.drain_timeout_seconds = drain_timeout_seconds
+        self._versions: Dict[str, Dict[str, ModelVersion]] = {}
+        self._active: Dict[str, ModelVersion] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[ModelVersion], None]] = []
+        self._tasks: set = set()
+
+    def add_activation_listener(self, listener: Callable[[ModelVersion], None]) -> None:
+        """Call listener(version) whenever a version becomes active."""
+        self._listeners.append(listener)
+
+    def register(self, name: str, version: str, loader, options: Optional[Dict] = None, status: str = "loading") -> ModelVersion:
+        with self._lock:
+            existing = self._versions.get(name, {}).get(version)
+            if existing is not None and existing.status in ("loading", "ready", "active", "draining"):
+                raise ValueError(f"Model {name}:{version} is already {existing.status}")
+            entry = ModelVersion(name=name, version=version, loader=loader, options=dict(options or {}), status=status)
+            self._versions.setdefault(name, {})[version] = entry
+            return entry
+
+    def get(self, name: str, version: str) -> Optional[ModelVersion]:
+        return self._versions.get(name, {}).get(version)
+
+    def active(self, name: str = DEFAULT_MODEL) -> Optional[ModelVersion]:
+        return self._active.get(name)
+
+    def load(self, entry: ModelVersion, warmup_passes: int = 3) -> ModelVersion:
+        """Load and warm a registered version (blocking; call from a thread)."""
+        try:
+            entry.loader.load_model()
+            entry.loader.warm_up(warmup_passes)
+            entry.status = "ready"
+            logger.info(f"Model {entry.name}:{entry.version} loaded and warmed")
+        except Exception as e:
+            entry.status = "failed"
+            entry.error = str(e)
+            entry.loader = None
+            logger.error(f"Model {entry.name}:{entry.version} failed to load: {e}")
+            raise
+        return entry
+
+    def activate(self, name: str, version: str) -> Optional[ModelVersion]:
+        """Switch traffic to a loaded version. Returns the previously active version."""
+        with self._lock:
+            entry = self.get(name, version)
+            if entry is None or entry.loader is None or entry.status not in ("ready", "active", "draining"):
+                raise ValueError(f"Model {name}:{version} is not ready")
+            previous = self._active.get(name)
+            if previous is entry:
+                return None
+            entry.status = "active"
+            entry.activated_at = time.time()
+            self._active[name] = entry
+            if previous is not None:
+                previous.status = "draining"
+
+        logger.info(f"Model {name} now serving version {version}")
+        for listener in self._listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logger.warning(f"Model activation listener failed: {e}")
+
+        if previous is not None:
+            self._spawn(self._drain_and_unload(previous))
+        return previous
+
+    async def deploy(self, name: str, version: str, loader, options: Optional[Dict] = None, activate: bool = True) -> ModelVersion:
+        """Register, load and warm a version in a thread, then optionally activate it."""
+        entry = self.register(name, version, loader, options)
+        await asyncio.to_thread(self.load, entry, settings.model_warmup_passes)
+        if activate:
+            self.activate(name, version)
+        return entry
+
+    def deploy_in_background(self, name: str, version: str, loader, options: Optional[Dict] = None, activate: bool = True) -> ModelVersion:
+        """Like deploy(), but returns immediately after registering."""
+        entry = self.register(name, version, loader, options)
+
+        async def _run() -> None:
+            try:
+                await asyncio.to_thread(self.load, entry, settings.model_warmup_passes)
+                if activate:
+                    self.activate(name, version)
+            except Exception:
+                pass  # recorded on the entry by load()
+
+        self._spawn(_run())
+        return entry
+
+    def unload(self, name: str, version: str) -> None:
+        """Unload a version that is not serving traffic."""
+        with self._lock:
+            entry = self.get(name, version)
+            if entry is None:
+                raise KeyError(f"Unknown model {name}:{version}")
+            if entry is self._active.get(name):
+                raise ValueError(f"Model {name}:{version} is active")
+            if entry.status == "loading":
+                raise ValueError(f"Model {name}:{version} is still loading")
+            if entry.status in ("retired", "failed"):
+                raise ValueError(f"Model {name}:{version} is already {entry.status}")
+            if entry.status == "ready":
+                entry.status = "draining"
+        self._spawn(self._drain_and_unload(entry))
+
+    @contextmanager
+    def acquire(self, name: str = DEFAULT_MODEL) -> Iterator[ModelVersion]:
+        """Pin the active version for the duration of one request/batch."""
+        with self._lock:
+            entry = self._active.get(name)
+            if entry is None:
+                raise RuntimeError(f"No active version for model {name}")
+            entry.in_flight += 1
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "active_version": self._active[name].version if name in self._active else None,
+                "versions": [entry.stats() for entry in versions.values()],
+            }
+            for name, versions in self._versions.items()
+        }
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        for versions in self._versions.values():
+            for entry in versions.values():
+                if entry.loader is not None:
+                    entry.loader.close()
+                    entry.loader = None
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain_and_unload(self, entry: ModelVersion) -> None:
+        """Close the version's loader once its in-flight requests finish, however long that takes."""
+        deadline = time.monotonic() + self.drain_timeout_seconds
+        warned = False
+        while True:
+            with self._lock:
+                if entry.status != "draining":
+                    return  # re-activated while draining
+                if entry.in_flight == 0:
+                    loader, entry.loader = entry.loader, None
+                    entry.status = "retired"
+                    break
+            if not warned and time.monotonic() >= deadline:
+                logger.warning(
+                    f"Model {entry.name}:{entry.version} still has {entry.in_flight} requests after drain timeout; "
+                    f"unloading it once they finish"
+                )
+                warned = True
+            await asyncio.sleep(0.05)
+        if loader is not None:
+            await asyncio.to_thread(loader.close)
+        logger.info(f"Model {entry.name}:{entry.version} unloaded")
+
+
+# -----------------------------------
+# Singleton
+# -----------------------------------
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
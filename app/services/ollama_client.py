@@ -0,0 +1,209 @@
+"""
+Ollama HTTP API client for advisories.
+
+Replaces one `ollama run` subprocess per advisory with requests to the
+Ollama server (POST /api/generate) over a pooled, keep-alive async client.
+Tokens are streamed back as they are generated. Limits:
+- global: at most OLLAMA_MAX_CONCURRENCY generations run at once (the server
+  serializes work on one model anyway); callers wait up to
+  OLLAMA_QUEUE_TIMEOUT_SECONDS for a slot, then fail fast;
+- per request: OLLAMA_TIMEOUT_SECONDS overall deadline and OLLAMA_MAX_TOKENS
+  generated tokens.
+
+Exports:
+- OllamaClient, OllamaError
+- get_ollama_client(): process-wide client
+- close_ollama_client()
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaError(Exception):
+    """Generation failed, timed out, or no slot was free in time."""
+
+
+class OllamaClient:
+    """Pooled async client for the Ollama generate API.
+
+    Args:
+        base_url: Ollama server, e.g. http://localhost:11434.
+        model: Model tag passed to /api/generate.
+        max_concurrency: Generations allowed in flight (global limit).
+        timeout_seconds: Per-request deadline, including the token stream.
+        queue_timeout_seconds: Max wait for a free slot.
+        max_tokens: Per-request token cap (num_predict).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        max_concurrency: int = 2,
+        timeout_seconds: float = 30.0,
+        queue_timeout_seconds: float = 10.0,
+        max_tokens: int = 512,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout_seconds = float(timeout_seconds)
+        self.queue_timeout_seconds = float(queue_timeout_seconds)
+        self.max_tokens = int(max_tokens)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._requests = 0
+        self._active = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._errors = 0
+        self._tokens = 0
+        self._first_token_ms: Optional[float] = None
+
+    # -----------------------------------
+    # Public API
+    # -----------------------------------
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response tokens as the server generates them. Raises OllamaError."""
+        await self._acquire()
+        started = time.perf_counter()
+        deadline = started + self.timeout_seconds
+        first = True
+        try:
+            payload = {
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "options": {"num_predict": self.max_tokens},
+            }
+            async with self._get_client().stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    raise OllamaError(f"Ollama returned {response.status_code}: {body[:200]}")
+                async for line in response.aiter_lines():
+                    if time.perf_counter() > deadline:
+                        raise OllamaError(f"Ollama timeout after {self.timeout_seconds}s")
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(f"Ollama error: {chunk['error']}")
+                    token = chunk.get("response")
+                    if token:
+                        if first:
+                            self._record_first_token(started)
+                            first = False
+                        self._tokens += 1
+                        yield token
+                    if chunk.get("done"):
+                        break
+        except OllamaError:
+            self._errors += 1
+            raise
+        except (httpx.HTTPError, ValueError) as e:
+            self._errors += 1
+            raise OllamaError(f"Ollama request failed: {e}") from e
+        finally:
+            self._release()
+
+    async def generate(self, prompt: str) -> str:
+        """Whole response text. Raises OllamaError."""
+        return "".join([token async for token in self.stream(prompt)]).strip()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphore = None
+
+    def stats(self) -> Dict:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "waiting": self._waiting,
+            "requests": self._requests,
+            "rejected": self._rejected,
+            "errors": self._errors,
+            "tokens": self._tokens,
+            "first_token_ms": round(self._first_token_ms, 1) if self._first_token_ms is not None else None,
+        }
+
+    # -----------------------------------
+    # Internals
+    # -----------------------------------
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    async def _acquire(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise OllamaError(f"No Ollama slot free within {self.queue_timeout_seconds}s")
+        finally:
+            self._waiting -= 1
+        self._requests += 1
+        self._active += 1
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    def _record_first_token(self, started: float) -> None:
+        elapsed = (time.perf_counter() - started) * 1000.0
+        if self._first_token_ms is None:
+            self._first_token_ms = elapsed
+        else:
+            self._first_token_ms = 0.9 * self._first_token_ms + 0.1 * elapsed
+
+
+# -----------------------------------
+# Singleton
+# -----------------------------------
+_ollama_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = OllamaClient(
+            base_url=settings.ollama_url,
+            model=settings.ollama_model,
+            max_concurrency=settings.ollama_max_concurrency,
+            timeout_seconds=settings.ollama_timeout_seconds,
+            queue_timeout_seconds=settings.ollama_queue_timeout_seconds,
+            max_tokens=settings.ollama_max_tokens,
+        )
+    return _ollama_client
+
+
+async def close_ollama_client() -> None:
+    if _ollama_client is not None:
+        await _ollama_client.aclose()
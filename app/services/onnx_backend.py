@@ -0,0 +1,243 @@
+"""
+ONNX Runtime CPU backend for the disease detection model.
+
+The HuggingFace model is exported once to ONNX (optionally quantized to
+int8) together with a metadata file holding the class labels and the image
+processor settings. OnnxClassifier then serves it through ONNX Runtime and
+is callable like the transformers image-classification pipeline, so
+disease_detection can use either backend interchangeably.
+
+Export manually with:
+    python -m app.services.onnx_backend [--no-quantize] [--model MODEL_ID]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "metadata.json"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def default_model_dir(model_id: Optional[str] = None) -> Path:
+    """Export directory of a model: one subdirectory of onnx_model_dir per model id."""
+    path = Path(settings.onnx_model_dir)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent / path
+    if model_id is not None:
+        path = path / model_id.replace("/", "--")
+    return path
+
+
+def export_onnx(model_id: str, output_dir: Path, quantize: bool = True) -> Path:
+    """Export a transformers image classifier to ONNX and write its metadata.
+
+    Returns the path of the model file to serve (int8 when quantized).
+    Requires torch and transformers; only needed once per model.
+    """
+    import torch
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Exporting {model_id} to ONNX in {output_dir}...")
+
+    processor = AutoImageProcessor.from_pretrained(model_id)
+    model = AutoModelForImageClassification.from_pretrained(model_id)
+    model.eval()
+
+    crop = processor.crop_size if getattr(processor, "do_center_crop", False) else processor.size
+    height = crop.get("height", crop.get("shortest_edge", 224))
+    width = crop.get("width", crop.get("shortest_edge", 224))
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    fp32_path = output_dir / FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            torch.zeros(1, 3, height, width),
+            str(fp32_path),
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17,
+        )
+
+    resample = getattr(processor, "resample", 2)
+    metadata = {
+        "model_id": model_id,
+        "labels": {str(k): v for k, v in model.config.id2label.items()},
+        "do_resize": bool(getattr(processor, "do_resize", True)),
+        "size": dict(processor.size),
+        "do_center_crop": bool(getattr(processor, "do_center_crop", False)),
+        "crop_size": {"height": height, "width": width},
+        "resample": int(resample),
+        "image_mean": list(getattr(processor, "image_mean", [0.0, 0.0, 0.0])),
+        "image_std": list(getattr(processor, "image_std", [1.0, 1.0, 1.0])),
+    }
+    (output_dir / METADATA_FILE).write_text(json.dumps(metadata, indent=2))
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = output_dir / INT8_FILE
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QUInt8)
+    logger.info(f"Quantized model written to {int8_path}")
+    return int8_path
+
+
+class OnnxClassifier:
+    """Image classifier served by ONNX Runtime.
+
+    Call it like the transformers pipeline: one image returns a list of
+    {"label", "score"} dicts sorted by score, a list of images returns a
+    list of those lists. The whole list runs as one batched session call.
+    Images may also be given encoded (bytes, memoryview); JPEGs are then
+    draft-decoded at reduced scale, never below the resize target.
+    """
+
+    def __init__(self, model_path: Path, metadata: Dict, intra_op_threads: int = 0, inter_op_threads: int = 1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+
+        self.model_path = Path(model_path)
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.metadata = metadata
+        self.labels = {int(k): v for k, v in metadata["labels"].items()}
+
+        crop = metadata["crop_size"]
+        self.crop_size = (crop["width"], crop["height"])
+        self._mean = tuple(metadata["image_mean"])
+        self._std = tuple(metadata["image_std"])
+
+    def __call__(self, images, top_k: int = 5):
+        single = not isinstance(images, (list, tuple))
+        batch = [images] if single else list(images)
+        results = self.predict(batch, top_k=top_k)
+        return results[0] if single else results
+
+    def predict(self, images: List, top_k: int = 5) -> List[List[Dict]]:
+        import numpy as np
+
+        preprocessor = self._preprocessor()
+        pixels = np.empty((len(images), 3, self.crop_size[1], self.crop_size[0]), dtype=np.float32)
+        preprocessor.process_batch([self._resize_and_crop(preprocessor, image) for image in images], out=pixels)
+
+        logits = self.session.run(None, {self.input_name: pixels})[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        results = []
+        for row in probs:
+            order = np.argsort(row)[::-1][:top_k]
+            results.append([{"label": self.labels[int(i)], "score": float(row[i])} for i in order])
+        return results
+
+    def _preprocessor(self):
+        """This thread's preprocessing engine (its buffers must not be shared across threads)."""
+        from ..utils.image_processing import get_preprocessor
+
+        return get_preprocessor(self.crop_size, mean=self._mean, std=self._std)
+
+    def _resize_and_crop(self, preprocessor, image):
+        """Match the HuggingFace image processor: shortest-edge resize then center crop."""
+        from PIL import Image
+
+        from ..utils.image_processing import open_image
+
+        size = self.metadata.get("size", {})
+        do_resize = self.metadata.get("do_resize", True)
+        edge = size.get("shortest_edge") if do_resize else None
+        if not do_resize and not isinstance(image, Image.Image):
+            image = open_image(image)  # cropped at full resolution: no draft decode
+        # Drafted to the shortest-edge target, not the crop size: decoding below
+        # it and upsampling again would break parity with the pipeline
+        image = preprocessor.load(image, draft_size=(edge, edge) if edge else None)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        if edge is not None:
+            width, height = image.size
+            if width <= height:
+                new_size = (edge, int(edge * height / width))
+            else:
+                new_size = (int(edge * width / height), edge)
+            image = image.resize(new_size, Image.Resampling(self.metadata.get("resample", 2)))
+
+        if self.metadata.get("do_center_crop", False):
+            crop_w, crop_h = self.crop_size
+            width, height = image.size
+            left = (width - crop_w) // 2
+            top = (height - crop_h) // 2
+            image = image.crop((left, top, left + crop_w, top + crop_h))
+        return image
+
+
+def load_onnx_classifier(model_id: str, model_dir: Optional[Path] = None) -> OnnxClassifier:
+    """Load the ONNX model, exporting it first if it is not on disk yet.
+
+    Raises ValueError if model_dir holds an export of another model.
+    """
+    model_dir = model_dir or default_model_dir(model_id)
+    model_file = INT8_FILE if settings.onnx_quantize_int8 else FP32_FILE
+    model_path = model_dir / model_file
+    metadata_path = model_dir / METADATA_FILE
+
+    if not model_path.exists() or not metadata_path.exists():
+        export_onnx(model_id, model_dir, quantize=settings.onnx_quantize_int8)
+
+    metadata = json.loads(metadata_path.read_text())
+    if metadata.get("model_id") != model_id:
+        raise ValueError(f"ONNX model in {model_dir} was exported from {metadata.get('model_id')}, expected {model_id}")
+
+    logger.info(f"Loading ONNX model {model_path}")
+    return OnnxClassifier(
+        model_path,
+        metadata,
+        intra_op_threads=settings.onnx_intra_op_threads,
+        inter_op_threads=settings.onnx_inter_op_threads,
+    )
+
+
+def main() -> None:
+    from .disease_detection import MODEL_ID
+
+    parser = argparse.ArgumentParser(description="Export the disease model to ONNX")
+    parser.add_argument("--model", default=MODEL_ID)
+    parser.add_argument("--output", help="Default: a directory for the model under ONNX_MODEL_DIR")
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    output = Path(args.output) if args.output else default_model_dir(args.model)
+    path = export_onnx(args.model, output, quantize=not args.no_quantize)
+    print(f"Exported {args.model} -> {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    main()
@@ -1,543 +1,309 @@
-"""Remedies and disease knowledge base service."""
+"""Remedies and disease knowledge base service.
 
+The knowledge base lives in versioned JSON files under app/data/remedies
+(REMEDIES_DIR):
+- manifest.json: content version, default language, available languages
+- core.json: disease remedies (English), disease names in every language,
+  name aliases and treatment keywords
+- <language>.json: crop names, remedies and treatment feedback per language
+
+A KnowledgeBase snapshot loads the manifest and core file eagerly and each
+language file on first use. The derived indexes (disease name lookup,
+treatment matcher, pre-serialized responses) belong to the snapshot, so
+reload_remedies() swaps everything at once by replacing the current
+snapshot; requests in flight keep using the one they started with.
+"""
+
+import asyncio
+import hashlib
 import json
 import logging
-from typing import List, Dict, Optional
+import threading
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+from ..config import settings
+from ..utils.text_match import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILE = "manifest.json"
+CORE_FILE = "core.json"
+
+
+def default_remedies_dir() -> Path:
+    path = Path(settings.remedies_dir)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent.parent / path
+    return path
+
+
+@dataclass(frozen=True)
+class TreatmentFragment:
+    """Serialized /suggested-treatments body (without stores) and its strong ETag."""
+    body: bytes
+    etag: str
+
+
+def _name_lookup_key(name: str) -> str:
+    """
+    Spelling-insensitive form of a disease name: NFKC, casefolded, without
+    spaces, underscores, hyphens or zero-width joiners ("Early_Blight" ==
+    "early blight" == "EarlyBlight").
+    """
+    name = unicodedata.normalize("NFKC", name).casefold()
+    return "".join(
+        char for char in name
+        if not char.isspace() and char not in "_-" and unicodedata.category(char) != "Cf"
+    )
+
+
+def _read_json(path: Path) -> Dict:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def directory_signature(directory: Path) -> Tuple:
+    """(name, size, mtime) of every data file; changes whenever a file is edited."""
+    return tuple(
+        (path.name, stat.st_size, stat.st_mtime_ns)
+        for path in sorted(directory.glob("*.json"))
+        for stat in (path.stat(),)
+    )
+
+
+class KnowledgeBase:
+    """One immutable version of the knowledge base plus its derived indexes.
+
+    Args:
+        directory: Folder with manifest.json, core.json and <language>.json.
+
+    Raises:
+        OSError, ValueError, KeyError: missing or malformed files (the
+        previous snapshot stays active when a reload fails).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.signature = directory_signature(self.directory)
+        manifest = _read_json(self.directory / MANIFEST_FILE)
+        core = _read_json(self.directory / CORE_FILE)
+
+        self.languages: List[str] = list(manifest["languages"])
+        self.default_language: str = manifest.get("default_language", "en")
+        digest = hashlib.sha256(repr(self.signature).encode()).hexdigest()[:8]
+        self.version = f"{manifest.get('version', 'unversioned')}+{digest}"
+
+        self.diseases: Dict[str, Dict] = core["diseases"]
+        self.disease_names: Dict[str, Dict[str, str]] = core["disease_names"]
+        self.aliases: Dict[str, List[str]] = core.get("aliases", {})
+        self.treatment_keywords: Dict[str, List[str]] = core.get("treatment_keywords", {})
+
+        self._language_data: Dict[str, Dict] = {}
+        self._language_lock = threading.RLock()
+        self.treatment_fragments: Dict[Tuple[str, str], TreatmentFragment] = {}
+        self.detection_fragments: Dict[Tuple[str, str, str], Dict] = {}
+
+        self.name_index = self._build_name_index()
+        self.treatment_matcher = KeywordMatcher(self.treatment_keywords)
+        self.recommended_treatments = self._build_recommended_treatments()
+
+    def language(self, language: str) -> Dict:
+        """Crops, remedies and feedback of one language (loaded on first use)."""
+        data = self._language_data.get(language)
+        if data is not None:
+            return data
+        if language not in self.languages:
+            return self.language(self.default_language)
+        with self._language_lock:
+            data = self._language_data.get(language)
+            if data is None:
+                try:
+                    data = _read_json(self.directory / f"{language}.json")
+                except (OSError, ValueError) as e:
+                    if language == self.default_language:
+                        raise
+                    logger.error(f"Could not load remedies for '{language}', using {self.default_language}: {e}")
+                    data = self.language(self.default_language)
+                self._language_data[language] = data
+                logger.info(f"Loaded remedies language '{language}' (knowledge base {self.version})")
+        return data
+
+    @property
+    def loaded_languages(self) -> List[str]:
+        return sorted(self._language_data)
+
+    def _build_name_index(self) -> Dict[str, str]:
+        """Map every key, translation and alias (normalized) to its disease key."""
+        index: Dict[str, str] = {}
+
+        def _add(name: str, key: str) -> None:
+            lookup = _name_lookup_key(name)
+            if not lookup:
+                return
+            existing = index.setdefault(lookup, key)
+            if existing != key:
+                logger.warning(f"Disease name '{name}' is ambiguous ({existing}, {key}); keeping {existing}")
+
+        for key in self.diseases:
+            _add(key, key)
+        for translations in self.disease_names.values():
+            for key, value in translations.items():
+                _add(value, key)
+        for key, aliases in self.aliases.items():
+            for alias in aliases:
+                _add(alias, key)
+        return index
+
+    def _build_recommended_treatments(self) -> Dict[str, List[str]]:
+        """Treatments mentioned in each disease's English remedies."""
+        recommended = {}
+        for disease in self.diseases:
+            keywords = set()
+            for remedy in _remedies_list(self, disease, self.default_language):
+                keywords |= self.treatment_matcher.find(remedy)
+            recommended[disease] = sorted(keywords)
+        return recommended
+
 
-DISEASE_REMEDIES = {
-    "Early_Blight": {
-        "symptoms": ["Brown spots on lower leaves", "Concentric rings on spots", "Yellow halo around spots"],
-        "remedies": [
-            "Remove infected leaves",
-            "Apply copper fungicide spray",
-            "Improve air circulation",
-            "Water at soil level to keep leaves dry",
-            "Avoid overhead watering"
-        ],
-        "prevention": [
-            "Space plants properly",
-            "Use disease-resistant varieties",
-            "Practice crop rotation",
-            "Mulch soil to prevent spores from splashing",
-            "Remove plant debris"
-        ]
-    },
-    "Late_Blight": {
-        "symptoms": ["Water-soaked spots on leaves and stems", "White mold on leaf undersides", "Soft rot on fruits"],
-        "remedies": [
-            "Remove infected plant parts immediately",
-            "Apply mancozeb or chlorothalonil fungicide",
-            "Improve air circulation",
-            "Reduce moisture on plants",
-            "Avoid overhead irrigation"
-        ],
-        "prevention": [
-            "Plant resistant varieties",
-            "Use disease-free seed potatoes",
-            "Practice crop rotation",
-            "Monitor weather for high humidity",
-            "Remove volunteer potato plants"
-        ]
-    },
-    "Powdery_Mildew": {
-        "symptoms": ["White powdery coating on leaves", "Yellowing of affected leaves", "Leaf curling"],
-        "remedies": [
-            "Apply sulfur dust or spray",
-            "Use potassium bicarbonate fungicide",
-            "Increase air circulation",
-            "Remove heavily infected leaves",
-            "Avoid high nitrogen fertilizer"
-        ],
-        "prevention": [
-            "Plant in well-ventilated areas",
-            "Choose resistant varieties",
-            "Maintain proper spacing",
-            "Avoid overhead watering",
-            "Clean up plant debris"
-        ]
-    },
-    "Leaf_Rust": {
-        "symptoms": ["Orange-brown pustules on leaf undersides", "Yellow spots on upper leaf surface", "Severe leaf drop"],
-        "remedies": [
-            "Apply fungicide containing sulfur or copper",
-            "Remove infected leaves",
-            "Improve plant spacing for air flow",
-            "Avoid overhead irrigation",
-            "Apply mancozeb fungicide"
-        ],
-        "prevention": [
-            "Use resistant varieties",
-            "Practice crop rotation",
-            "Remove alternate hosts",
-            "Maintain sanitation",
-            "Monitor plants regularly"
-        ]
-    },
-    "Septoria_Leaf_Spot": {
-        "symptoms": ["Small circular spots with dark borders", "Gray center with black dots", "Spot coalescence"],
-        "remedies": [
-            "Remove infected leaves",
-            "Apply chlorothalonil fungicide",
-            "Space plants properly",
-            "Avoid splashing soil onto leaves",
-            "Water at soil level"
-        ],
-        "prevention": [
-            "Use disease-resistant varieties",
-            "Practice crop rotation",
-            "Remove plant debris",
-            "Avoid overhead watering",
-            "Improve air circulation"
-        ]
-    },
-    "Healthy": {
-        "symptoms": ["No disease signs present"],
-        "remedies": [
-            "Continue regular maintenance",
-            "Monitor plant health",
-            "Practice preventive care"
-        ],
-        "prevention": [
-            "Maintain proper watering",
-            "Ensure adequate spacing",
-            "Provide proper nutrition",
-            "Monitor for early disease signs"
-        ]
-    }
-}
-
-# Crop name translations
-CROP_TRANSLATIONS = {
-    "en": {
-        "Tomato": "Tomato",
-        "Potato": "Potato",
-        "Grape": "Grape",
-        "Corn": "Corn",
-        "Wheat": "Wheat",
-    },
-    "te": {
-        "Tomato": "టమాటా",
-        "Potato": "బంగాళాదుంప",
-        "Grape": "ద్రాక్ష",
-        "Corn": "మొక్కజొన్న",
-        "Wheat": "గోధుమ",
-    },
-    "hi": {
-        "Tomato": "टमाटर",
-        "Potato": "आलू",
-        "Grape": "अंगूर",
-        "Corn": "मक्का",
-        "Wheat": "गेहूं",
-    },
-    "kn": {
-        "Tomato": "ಟೊಮೇಟೊ",
-        "Potato": "ಆಲೂಗಡ್ಡೆ",
-        "Grape": "ದ್ರಾಕ್ಷಿ",
-        "Corn": "ಜೋಳ",
-        "Wheat": "ಗೋಧಿ",
-    },
-    "ml": {
-        "Tomato": "തക്കാളി",
-        "Potato": "ഉരുളക്കിഴങ്ങ്",
-        "Grape": "മുന്തിരി",
-        "Corn": "ചോളം",
-        "Wheat": "ഗോതമ്പ്",
-    }
-}
-
-# Disease name translations
-DISEASE_TRANSLATIONS = {
-    "en": {
-        "Early_Blight": "Early Blight",
-        "Late_Blight": "Late Blight",
-        "Powdery_Mildew": "Powdery Mildew",
-        "Leaf_Rust": "Leaf Rust",
-        "Septoria_Leaf_Spot": "Septoria Leaf Spot",
-        "Healthy": "Healthy",
-    },
-    "te": {
-        "Early_Blight": "తొలి ఫాతు",
-        "Late_Blight": "చివరి ఫాతు",
-        "Powdery_Mildew": "పౌడర్ మిల్డ్యూ",
-        "Leaf_Rust": "ఆకు తుప్పు",
-        "Septoria_Leaf_Spot": "సెప్టోరియా ఆకు చుక్క",
-        "Healthy": "ఆరోగ్యం",
-    },
-    "hi": {
-        "Early_Blight": "प्रारंभिक झुलसा",
-        "Late_Blight": "देर से झुलसा",
-        "Powdery_Mildew": "पाउडर फफूंदी",
-        "Leaf_Rust": "पत्ती की जंग",
-        "Septoria_Leaf_Spot": "सेप्टोरिया पत्ती धब्बा",
-        "Healthy": "स्वस्थ",
-    },
-    "kn": {
-        "Early_Blight": "ಆರಂಭಿಕ ಬ್ಲೈಟ್",
-        "Late_Blight": "ತಡವಾದ ಬ್ಲೈಟ್",
-        "Powdery_Mildew": "ಪುಡಿ ಶಿಲೀಂಧ್ರ",
-        "Leaf_Rust": "ಎಲೆ ತುಕ್ಕು",
-        "Septoria_Leaf_Spot": "ಸೆಪ್ಟೋರಿಯಾ ಎಲೆ ಕಲೆ",
-        "Healthy": "ಆರೋಗ್ಯಕರ",
-    },
-    "ml": {
-        "Early_Blight": "ആദ്യകാല ബ്ലൈറ്റ്",
-        "Late_Blight": "വൈകിയുള്ള ബ്ലൈറ്റ്",
-        "Powdery_Mildew": "പൊടി ഫംഗസ്",
-        "Leaf_Rust": "ഇല തുരുമ്പ്",
-        "Septoria_Leaf_Spot": "സെപ്റ്റോറിയ ഇല പാട്",
-        "Healthy": "ആരോഗ്യമുള്ള",
-    }
-}
-
-# Remedy translations
-REMEDY_TRANSLATIONS = {
-    "en": {
-        "Early_Blight": [
-            "Remove infected leaves",
-            "Apply copper fungicide spray",
-            "Improve air circulation",
-            "Water at soil level to keep leaves dry",
-            "Avoid overhead watering"
-        ],
-        "Late_Blight": [
-            "Remove infected plant parts immediately",
-            "Apply mancozeb or chlorothalonil fungicide",
-            "Improve air circulation",
-            "Reduce moisture on plants",
-            "Avoid overhead irrigation"
-        ],
-        "Powdery_Mildew": [
-            "Apply sulfur dust or spray",
-            "Use potassium bicarbonate fungicide",
-            "Increase air circulation",
-            "Remove heavily infected leaves",
-            "Avoid high nitrogen fertilizer"
-        ],
-        "Leaf_Rust": [
-            "Apply fungicide containing sulfur or copper",
-            "Remove infected leaves",
-            "Improve plant spacing for air flow",
-            "Avoid overhead irrigation",
-            "Apply mancozeb fungicide"
-        ],
-        "Septoria_Leaf_Spot": [
-            "Remove infected leaves",
-            "Apply chlorothalonil fungicide",
-            "Space plants properly",
-            "Avoid splashing soil onto leaves",
-            "Water at soil level"
-        ],
-        "Healthy": [
-            "Continue regular maintenance",
-            "Monitor plant health",
-            "Practice preventive care"
-        ]
-    },
-    "te": {
-        "Early_Blight": [
-            "బాధిత ఆకులను తొలగించండి",
-            "కాపర్ ఫంగిసైడ్ స్ప్రే వేయండి",
-            "గాలి ప్రసరణను మెరుగుపరచండి",
-            "ఆకులు పొడిగా ఉండేలా నేల స్థాయిలో నీరు పోయండి",
-            "పై నుంచి నీరు పోయడం నివారించండి"
-        ],
-        "Late_Blight": [
-            "బాధిత మొక్క భాగాలను వెంటనే తొలగించండి",
-            "మాంకోజెబ్ లేదా క్లోరోథలోనిల్ ఫంగిసైడ్ వేయండి",
-            "గాలి ప్రసరణను మెరుగుపరచండి",
-            "మొక్కలపై తేమను తగ్గించండి",
-            "పైనుంచి నీటిపారుదల నివారించండి"
-        ],
-        "Powdery_Mildew": [
-            "సల్ఫర్ పొడి లేదా స్ప్రే వేయండి",
-            "పొటాషియం బైకార్బోనేట్ ఫంగిసైడ్ ఉపయోగించండి",
-            "గాలి ప్రసరణను పెంచండి",
-            "అధికంగా బాధిత ఆకులను తొలగించండి",
-            "అధిక నత్రజని ఎరువు నివారించండి"
-        ],
-        "Leaf_Rust": [
-            "సల్ఫర్ లేదా కాపర్ కలిగిన ఫంగిసైడ్ వేయండి",
-            "బాధిత ఆకులను తొలగించండి",
-            "గాలి ప్రవాహం కోసం మొక్కల అంతరం మెరుగుపరచండి",
-            "పై నుంచి నీటిపారుదల నివారించండి",
-            "మాంకోజెబ్ ఫంగిసైడ్ వేయండి"
-        ],
-        "Septoria_Leaf_Spot": [
-            "బాధిత ఆకులను తొలగించండి",
-            "క్లోరోథలోనిల్ ఫంగిసైడ్ వేయండి",
-            "మొక్కలను సరిగ్గా అంతరం ఉంచండి",
-            "ఆకులపై నేల చిమ్మడం నివారించండి",
-            "నేల స్థాయిలో నీరు పోయండి"
-        ],
-        "Healthy": [
-            "క్రమంగా నిర్వహణ కొనసాగించండి",
-            "మొక్క ఆరోగ్యాన్ని పర్యవేక్షించండి",
-            "నివారణ సంరక్షణ పాటించండి"
-        ]
-    },
-    "hi": {
-        "Early_Blight": [
-            "संक्रमित पत्तियाँ हटाएँ",
-            "कॉपर फंगीसाइड स्प्रे करें",
-            "हवा का संचार सुधारें",
-            "पत्तियों को सूखा रखने के लिए मिट्टी स्तर पर पानी दें",
-            "ऊपर से पानी देने से बचें"
-        ],
-        "Late_Blight": [
-            "संक्रमित पौधे के हिस्से तुरंत हटाएँ",
-            "मैनकोजेब या क्लोरोथैलोनिल फंगीसाइड लगाएँ",
-            "हवा का संचार सुधारें",
-            "पौधों पर नमी कम करें",
-            "ऊपर से सिंचाई से बचें"
-        ],
-        "Powdery_Mildew": [
-            "सल्फर धूल या स्प्रे लगाएँ",
-            "पोटैशियम बाइकार्बोनेट फंगीसाइड उपयोग करें",
-            "हवा का संचार बढ़ाएँ",
-            "अत्यधिक संक्रमित पत्तियाँ हटाएँ",
-            "उच्च नाइट्रोजन उर्वरक से बचें"
-        ],
-        "Leaf_Rust": [
-            "सल्फर या कॉपर युक्त फंगीसाइड लगाएँ",
-            "संक्रमित पत्तियाँ हटाएँ",
-            "हवा प्रवाह के लिए पौधों की दूरी सुधारें",
-            "ऊपर से सिंचाई से बचें",
-            "मैनकोजेब फंगीसाइड लगाएँ"
-        ],
-        "Septoria_Leaf_Spot": [
-            "संक्रमित पत्तियाँ हटाएँ",
-            "क्लोरोथैलोनिल फंगीसाइड लगाएँ",
-            "पौधों को सही दूरी पर रखें",
-            "पत्तियों पर मिट्टी छींटने से बचें",
-            "मिट्टी स्तर पर पानी दें"
-        ],
-        "Healthy": [
-            "नियमित रखरखाव जारी रखें",
-            "पौधों के स्वास्थ्य की निगरानी करें",
-            "निवारक देखभाल का अभ्यास करें"
-        ]
-    },
-    "kn": {
-        "Early_Blight": [
-            "ಸೋಂಕಿತ ಎಲೆಗಳನ್ನು ತೆಗೆದುಹಾಕಿ",
-            "ಕಾಪರ್ ಶಿಲೀಂಧ್ರನಾಶಕ ಸ್ಪ್ರೇ ಅನ್ವಯಿಸಿ",
-            "ಗಾಳಿ ಪರಿಚಲನೆಯನ್ನು ಸುಧಾರಿಸಿ",
-            "ಎಲೆಗಳನ್ನು ಒಣಗಿಸಲು ಮಣ್ಣಿನ ಮಟ್ಟದಲ್ಲಿ ನೀರು ಹಾಕಿ",
-            "ಮೇಲಿನಿಂದ ನೀರು ಹಾಕುವುದನ್ನು ತಪ್ಪಿಸಿ"
-        ],
-        "Late_Blight": [
-            "ಸೋಂಕಿತ ಸಸ್ಯ ಭಾಗಗಳನ್ನು ತಕ್ಷಣ ತೆಗೆದುಹಾಕಿ",
-            "ಮ್ಯಾಂಕೋಜೆಬ್ ಅಥವಾ ಕ್ಲೋರೋಥಲೋನಿಲ್ ಶಿಲೀಂಧ್ರನಾಶಕ ಅನ್ವಯಿಸಿ",
-            "ಗಾಳಿ ಪರಿಚಲನೆಯನ್ನು ಸುಧಾರಿಸಿ",
-            "ಸಸ್ಯಗಳ ಮೇಲೆ ತೇವಾಂಶವನ್ನು ಕಡಿಮೆ ಮಾಡಿ",
-            "ಮೇಲಿನಿಂದ ನೀರಾವರಿಯನ್ನು ತಪ್ಪಿಸಿ"
-        ],
-        "Powdery_Mildew": [
-            "ಗಂಧಕ ಪುಡಿ ಅಥವಾ ಸ್ಪ್ರೇ ಅನ್ವಯಿಸಿ",
-            "ಪೊಟ್ಯಾಸಿಯಮ್ ಬೈಕಾರ್ಬೋನೇಟ್ ಶಿಲೀಂಧ್ರನಾಶಕ ಬಳಸಿ",
-            "ಗಾಳಿ ಪರಿಚಲನೆಯನ್ನು ಹೆಚ್ಚಿಸಿ",
-            "ಅತೀವವಾಗಿ ಸೋಂಕಿತ ಎಲೆಗಳನ್ನು ತೆಗೆದುಹಾಕಿ",
-            "ಹೆಚ್ಚಿನ ಸಾರಜನಕ ರಸಗೊಬ್ಬರವನ್ನು ತಪ್ಪಿಸಿ"
-        ],
-        "Leaf_Rust": [
-            "ಗಂಧಕ ಅಥವಾ ತಾಮ್ರ ಹೊಂದಿರುವ ಶಿಲೀಂಧ್ರನಾಶಕ ಅನ್ವಯಿಸಿ",
-            "ಸೋಂಕಿತ ಎಲೆಗಳನ್ನು ತೆಗೆದುಹಾಕಿ",
-            "ಗಾಳಿ ಹರಿವಿಗಾಗಿ ಸಸ್ಯ ಅಂತರವನ್ನು ಸುಧಾರಿಸಿ",
-            "ಮೇಲಿನಿಂದ ನೀರಾವರಿಯನ್ನು ತಪ್ಪಿಸಿ",
-            "ಮ್ಯಾಂಕೋಜೆಬ್ ಶಿಲೀಂಧ್ರನಾಶಕ ಅನ್ವಯಿಸಿ"
-        ],
-        "Septoria_Leaf_Spot": [
-            "ಸೋಂಕಿತ ಎಲೆಗಳನ್ನು ತೆಗೆದುಹಾಕಿ",
-            "ಕ್ಲೋರೋಥಲೋನಿಲ್ ಶಿಲೀಂಧ್ರನಾಶಕ ಅನ್ವಯಿಸಿ",
-            "ಸಸ್ಯಗಳನ್ನು ಸರಿಯಾಗಿ ಅಂತರಿಸಿ",
-            "ಎಲೆಗಳ ಮೇಲೆ ಮಣ್ಣು ಚಿಮ್ಮುವುದನ್ನು ತಪ್ಪಿಸಿ",
-            "ಮಣ್ಣಿನ ಮಟ್ಟದಲ್ಲಿ ನೀರು ಹಾಕಿ"
-        ],
-        "Healthy": [
-            "ನಿಯಮಿತ ನಿರ್ವಹಣೆಯನ್ನು ಮುಂದುವರಿಸಿ",
-            "ಸಸ್ಯ ಆರೋಗ್ಯವನ್ನು ಮೇಲ್ವಿಚಾರಣೆ ಮಾಡಿ",
-            "ತಡೆಗಟ್ಟುವ ಆರೈಕೆಯನ್ನು ಅಭ್ಯಾಸ ಮಾಡಿ"
-        ]
-    },
-    "ml": {
-        "Early_Blight": [
-            "രോഗബാധിത ഇലകൾ നീക്കം ചെയ്യുക",
-            "കോപ്പർ ഫംഗിസൈഡ് സ്പ്രേ പ്രയോഗിക്കുക",
-            "വായു സഞ്ചാരം മെച്ചപ്പെടുത്തുക",
-            "ഇലകൾ ഉണങ്ങി നിലനിർത്താൻ മണ്ണ് നിലയിൽ വെള്ളം ഒഴിക്കുക",
-            "മുകളിൽ നിന്ന് വെള്ളം ഒഴിക്കുന്നത് ഒഴിവാക്കുക"
-        ],
-        "Late_Blight": [
-            "രോഗബാധിത ചെടി ഭാഗങ്ങൾ ഉടൻ നീക്കം ചെയ്യുക",
-            "മാൻകോസെബ് അല്ലെങ്കിൽ ക്ലോറോതലോനിൽ ഫംഗിസൈഡ് പ്രയോഗിക്കുക",
-            "വായു സഞ്ചാരം മെച്ചപ്പെടുത്തുക",
-            "ചെടികളിലെ ഈർപ്പം കുറയ്ക്കുക",
-            "മുകളിൽ നിന്നുള്ള ജലസേചനം ഒഴിവാക്കുക"
-        ],
-        "Powdery_Mildew": [
-            "സൾഫർ പൊടി അല്ലെങ്കിൽ സ്പ്രേ പ്രയോഗിക്കുക",
-            "പൊട്ടാസ്യം ബൈകാർബണേറ്റ് ഫംഗിസൈഡ് ഉപയോഗിക്കുക",
-            "വായു സഞ്ചാരം വർദ്ധിപ്പിക്കുക",
-            "കൂടുതൽ രോഗബാധിത ഇലകൾ നീക്കം ചെയ്യുക",
-            "ഉയർന്ന നൈട്രജൻ വളം ഒഴിവാക്കുക"
-        ],
-        "Leaf_Rust": [
-            "സൾഫർ അല്ലെങ്കിൽ കോപ്പർ അടങ്ങിയ ഫംഗിസൈഡ് പ്രയോഗിക്കുക",
-            "രോഗബാധിത ഇലകൾ നീക്കം ചെയ്യുക",
-            "വായു പ്രവാഹത്തിനായി ചെടി അകലം മെച്ചപ്പെടുത്തുക",
-            "മുകളിൽ നിന്നുള്ള ജലസേചനം ഒഴിവാക്കുക",
-            "മാൻകോസെബ് ഫംഗിസൈഡ് പ്രയോഗിക്കുക"
-        ],
-        "Septoria_Leaf_Spot": [
-            "രോഗബാധിത ഇലകൾ നീക്കം ചെയ്യുക",
-            "ക്ലോറോതലോനിൽ ഫംഗിസൈഡ് പ്രയോഗിക്കുക",
-            "ചെടികൾ ശരിയായി അകറ്റി വയ്ക്കുക",
-            "ഇലകളിൽ മണ്ണ് തെറിക്കുന്നത് ഒഴിവാക്കുക",
-            "മണ്ണ് നിലയിൽ വെള്ളം ഒഴിക്കുക"
-        ],
-        "Healthy": [
-            "പതിവ് പരിപാലനം തുടരുക",
-            "ചെടിയുടെ ആരോഗ്യം നിരീക്ഷിക്കുക",
-            "പ്രതിരോധ പരിചരണം പരിശീലിക്കുക"
-        ]
-    }
-}
-
-TREATMENT_FEEDBACK_TRANSLATIONS = {
-    "en": {
-        "match": "✓ This product matches recommended treatment for {disease}.",
-        "no_match": "✗ This product does not match recommended treatments.\n\nRecommended: {suggestions}",
-        "no_disease": "No disease detected. Treatment is not required.",
-        "need_label": "Please provide a clear product name for accurate feedback.",
-        "unknown_disease": "Disease not recognized. Unable to verify treatment."
-    },
-    "te": {
-        "match": "✓ ఈ ఉత్పత్తి {disease}కి సూచించిన చికిత్సతో సరిపోతుంది.",
-        "no_match": "✗ ఈ ఉత్పత్తి సూచించిన చికిత్సతో సరిపోవడం లేదు.\n\nసూచించబడినది: {suggestions}",
-        "no_disease": "వ్యాధి గుర్తించబడలేదు. చికిత్స అవసరం లేదు.",
-        "need_label": "ఖచ్చితమైన అభిప్రాయానికి స్పష్టమైన ఉత్పత్తి పేరును ఇవ్వండి.",
-        "unknown_disease": "వ్యాధిని గుర్తించలేకపోయాము. చికిత్సను నిర్ధారించలేము."
-    },
-    "hi": {
-        "match": "✓ यह उत्पाद {disease} के लिए सुझाए गए उपचार से मेल खाता है।",
-        "no_match": "✗ यह उत्पाद सुझाए गए उपचार से मेल नहीं खाता है।\n\nसुझाया गया: {suggestions}",
-        "no_disease": "कोई रोग नहीं मिला। उपचार आवश्यक नहीं है।",
-        "need_label": "सटीक प्रतिक्रिया के लिए कृपया स्पष्ट उत्पाद नाम दें।",
-        "unknown_disease": "रोग पहचाना नहीं गया। उपचार की पुष्टि नहीं की जा सकती।"
-    },
-    "kn": {
-        "match": "✓ ಈ ಉತ್ಪನ್ನ {disease}ಕ್ಕೆ ಶಿಫಾರಸು ಮಾಡಿದ ಚಿಕಿತ್ಸೆಗೆ ಹೊಂದಿಕೆಯಾಗುತ್ತದೆ.",
-        "no_match": "✗ ಈ ಉತ್ಪನ್ನ ಶಿಫಾರಸು ಮಾಡಿದ ಚಿಕಿತ್ಸೆಗೆ ಹೊಂದಿಕೆಯಾಗುವುದಿಲ್ಲ.\n\nಶಿಫಾರಸು: {suggestions}",
-        "no_disease": "ಯಾವುದೇ ರೋಗ ಕಂಡುಬಂದಿಲ್ಲ. ಚಿಕಿತ್ಸೆ ಅಗತ್ಯವಿಲ್ಲ.",
-        "need_label": "ಖಚಿತ ಪ್ರತಿಕ್ರಿಯೆಗೆ ಸ್ಪಷ್ಟ ಉತ್ಪನ್ನ ಹೆಸರನ್ನು ನೀಡಿ.",
-        "unknown_disease": "ರೋಗವನ್ನು ಗುರುತಿಸಲಾಗಲಿಲ್ಲ. ಚಿಕಿತ್ಸೆಯನ್ನು ಪರಿಶೀಲಿಸಲಾಗುವುದಿಲ್ಲ."
-    },
-    "ml": {
-        "match": "✓ ഈ ഉൽപ്പന്നം {disease}ന് ശുപാർശ ചെയ്ത ചികിത്സയുമായി പൊരുത്തപ്പെടുന്നു.",
-        "no_match": "✗ ഈ ഉൽപ്പന്നം ശുപാർശ ചെയ്ത ചികിത്സയുമായി പൊരുത്തപ്പെടുന്നില്ല.\n\nശുപാർശ: {suggestions}",
-        "no_disease": "രോഗം കണ്ടെത്തിയില്ല. ചികിത്സ ആവശ്യമില്ല.",
-        "need_label": "കൃത്യമായ പ്രതികരണത്തിനായി വ്യക്തമായ ഉൽപ്പന്ന പേര് നൽകുക.",
-        "unknown_disease": "രോഗം തിരിച്ചറിയാനായില്ല. ചികിത്സ സ്ഥിരീകരിക്കാൻ കഴിയില്ല."
-    }
-}
-
-# Common treatment keywords to match against
-TREATMENT_KEYWORDS = {
-    # Fungicides
-    "mancozeb": ["mancozeb", "dithane"],
-    "chlorothalonil": ["chlorothalonil", "bravo", "daconil"],
-    "sulfur": ["sulfur", "sulphur", "sul"],
-    "copper": ["copper", "kocide", "cuprofix"],
-    "carbendazim": ["carbendazim", "bavistin"],
-    
-    # Other fungicides
-    "potassium bicarbonate": ["potassium bicarbonate", "bicarbonate", "kaligreen"],
-    "neem": ["neem", "azadirachtin"],
-    
-    # Generic terms
-    "fungicide": ["fungicide", "antifungal", "fungus control", "fungus"],
-    "bactericide": ["bactericide", "antibacterial", "bacteria control"],
-}
+def _remedies_list(kb: KnowledgeBase, disease: str, language: str) -> List[str]:
+    # Get translated remedies if available
+    translated_remedies = kb.language(language)["remedies"].get(disease)
+    if translated_remedies:
+        return translated_remedies
+
+    # Fallback to English remedies from the disease entries
+    remedies_data = kb.diseases.get(disease, kb.diseases.get("Healthy"))
+    if remedies_data:
+        return remedies_data.get("remedies", [])
+    return []
+
+
+# -----------------------------------
+# Current snapshot
+# -----------------------------------
+_knowledge_base: Optional[KnowledgeBase] = None
+_reload_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _reload_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase(default_remedies_dir())
+    return _knowledge_base
 
 
 class RemedyService:
     """Service for managing disease remedies and guidance."""
-    
+
     @staticmethod
     def get_remedies(disease: str) -> Optional[Dict]:
         """Get remedies for a disease."""
-        return DISEASE_REMEDIES.get(disease, DISEASE_REMEDIES.get("Healthy"))
-    
+        diseases = get_knowledge_base().diseases
+        return diseases.get(disease, diseases.get("Healthy"))
+
     @staticmethod
     def get_remedies_list(disease: str, language: str = "en") -> List[str]:
         """Get list of remedies for a disease in the specified language."""
-        # Get translated remedies if available
-        remedy_translations = REMEDY_TRANSLATIONS.get(language, REMEDY_TRANSLATIONS["en"])
-        translated_remedies = remedy_translations.get(disease)
-        
-        if translated_remedies:
-            return translated_remedies
-        
-        # Fallback to English remedies from DISEASE_REMEDIES
-        remedies_data = DISEASE_REMEDIES.get(disease, DISEASE_REMEDIES.get("Healthy"))
-        if remedies_data:
-            return remedies_data.get("remedies", [])
-        return []
-    
+        return _remedies_list(get_knowledge_base(), disease, language)
+
     @staticmethod
     def get_translated_disease(disease: str, language: str = "en") -> str:
         """Get disease name in requested language."""
-        translations = DISEASE_TRANSLATIONS.get(language, DISEASE_TRANSLATIONS["en"])
+        names = get_knowledge_base().disease_names
+        translations = names.get(language, names["en"])
         return translations.get(disease, disease)
-    
+
     @staticmethod
     def get_translated_crop(crop: str, language: str = "en") -> str:
         """Get crop name in requested language."""
-        translations = CROP_TRANSLATIONS.get(language, CROP_TRANSLATIONS["en"])
+        translations = get_knowledge_base().language(language)["crops"]
         return translations.get(crop, crop)
-    
+
+    @staticmethod
+    def get_treatment_fragment(disease: str, language: str = "en") -> TreatmentFragment:
+        """
+        /suggested-treatments response without stores, serialized once per
+        (disease key, language) until the remedies are reloaded.
+
+        Only diseases and languages of the knowledge base are cached; any other
+        name a client sends is serialized per call, so the cache stays bounded.
+        """
+        kb = get_knowledge_base()
+        fragments = kb.treatment_fragments
+        fragment = fragments.get((disease, language))
+        if fragment is None:
+            payload = {
+                "disease": RemedyService.get_translated_disease(disease, language),
+                "language": language,
+                "remedies": RemedyService.get_remedies_list(disease, language),
+                "stores": [],
+            }
+            # Same encoding as FastAPI's JSONResponse
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            fragment = TreatmentFragment(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            if disease in kb.diseases and language in kb.languages:
+                fragments[(disease, language)] = fragment
+        return fragment
+
+    @staticmethod
+    def get_detection_fragment(crop: str, disease: str, language: str = "en") -> Dict:
+        """
+        Translated crop, disease and remedies of a detection response, built once
+        per (crop, disease, language). Shared: callers must not modify it.
+        """
+        fragments = get_knowledge_base().detection_fragments
+        fragment = fragments.get((crop, disease, language))
+        if fragment is None:
+            fragment = {
+                "crop": RemedyService.get_translated_crop(crop, language),
+                "disease": RemedyService.get_translated_disease(disease, language),
+                "remedies": RemedyService.get_remedies_list(disease, language),
+            }
+            fragments[(crop, disease, language)] = fragment
+        return fragment
+
     @staticmethod
     def validate_language(language: str) -> str:
         """Validate and return language code (default to 'en')."""
-        if language in DISEASE_TRANSLATIONS:
+        if language in get_knowledge_base().languages:
             return language
         return "en"
 
     @staticmethod
     def normalize_disease_name(disease: str) -> str:
         """Normalize disease name to internal key if possible."""
-        if disease in DISEASE_REMEDIES:
+        kb = get_knowledge_base()
+        if disease in kb.diseases:
             return disease
         if not disease:
             return disease
-        disease_lower = disease.strip().lower()
-        for _, translations in DISEASE_TRANSLATIONS.items():
-            for key, value in translations.items():
-                if value.strip().lower() == disease_lower:
-                    return key
-        return disease
+        return kb.name_index.get(_name_lookup_key(disease), disease)
 
     @staticmethod
     def extract_treatment_keywords(remedies: List[str]) -> List[str]:
         """Extract treatment keywords from remedy text."""
+        matcher = get_knowledge_base().treatment_matcher
         keywords = set()
         for remedy in remedies:
-            remedy_lower = remedy.lower()
-            # Check against all known treatment keywords
-            for treatment_name, treatment_variants in TREATMENT_KEYWORDS.items():
-                for variant in treatment_variants:
-                    if variant in remedy_lower:
-                        keywords.add(treatment_name)
+            keywords |= matcher.find(remedy)
         return sorted(list(keywords))
 
+    @staticmethod
+    def get_recommended_treatments(disease: str) -> List[str]:
+        """Treatment keywords found in a disease's English remedies (precomputed at load)."""
+        return get_knowledge_base().recommended_treatments.get(disease, [])
+
     @staticmethod
     def evaluate_treatment(disease: str, item_label: Optional[str], language: str = "en") -> Dict:
         """Evaluate if an item label matches recommended treatment for a disease."""
+        kb = get_knowledge_base()
         language = RemedyService.validate_language(language)
-        feedback_translations = TREATMENT_FEEDBACK_TRANSLATIONS.get(language, TREATMENT_FEEDBACK_TRANSLATIONS["en"])
+        feedback_translations = kb.language(language)["feedback"]
 
         normalized_disease = RemedyService.normalize_disease_name(disease)
         translated_disease = RemedyService.get_translated_disease(normalized_disease, language)
@@ -551,7 +317,7 @@ class RemedyService:
                 "feedback": feedback_translations["no_disease"]
             }
 
-        if normalized_disease not in DISEASE_REMEDIES:
+        if normalized_disease not in kb.diseases:
             return {
                 "disease": translated_disease,
                 "language": language,
@@ -570,21 +336,10 @@ class RemedyService:
                 "feedback": feedback_translations["need_label"]
             }
 
-        # Get remedies for this disease
-        remedies = RemedyService.get_remedies_list(normalized_disease, "en")
-        recommended_keywords = RemedyService.extract_treatment_keywords(remedies)
-        
-        # Check if the item label matches any recommended treatment
-        will_cure = False
-        for treatment_name, treatment_variants in TREATMENT_KEYWORDS.items():
-            if treatment_name in recommended_keywords:
-                for variant in treatment_variants:
-                    if variant in label:
-                        will_cure = True
-                        break
-            if will_cure:
-                break
-        
+        # Check if the item label matches any recommended treatment (one pass over the label)
+        recommended_keywords = kb.recommended_treatments.get(normalized_disease, [])
+        will_cure = kb.treatment_matcher.contains_any(label, set(recommended_keywords))
+
         # Build feedback message
         if will_cure:
             feedback = feedback_translations["match"].format(disease=translated_disease)
@@ -607,4 +362,49 @@ class RemedyService:
 
 def load_remedies():
     """Initialize remedies service at startup."""
-    logger.info(f"Loaded remedies for {len(DISEASE_REMEDIES)} disease types")
+    kb = get_knowledge_base()
+    logger.info(
+        f"Loaded remedies for {len(kb.diseases)} disease types, knowledge base {kb.version} "
+        f"({len(kb.name_index)} disease names, {kb.treatment_matcher.patterns} treatment keyword variants)"
+    )
+
+
+def reload_remedies(force: bool = False) -> Dict:
+    """
+    Load the knowledge base files again and swap the new snapshot in.
+
+    Without force, nothing happens if no file changed. Raises if the new
+    files are invalid; the current snapshot then stays active.
+    """
+    global _knowledge_base
+    with _reload_lock:
+        current = _knowledge_base
+        directory = default_remedies_dir()
+        if not force and current is not None and directory_signature(directory) == current.signature:
+            return {"reloaded": False, "version": current.version}
+
+        new = KnowledgeBase(directory)
+        # Keep warm the languages this worker already serves
+        for language in (current.loaded_languages if current is not None else []):
+            new.language(language)
+        _knowledge_base = new
+
+    previous = current.version if current is not None else None
+    logger.info(f"Remedies knowledge base reloaded: {previous} -> {new.version}")
+    return {"reloaded": True, "version": new.version, "previous_version": previous}
+
+
+async def watch_remedies(interval_seconds: float) -> None:
+    """Reload the knowledge base whenever its files change (polls mtimes)."""
+    rejected = None  # signature of files that failed to load, not retried until edited again
+    while True:
+        await asyncio.sleep(interval_seconds)
+        signature = None
+        try:
+            signature = await asyncio.to_thread(directory_signature, default_remedies_dir())
+            if signature == rejected:
+                continue
+            await asyncio.to_thread(reload_remedies)
+        except Exception as e:
+            rejected = signature
+            logger.error(f"Remedies reload failed, keeping the current version: {e}")
@@ -0,0 +1,221 @@
+"""
+Detection result cache for repeated image uploads.
+
+Entries are keyed by the SHA-256 of the uploaded bytes and, optionally, by a
+64-bit perceptual hash (dHash) so near-identical re-uploads (re-encoded
+retries, re-scans of the same leaf) also hit. Entries store the English
+prediction (disease, confidence, crop), so hits are still translated per
+language by RemedyService. Eviction is LRU bounded by size plus a TTL.
+
+Exports:
+- DetectionResultCache
+- CacheKey, CachedResult
+- get_result_cache(): process-wide cache, or None when disabled
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[str, float, str]
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    digest: str
+    phash: Optional[int] = None
+
+
+@dataclass
+class CachedResult:
+    prediction: Prediction
+    phash: Optional[int]
+    expires_at: float
+    # (device token, latitude, longitude) whose detection/search rows were already written
+    recorded_for: Set[Tuple[str, Optional[float], Optional[float]]] = field(default_factory=set)
+
+    def was_recorded(self, device_token: Optional[str], latitude: Optional[float], longitude: Optional[float]) -> bool:
+        """True for a retry of an upload this device already stored at this location.
+
+        Anonymous uploads (no device token) are never treated as retries.
+        """
+        return device_token is not None and (device_token, latitude, longitude) in self.recorded_for
+
+    def mark_recorded(self, device_token: Optional[str], latitude: Optional[float], longitude: Optional[float]) -> None:
+        if device_token is not None:
+            self.recorded_for.add((device_token, latitude, longitude))
+
+
+def perceptual_hash(image_bytes: bytes) -> Optional[int]:
+    """Return a 64-bit difference hash of the image, or None if undecodable."""
+    try:
+        from ..utils.image_processing import open_image
+    except ImportError:
+        return None
+
+    try:
+        image = open_image(image_bytes)
+        # JPEG: decode at reduced scale, we only need 9x8 pixels
+        image.draft("L", (64, 64))
+        pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception as e:
+        logger.debug(f"Perceptual hash failed: {e}")
+        return None
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits
+
+
+class DetectionResultCache:
+    """LRU + TTL cache of predictions keyed by content and perceptual hash.
+
+    Args:
+        max_entries: Maximum number of cached predictions.
+        ttl_seconds: Lifetime of an entry.
+        use_phash: Also match images by perceptual hash.
+        phash_max_distance: Maximum Hamming distance counted as the same image.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        use_phash: bool = False,
+        phash_max_distance: int = 4,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.use_phash = use_phash
+        self.phash_max_distance = max(0, int(phash_max_distance))
+
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._phash_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def key_for(self, image_bytes: bytes, variant: Optional[str] = None) -> CacheKey:
+        """Compute the cache key (content digest and optional perceptual hash).
+
+        A variant (e.g. "tiled") gets its own exact-match entries only.
+        """
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        if variant:
+            return CacheKey(digest=f"{digest}:{variant}")
+        phash = perceptual_hash(image_bytes) if self.use_phash else None
+        return CacheKey(digest=digest, phash=phash)
+
+    async def akey_for(self, image_bytes: bytes, variant: Optional[str] = None) -> CacheKey:
+        """key_for in a worker thread: hashing a large upload would block the event loop."""
+        return await asyncio.to_thread(self.key_for, image_bytes, variant)
+
+    def get(self, key: CacheKey) -> Optional[CachedResult]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key.digest)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key.digest]
+                self._expirations += 1
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key.digest)
+                self._hits += 1
+                return entry
+
+            if key.phash is not None:
+                match = self._find_similar(key.phash, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self._hits += 1
+                    self._phash_hits += 1
+                    return self._entries[match]
+
+            self._misses += 1
+            return None
+
+    def put(self, key: CacheKey, prediction: Prediction) -> CachedResult:
+        entry = CachedResult(
+            prediction=prediction,
+            phash=key.phash,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            self._entries[key.digest] = entry
+            self._entries.move_to_end(key.digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "phash_enabled": self.use_phash,
+            "phash_max_distance": self.phash_max_distance,
+            "hits": self._hits,
+            "phash_hits": self._phash_hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
+
+    def _find_similar(self, phash: int, now: float) -> Optional[str]:
+        """Closest live entry within the Hamming-distance threshold (lock held)."""
+        best_digest = None
+        best_distance = self.phash_max_distance + 1
+        for digest, entry in self._entries.items():
+            if entry.phash is None or entry.expires_at <= now:
+                continue
+            distance = (entry.phash ^ phash).bit_count()
+            if distance < best_distance:
+                best_digest, best_distance = digest, distance
+                if distance == 0:
+                    break
+        return best_digest
+
+
+# -----------------------------------
+# Singleton
+# -----------------------------------
+_result_cache: Optional[DetectionResultCache] = None
+
+
+def get_result_cache() -> Optional[DetectionResultCache]:
+    global _result_cache
+    if not settings.detection_cache_enabled:
+        return None
+    if _result_cache is None:
+        _result_cache = DetectionResultCache(
+            max_entries=settings.detection_cache_max_entries,
+            ttl_seconds=settings.detection_cache_ttl_seconds,
+            use_phash=settings.detection_cache_phash_enabled,
+            phash_max_distance=settings.detection_cache_phash_max_distance,
+        )
+    return _result_cache
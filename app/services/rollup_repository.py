@@ -0,0 +1,288 @@
+"""
+Repository for detection rollups: pre-aggregated counts kept next to the events.
+
+Two rollups are added to in the same transaction as the detection events
+(upserts incrementing the counters), so reads cost a bounded number of
+rollup rows however many events an area has:
+- DetectionDailyRollup: (cell at MAP_ROLLUP_LEVEL, disease, UTC day) ->
+  count, for disease maps. Coarser zoom levels group cells by their parent
+  cell (a bit shift of the id).
+- DetectionHourlyRollup: (cell at ANALYTICS_ROLLUP_LEVEL, disease, crop,
+  UTC hour) -> count and confidence sum, for nearby outbreak summaries and
+  trend charts. An area is the set of cells whose centers lie within the
+  radius.
+
+Healthy results are rolled up like any class but left out of every read:
+they are not a disease to map, trend or flag as an outbreak.
+
+Exports:
+- RollupRepository
+- MAP_ROLLUP_LEVEL, ANALYTICS_ROLLUP_LEVEL, HEALTHY
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import DetectionDailyRollup, DetectionEvent, DetectionHourlyRollup
+from ..utils.geo_grid import box_ranges, cell_id, cells_within, parent_cell
+
+logger = logging.getLogger(__name__)
+
+# 360 / 2^12 degrees = 0.088 deg, about 10 km: finest cell a map can show
+MAP_ROLLUP_LEVEL = 12
+# 360 / 2^13 degrees = 0.044 deg, about 5 km: granularity of nearby summaries
+ANALYTICS_ROLLUP_LEVEL = 13
+# Detection class that is not a disease
+HEALTHY = "Healthy"
+
+
+def _as_utc(value: Optional[datetime]) -> datetime:
+    """Aware UTC datetime; naive values (SQLite) are taken as UTC, None is now."""
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _utc_day(created_at: Optional[datetime]) -> date:
+    return _as_utc(created_at).date()
+
+
+def _utc_hour(created_at: Optional[datetime]) -> datetime:
+    return _as_utc(created_at).replace(minute=0, second=0, microsecond=0)
+
+
+def _event_cell(row: Dict, level: int) -> Optional[int]:
+    geo_cell = row.get("geo_cell")
+    if geo_cell is not None:
+        return parent_cell(geo_cell, level)
+    return cell_id(row.get("latitude"), row.get("longitude"), level)
+
+
+async def _upsert_add(
+    session: AsyncSession,
+    table,
+    rows: List[Dict],
+    key_columns: Sequence[str],
+    add_columns: Sequence[str],
+) -> None:
+    """INSERT rows, adding add_columns onto rows that already exist (keys must be unique within rows)."""
+    if not rows:
+        return
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Rollup upserts are not implemented for {dialect}")
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: table.c[column] + statement.excluded[column] for column in add_columns},
+    )
+    await session.execute(statement, rows)
+
+
+class RollupRepository:
+    """Repository for pre-aggregated detection counts."""
+
+    @staticmethod
+    async def record_events(session: AsyncSession, rows: Iterable[Dict]) -> None:
+        """Add detection events to the rollups, without committing.
+
+        Each row has crop, disease, confidence, latitude, longitude and
+        optionally created_at (default now) and geo_cell. Rows without a
+        location are skipped.
+        Call inside the transaction that inserts the events.
+        """
+        daily: Counter = Counter()
+        hourly: Dict[Tuple, List] = {}
+        for row in rows:
+            map_cell = _event_cell(row, MAP_ROLLUP_LEVEL)
+            if map_cell is None:
+                continue
+            created_at = row.get("created_at")
+            daily[(map_cell, row["disease"], _utc_day(created_at))] += 1
+
+            key = (_event_cell(row, ANALYTICS_ROLLUP_LEVEL), row["disease"], row["crop"], _utc_hour(created_at))
+            totals = hourly.setdefault(key, [0, 0.0])
+            totals[0] += 1
+            totals[1] += float(row.get("confidence") or 0.0)
+
+        # Sorted keys: concurrent writers lock rollup rows in the same order
+        await _upsert_add(
+            session,
+            DetectionDailyRollup.__table__,
+            [{"cell": cell, "disease": disease, "day": day, "count": count}
+             for (cell, disease, day), count in sorted(daily.items())],
+            key_columns=("cell", "disease", "day"),
+            add_columns=("count",),
+        )
+        await _upsert_add(
+            session,
+            DetectionHourlyRollup.__table__,
+            [{"cell": cell, "disease": disease, "crop": crop, "hour": hour,
+              "count": count, "confidence_sum": confidence_sum}
+             for (cell, disease, crop, hour), (count, confidence_sum) in sorted(hourly.items())],
+            key_columns=("cell", "disease", "crop", "hour"),
+            add_columns=("count", "confidence_sum"),
+        )
+
+    @staticmethod
+    async def get_map_cells(
+        session: AsyncSession,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        level: int,
+        since: date,
+        disease: Optional[str] = None,
+    ) -> List[Tuple[int, str, int]]:
+        """(cell at `level`, disease, count) for the box since the given UTC day.
+
+        Cells at the edge of the box may extend past it.
+        """
+        level = max(1, min(level, MAP_ROLLUP_LEVEL))
+        rollup = DetectionDailyRollup
+        group_cell = rollup.cell.op(">>")(2 * (MAP_ROLLUP_LEVEL - level))
+        ranges = box_ranges(south, west, north, east, level=MAP_ROLLUP_LEVEL, max_cells=64)
+        query = (
+            select(group_cell.label("cell"), rollup.disease, func.sum(rollup.count).label("count"))
+            .where(or_(*[rollup.cell.between(lo, hi) for lo, hi in ranges]))
+            .where(rollup.day >= since)
+            .where(rollup.disease != HEALTHY)
+            .group_by(group_cell, rollup.disease)
+            .order_by(group_cell, rollup.disease)
+        )
+        if disease is not None:
+            query = query.where(rollup.disease == disease)
+        result = await session.execute(query)
+        return [(int(cell), name, int(count)) for cell, name, count in result.all()]
+
+    @staticmethod
+    async def get_area_summary(
+        session: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        since: datetime,
+    ) -> List[Dict]:
+        """Per-disease totals around a point since the given time, most reported first.
+
+        Each dict has disease, count, avg_confidence, crops (crop -> count)
+        and last_seen (start of the latest hour with a report).
+        """
+        rollup = DetectionHourlyRollup
+        result = await session.execute(
+            select(
+                rollup.disease,
+                rollup.crop,
+                func.sum(rollup.count),
+                func.sum(rollup.confidence_sum),
+                func.max(rollup.hour),
+            )
+            .where(rollup.cell.in_(cells_within(latitude, longitude, radius_km, ANALYTICS_ROLLUP_LEVEL)))
+            .where(rollup.hour >= _utc_hour(since))
+            .where(rollup.disease != HEALTHY)
+            .group_by(rollup.disease, rollup.crop)
+        )
+
+        diseases: Dict[str, Dict] = {}
+        for disease, crop, count, confidence_sum, last_hour in result.all():
+            summary = diseases.setdefault(
+                disease, {"disease": disease, "count": 0, "confidence_sum": 0.0, "crops": {}, "last_seen": None}
+            )
+            summary["count"] += int(count)
+            summary["confidence_sum"] += float(confidence_sum)
+            summary["crops"][crop] = int(count)
+            last_hour = _as_utc(last_hour)
+            if summary["last_seen"] is None or last_hour > summary["last_seen"]:
+                summary["last_seen"] = last_hour
+
+        summaries = []
+        for summary in diseases.values():
+            summary["avg_confidence"] = summary.pop("confidence_sum") / summary["count"]
+            summaries.append(summary)
+        summaries.sort(key=lambda item: (-item["count"], item["disease"]))
+        return summaries
+
+    @staticmethod
+    async def get_trend(
+        session: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        since: datetime,
+        bucket: str = "day",
+        disease: Optional[str] = None,
+    ) -> Dict[str, List[Dict]]:
+        """Counts over time around a point: disease -> [{start, count, avg_confidence}].
+
+        bucket is "hour" or "day" (UTC); buckets without reports are omitted.
+        """
+        rollup = DetectionHourlyRollup
+        query = (
+            select(rollup.hour, rollup.disease, func.sum(rollup.count), func.sum(rollup.confidence_sum))
+            .where(rollup.cell.in_(cells_within(latitude, longitude, radius_km, ANALYTICS_ROLLUP_LEVEL)))
+            .where(rollup.hour >= _utc_hour(since))
+            .where(rollup.disease != HEALTHY)
+            .group_by(rollup.hour, rollup.disease)
+        )
+        if disease is not None:
+            query = query.where(rollup.disease == disease)
+        result = await session.execute(query)
+
+        buckets: Dict[Tuple[str, datetime], List] = {}
+        for hour, name, count, confidence_sum in result.all():
+            start = _as_utc(hour)
+            if bucket == "day":
+                start = start.replace(hour=0)
+            totals = buckets.setdefault((name, start), [0, 0.0])
+            totals[0] += int(count)
+            totals[1] += float(confidence_sum)
+
+        series: Dict[str, List[Dict]] = {}
+        for (name, start), (count, confidence_sum) in sorted(buckets.items()):
+            series.setdefault(name, []).append(
+                {"start": start, "count": count, "avg_confidence": confidence_sum / count}
+            )
+        return series
+
+    @staticmethod
+    async def rebuild(session: AsyncSession, batch_size: int = 10000) -> int:
+        """Recompute both rollups from detection_events and commit. Returns events counted.
+
+        On Postgres detection_events is locked against writes until the
+        commit, so no event is counted twice or missed; run it off-peak.
+        """
+        if session.bind.dialect.name == "postgresql":
+            await session.execute(text("LOCK TABLE detection_events IN SHARE MODE"))
+        await session.execute(delete(DetectionDailyRollup))
+        await session.execute(delete(DetectionHourlyRollup))
+
+        counted = 0
+        stream = await session.stream(
+            select(
+                DetectionEvent.geo_cell,
+                DetectionEvent.latitude,
+                DetectionEvent.longitude,
+                DetectionEvent.crop,
+                DetectionEvent.disease,
+                DetectionEvent.confidence,
+                DetectionEvent.created_at,
+            ).execution_options(yield_per=batch_size)
+        )
+        async for partition in stream.mappings().partitions():
+            await RollupRepository.record_events(session, partition)
+            counted += len(partition)
+            logger.info(f"Rolled up {counted} detection events")
+        await session.commit()
+        return counted
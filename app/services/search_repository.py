@@ -1,9 +1,9 @@
 """Repository for disease search history."""
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func
+from sqlalchemy import insert, select, desc, func
 from ..db.models import DiseaseSearch
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -36,6 +36,21 @@ class SearchRepository:
         await session.refresh(search)
         return search
     
+    @staticmethod
+    async def save_searches_bulk(session: AsyncSession, rows: List[Dict], commit: bool = True) -> int:
+        """Insert many search history rows in one statement.
+
+        Each row has crop, disease, confidence, language, device_token,
+        latitude, longitude and created_at. With commit=False the caller
+        owns the transaction.
+        """
+        if not rows:
+            return 0
+        await session.execute(insert(DiseaseSearch), rows)
+        if commit:
+            await session.commit()
+        return len(rows)
+
     @staticmethod
     async def get_search_history(
         session: AsyncSession,
@@ -0,0 +1,154 @@
+"""
+Tiled inference for high-resolution whole-plant and field photos.
+
+The full-resolution image is split into overlapping square tiles. Tiles that
+are near-uniform background (low grayscale standard deviation, measured on
+a small thumbnail) are skipped; if more tiles remain than the cap, the most
+textured ones are kept. The surviving tiles are resized to the model input
+size and run as one batch, and their predictions are merged into one
+diagnosis:
+
+- a disease counts if any tile reports it with confidence at or above the
+  threshold (small lesions only show up in a few tiles);
+- among such diseases the one with the largest summed confidence wins,
+  otherwise the label with the largest summed confidence overall;
+- the reported confidence is that label's best tile confidence.
+
+Exports:
+- TilePlan, Tile
+- plan_tiles(): decode, split, filter and encode tiles (CPU-bound, run in a thread)
+- merge_tile_predictions()
+"""
+from __future__ import annotations
+
+import io
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+Prediction = Tuple[str, float, str]
+
+# Thumbnail pixels per tile edge used for the variance check
+_THUMB_PER_TILE = 16
+
+
+@dataclass
+class Tile:
+    x: int
+    y: int
+    width: int
+    height: int
+    std: float
+    prediction: Optional[Prediction] = None
+
+
+@dataclass
+class TilePlan:
+    width: int
+    height: int
+    tile_size: int
+    tiles: List[Tile] = field(default_factory=list)  # tiles to run
+    skipped: int = 0  # near-uniform background
+    dropped: int = 0  # over the tile cap
+    images: List[bytes] = field(default_factory=list)  # encoded tiles, same order as tiles
+
+    @property
+    def total(self) -> int:
+        return len(self.tiles) + self.skipped + self.dropped
+
+
+def _positions(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    positions = list(range(0, length - tile + 1, stride))
+    if positions[-1] != length - tile:
+        positions.append(length - tile)  # cover the far edge
+    return positions
+
+
+def plan_tiles(
+    image_bytes,
+    tile_size: Optional[int] = None,
+    overlap: Optional[float] = None,
+    max_tiles: Optional[int] = None,
+    min_std: Optional[float] = None,
+    input_size: Optional[int] = None,
+) -> Optional[TilePlan]:
+    """
+    Split an encoded image into tiles ready for predict_batch.
+
+    Returns None when the image is too small to be worth tiling.
+    """
+    import numpy as np
+    from PIL import Image
+
+    from ..utils.image_processing import open_image
+
+    tile_size = tile_size or settings.tiled_tile_size
+    overlap = settings.tiled_overlap if overlap is None else overlap
+    max_tiles = max_tiles or settings.tiled_max_tiles
+    min_std = settings.tiled_min_std if min_std is None else min_std
+    input_size = input_size or settings.tiled_input_size
+
+    image = open_image(image_bytes)
+    width, height = image.size
+    if max(width, height) < tile_size * 1.5:
+        return None
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.load()
+
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    xs = _positions(width, tile_size, stride)
+    ys = _positions(height, tile_size, stride)
+
+    # Grayscale thumbnail for the background check
+    factor = max(1, tile_size // _THUMB_PER_TILE)
+    thumb = np.asarray(image.convert("L").reduce(factor), dtype=np.float32)
+
+    plan = TilePlan(width=width, height=height, tile_size=tile_size)
+    candidates = []
+    for y in ys:
+        for x in xs:
+            w, h = min(tile_size, width - x), min(tile_size, height - y)
+            region = thumb[y // factor:(y + h) // factor or 1, x // factor:(x + w) // factor or 1]
+            std = float(region.std()) if region.size else 0.0
+            if std < min_std:
+                plan.skipped += 1
+                continue
+            candidates.append(Tile(x=x, y=y, width=w, height=h, std=round(std, 2)))
+
+    if len(candidates) > max_tiles:
+        candidates.sort(key=lambda tile: tile.std, reverse=True)
+        plan.dropped = len(candidates) - max_tiles
+        candidates = sorted(candidates[:max_tiles], key=lambda tile: (tile.y, tile.x))
+    plan.tiles = candidates
+
+    for tile in plan.tiles:
+        crop = image.crop((tile.x, tile.y, tile.x + tile.width, tile.y + tile.height))
+        crop = crop.resize((input_size, input_size), Image.Resampling.BILINEAR)
+        buffer = io.BytesIO()
+        crop.save(buffer, "JPEG", quality=95)
+        plan.images.append(buffer.getvalue())
+    return plan
+
+
+def merge_tile_predictions(predictions: List[Prediction], threshold: Optional[float] = None) -> Prediction:
+    """Merge per-tile (disease, confidence, crop) into one prediction."""
+    threshold = settings.confidence_threshold if threshold is None else threshold
+
+    totals: Dict[Tuple[str, str], float] = {}
+    best: Dict[Tuple[str, str], float] = {}
+    for disease, confidence, crop in predictions:
+        key = (disease, crop)
+        totals[key] = totals.get(key, 0.0) + confidence
+        best[key] = max(best.get(key, 0.0), confidence)
+
+    diseased = [key for key in totals if key[0] != "Healthy" and best[key] >= threshold]
+    candidates = diseased or list(totals)
+    disease, crop = max(candidates, key=lambda key: (totals[key], best[key]))
+    return disease, best[(disease, crop)], crop
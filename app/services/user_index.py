@@ -0,0 +1,206 @@
+"""
+In-memory spatial index of users that can receive nearby alerts.
+
+Every worker keeps the notifiable users (notifications enabled, device token
+set) in a uniform grid: a dict from geo_grid cell id at INDEX_LEVEL (about
+10 km cells) to the users inside it. A radius lookup visits the few cells
+covering the circle and checks exact haversine distance, so alert fan-out
+no longer queries or scans the users table per detection.
+
+The index is loaded at startup, updated by UserRepository.upsert_user in
+this worker, and rebuilt from the database every
+USER_INDEX_RECONCILE_SECONDS to pick up registrations made through other
+workers. Until the first load succeeds, callers fall back to the database.
+
+Exports:
+- UserIndex, IndexedUser
+- get_user_index(): process-wide index
+- reconcile_user_index(session), watch_user_index(interval, session_factory)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import User
+from ..utils.geo import haversine_km, within_radius
+from ..utils.geo_grid import cell_id, covering_ranges
+
+logger = logging.getLogger(__name__)
+
+# 360 / 2^12 degrees = 0.088 deg, about 10 km: a 10 km lookup visits ~12 cells
+INDEX_LEVEL = 12
+# Below this many candidates NumPy's per-call overhead outweighs the vectorized math
+VECTORIZE_MIN_CANDIDATES = 64
+
+
+@dataclass(frozen=True)
+class IndexedUser:
+    """What alert fan-out needs from a User row."""
+
+    id: int
+    latitude: float
+    longitude: float
+    device_token: str
+    language: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user) -> "IndexedUser":
+        return cls(user.id, user.latitude, user.longitude, user.device_token, user.language)
+
+
+def _notifiable(user) -> bool:
+    return bool(user.notifications_enabled and user.device_token
+                and user.latitude is not None and user.longitude is not None)
+
+
+class UserIndex:
+    """Uniform grid of notifiable users for radius lookups."""
+
+    def __init__(self, level: int = INDEX_LEVEL):
+        self.level = level
+        self._cells: Dict[int, Dict[int, IndexedUser]] = {}
+        self._cell_of: Dict[int, int] = {}  # user id -> cell
+        self._lock = threading.Lock()
+        # Updates made while a reload query runs, re-applied on top of its snapshot
+        self._pending: Optional[Dict[int, Optional[IndexedUser]]] = None
+        self.ready = False
+        self._loaded_at: Optional[float] = None
+        self._lookups = 0
+        self._updates = 0
+
+    # -----------------------------------
+    # Public API
+    # -----------------------------------
+    def nearby(self, latitude: float, longitude: float, radius_km: float) -> List[IndexedUser]:
+        """Notifiable users within radius_km of the point."""
+        candidates: List[IndexedUser] = []
+        with self._lock:
+            self._lookups += 1
+            for lo, hi in covering_ranges(latitude, longitude, radius_km, level=self.level, max_cells=64):
+                for cell in range(lo, hi + 1):
+                    members = self._cells.get(cell)
+                    if members:
+                        candidates.extend(members.values())
+        if len(candidates) < VECTORIZE_MIN_CANDIDATES:
+            return [
+                user for user in candidates
+                if haversine_km(latitude, longitude, user.latitude, user.longitude) <= radius_km
+            ]
+        inside, _ = within_radius(
+            latitude,
+            longitude,
+            [user.latitude for user in candidates],
+            [user.longitude for user in candidates],
+            radius_km,
+        )
+        return [candidates[i] for i in inside.tolist()]
+
+    def update(self, user) -> None:
+        """Add, move or drop one user after its row changed."""
+        entry = IndexedUser.from_user(user) if _notifiable(user) else None
+        with self._lock:
+            self._updates += 1
+            if self._pending is not None:
+                self._pending[user.id] = entry
+            self._place(user.id, entry, self._cells, self._cell_of)
+
+    def begin_load(self) -> None:
+        """Call before querying the users for load(), so concurrent updates are kept."""
+        with self._lock:
+            self._pending = {}
+
+    def load(self, users: Iterable) -> int:
+        """Replace the whole index with these users. Returns how many are indexed."""
+        cells: Dict[int, Dict[int, IndexedUser]] = {}
+        cell_of: Dict[int, int] = {}
+        for user in users:
+            if _notifiable(user):
+                self._place(user.id, IndexedUser.from_user(user), cells, cell_of)
+        with self._lock:
+            for user_id, entry in (self._pending or {}).items():
+                self._place(user_id, entry, cells, cell_of)
+            self._pending = None
+            self._cells, self._cell_of = cells, cell_of
+            self.ready = True
+            self._loaded_at = time.time()
+        return len(cell_of)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "users": len(self._cell_of),
+                "cells": len(self._cells),
+                "lookups": self._lookups,
+                "updates": self._updates,
+                "loaded_at": self._loaded_at,
+            }
+
+    # -----------------------------------
+    # Internals
+    # -----------------------------------
+    def _place(
+        self,
+        user_id: int,
+        entry: Optional[IndexedUser],
+        cells: Dict[int, Dict[int, IndexedUser]],
+        cell_of: Dict[int, int],
+    ) -> None:
+        """Move the user to the entry's cell, or drop it when entry is None."""
+        old_cell = cell_of.pop(user_id, None)
+        if old_cell is not None:
+            members = cells.get(old_cell)
+            if members is not None:
+                members.pop(user_id, None)
+                if not members:
+                    del cells[old_cell]
+        if entry is not None:
+            cell = cell_id(entry.latitude, entry.longitude, self.level)
+            cells.setdefault(cell, {})[entry.id] = entry
+            cell_of[entry.id] = cell
+
+
+# -----------------------------------
+# Singleton and reconciliation
+# -----------------------------------
+_user_index: Optional[UserIndex] = None
+
+
+def get_user_index() -> UserIndex:
+    global _user_index
+    if _user_index is None:
+        _user_index = UserIndex()
+    return _user_index
+
+
+async def reconcile_user_index(session: AsyncSession) -> int:
+    """Rebuild the index from the users table. Returns how many users are indexed."""
+    index = get_user_index()
+    index.begin_load()
+    result = await session.execute(
+        select(User.id, User.latitude, User.longitude, User.device_token,
+               User.notifications_enabled, User.language)
+        .where(User.notifications_enabled.is_(True))
+        .where(User.device_token.is_not(None))
+    )
+    return index.load(result.all())
+
+
+async def watch_user_index(interval_seconds: float, session_factory) -> None:
+    """Rebuild the index now and then every interval_seconds."""
+    while True:
+        try:
+            async with session_factory() as session:
+                count = await reconcile_user_index(session)
+            logger.debug(f"User index reconciled: {count} users")
+        except Exception as e:
+            logger.warning(f"User index reconciliation failed: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -1,13 +1,16 @@
 """Repository for user device registrations and alert tracking."""
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set
 import math
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import settings
 from ..db.models import User, SentAlert
+from ..utils.geo import within_radius
+from .user_index import get_user_index
 
 
 class UserRepository:
@@ -46,6 +49,8 @@ class UserRepository:
 
         await session.commit()
         await session.refresh(user)
+        if settings.user_index_enabled:
+            get_user_index().update(user)
         return user
 
     @staticmethod
@@ -55,7 +60,11 @@ class UserRepository:
         longitude: float,
         radius_km: float = 10.0,
     ) -> List[User]:
-        """Get users within a geographic radius."""
+        """Get notifiable users within a geographic radius (bounding box query).
+
+        Alert fan-out uses the in-memory user index instead; see
+        get_notifiable_users_near().
+        """
         lat_delta = radius_km / 111.0
         lng_delta = radius_km / (111.0 * math.cos(math.radians(latitude)))
 
@@ -70,6 +79,30 @@ class UserRepository:
         result = await session.execute(query)
         return result.scalars().all()
 
+    @staticmethod
+    async def get_notifiable_users_near(
+        session: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 10.0,
+    ) -> List:
+        """Users to alert within radius_km: from the user index once loaded, else the database.
+
+        Both paths apply the exact haversine distance, so they return the same users.
+        """
+        index = get_user_index()
+        if settings.user_index_enabled and index.ready:
+            return index.nearby(latitude, longitude, radius_km)
+        users = [
+            user for user in await UserRepository.get_users_within_radius(session, latitude, longitude, radius_km)
+            if user.device_token
+        ]
+        # The bounding box also covers its corners, outside the radius
+        inside, _ = within_radius(
+            latitude, longitude, [user.latitude for user in users], [user.longitude for user in users], radius_km
+        )
+        return [users[i] for i in inside.tolist()]
+
     @staticmethod
     async def was_alert_sent(
         session: AsyncSession,
@@ -87,6 +120,26 @@ class UserRepository:
         result = await session.execute(query)
         return result.scalars().first() is not None
 
+    @staticmethod
+    async def get_recently_alerted(
+        session: AsyncSession,
+        user_ids: Iterable[int],
+        disease: str,
+        within_hours: int = 6,
+    ) -> Set[int]:
+        """Of user_ids, those already alerted for this disease recently (one query)."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+        since = datetime.utcnow() - timedelta(hours=within_hours)
+        query = select(SentAlert.user_id).where(
+            (SentAlert.user_id.in_(user_ids))
+            & (SentAlert.disease == disease)
+            & (SentAlert.sent_at >= since)
+        )
+        result = await session.execute(query)
+        return set(result.scalars().all())
+
     @staticmethod
     async def log_alert(
         session: AsyncSession,
@@ -99,3 +152,13 @@ class UserRepository:
         await session.commit()
         await session.refresh(alert)
         return alert
+
+    @staticmethod
+    async def log_alerts(
+        session: AsyncSession,
+        user_ids: Iterable[int],
+        disease: str,
+    ) -> None:
+        """Log sent alerts for many users in one commit."""
+        session.add_all([SentAlert(user_id=user_id, disease=disease) for user_id in user_ids])
+        await session.commit()
@@ -2,11 +2,25 @@
 Geographic utilities for ArogyaKrishi.
 
 This module implements the Haversine formula to compute great-circle
-distance between two latitude/longitude points on Earth.
+distance between two latitude/longitude points on Earth, for one pair of
+points and vectorized with NumPy over coordinate arrays.
+
+Exports:
+- EARTH_RADIUS_KM
+- haversine_km(): one pair of points
+- coordinate_arrays(): contiguous float64 latitude/longitude arrays
+- haversine_km_many(): one point to many points
+- haversine_km_matrix(): many points to many points
+- within_radius(): indices and distances of points inside a radius
 """
 from __future__ import annotations
 
 import math
+from typing import Iterable, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
 
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -43,9 +57,66 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
     # Earth radius in kilometers (specified constraint)
-    R = 6371.0
+    R = EARTH_RADIUS_KM
 
     # Distance = R * c
     distance_km = R * c
 
     return distance_km
+
+
+def coordinate_arrays(latitudes: Iterable[float], longitudes: Iterable[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return latitudes and longitudes as contiguous float64 arrays (no copy if they already are)."""
+    return (
+        np.ascontiguousarray(latitudes, dtype=np.float64),
+        np.ascontiguousarray(longitudes, dtype=np.float64),
+    )
+
+
+def haversine_km_many(lat: float, lon: float, latitudes, longitudes) -> np.ndarray:
+    """Distances in km from one point to every point of the coordinate arrays.
+
+    Args:
+        lat: Latitude of the origin in decimal degrees.
+        lon: Longitude of the origin in decimal degrees.
+        latitudes: Array-like of latitudes in decimal degrees.
+        longitudes: Array-like of longitudes, same length as latitudes.
+
+    Returns:
+        float64 array of distances, one per point.
+    """
+    lats, lons = coordinate_arrays(latitudes, longitudes)
+    lat_rad = math.radians(lat)
+    lats_rad = np.radians(lats)
+    a = np.sin((lats_rad - lat_rad) / 2) ** 2
+    a += math.cos(lat_rad) * np.cos(lats_rad) * np.sin(np.radians(lons - lon) / 2) ** 2
+    # asin(sqrt(a)) == atan2(sqrt(a), sqrt(1 - a)) for a in [0, 1]; clip rounding overshoot
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_km_matrix(latitudes1, longitudes1, latitudes2, longitudes2) -> np.ndarray:
+    """Distances in km between every pair of points, shape (len(points1), len(points2))."""
+    lats1, lons1 = coordinate_arrays(latitudes1, longitudes1)
+    lats2, lons2 = coordinate_arrays(latitudes2, longitudes2)
+    lats1_rad = np.radians(lats1)[:, None]
+    lats2_rad = np.radians(lats2)[None, :]
+    a = np.sin((lats2_rad - lats1_rad) / 2) ** 2
+    a += np.cos(lats1_rad) * np.cos(lats2_rad) * np.sin(np.radians(lons2[None, :] - lons1[:, None]) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(lat: float, lon: float, latitudes, longitudes, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Points within radius_km of (lat, lon).
+
+    A latitude band check discards far points before the trigonometry.
+
+    Returns:
+        (indices, distances_km) of the points inside the radius, in input order.
+    """
+    lats, lons = coordinate_arrays(latitudes, longitudes)
+    # Latitude difference alone is a lower bound on the distance
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    candidates = np.flatnonzero(np.abs(lats - lat) <= lat_delta)
+    distances = haversine_km_many(lat, lon, lats[candidates], lons[candidates])
+    inside = distances <= radius_km
+    return candidates[inside], distances[inside]
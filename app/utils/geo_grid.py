@@ -0,0 +1,188 @@
+"""
+Hierarchical lat/lng grid cells for indexed spatial queries.
+
+At level L the world is split into square cells of 360 / 2^L degrees;
+a cell id interleaves the bits of its row (from -90 latitude) and column
+(from -180 longitude), Z-order like a geohash. Consequences:
+- the parent of a cell k levels up is `cell >> 2k`, so coarser rollups
+  are a shift of the stored id;
+- every coarser cell is one contiguous id range at the stored level, so a
+  radius query becomes a few `geo_cell BETWEEN lo AND hi` index ranges.
+
+Detection events store their cell at CELL_LEVEL (about 2.4 km).
+
+Exports:
+- CELL_LEVEL
+- cell_id(), parent_cell(), cell_size_deg(), cell_center()
+- covering_ranges(): stored-id ranges covering a circle
+- box_ranges(): stored-id ranges covering a lat/lng box
+- cells_within(): cells whose centers lie within a circle
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Tuple
+
+from .geo import haversine_km_many
+
+# Stored precision: 360 / 2^14 degrees = 0.022 deg, about 2.4 km of latitude
+CELL_LEVEL = 14
+EARTH_RADIUS_KM = 6371.0  # same as the haversine distance
+KM_PER_DEGREE_LAT = EARTH_RADIUS_KM * math.pi / 180.0
+
+
+def cell_size_deg(level: int) -> float:
+    return 360.0 / (1 << level)
+
+
+def _interleave(row: int, col: int) -> int:
+    cell = 0
+    bit = 0
+    while row or col:
+        cell |= (col & 1) << (2 * bit)
+        cell |= (row & 1) << (2 * bit + 1)
+        row >>= 1
+        col >>= 1
+        bit += 1
+    return cell
+
+
+def _deinterleave(cell: int) -> Tuple[int, int]:
+    row = col = 0
+    bit = 0
+    while cell:
+        col |= (cell & 1) << bit
+        row |= ((cell >> 1) & 1) << bit
+        cell >>= 2
+        bit += 1
+    return row, col
+
+
+def _row_col(latitude: float, longitude: float, level: int) -> Tuple[int, int]:
+    size = cell_size_deg(level)
+    rows = 1 << (level - 1)  # latitude spans half the degrees of longitude
+    cols = 1 << level
+    row = min(rows - 1, max(0, int((latitude + 90.0) // size)))
+    col = int(((longitude + 180.0) % 360.0) // size) % cols
+    return row, col
+
+
+def cell_id(latitude: Optional[float], longitude: Optional[float], level: int = CELL_LEVEL) -> Optional[int]:
+    """Cell containing the point at this level (None without coordinates)."""
+    if latitude is None or longitude is None:
+        return None
+    return _interleave(*_row_col(latitude, longitude, level))
+
+
+def parent_cell(cell: int, level: int, from_level: int = CELL_LEVEL) -> int:
+    """Cell at a coarser level containing `cell`."""
+    return cell >> (2 * (from_level - level))
+
+
+def cell_center(cell: int, level: int = CELL_LEVEL) -> Tuple[float, float]:
+    """(latitude, longitude) of the cell's center."""
+    row, col = _deinterleave(cell)
+    size = cell_size_deg(level)
+    return -90.0 + (row + 0.5) * size, -180.0 + (col + 0.5) * size
+
+
+def covering_ranges(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    level: int = CELL_LEVEL,
+    max_cells: int = 16,
+) -> List[Tuple[int, int]]:
+    """
+    Inclusive (lo, hi) ranges of level-`level` ids whose cells cover the circle.
+
+    The circle's bounding box is covered with cells of the finest level
+    (up to `level`) that needs at most `max_cells` cells; each of them maps
+    to one contiguous id range, and adjacent ranges are merged.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + lat_delta)))
+    lng_delta = min(180.0, radius_km / (KM_PER_DEGREE_LAT * max(cos_lat, 1e-6)))
+    return box_ranges(
+        latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta,
+        level=level, max_cells=max_cells,
+    )
+
+
+def box_ranges(
+    south: float,
+    west: float,
+    north: float,
+    east: float,
+    level: int = CELL_LEVEL,
+    max_cells: int = 16,
+) -> List[Tuple[int, int]]:
+    """
+    Inclusive (lo, hi) ranges of level-`level` ids whose cells cover the box.
+
+    The box is covered with cells of the finest level (up to `level`) that
+    needs at most `max_cells` cells; each of them maps to one contiguous id
+    range, and adjacent ranges are merged. east < west crosses the
+    antimeridian; a span of 360 degrees or more covers every longitude.
+    """
+    south = max(-90.0, south)
+    north = min(90.0 - 1e-9, north)
+    lng_span = (east - west) % 360.0 if east - west < 360.0 else 360.0
+
+    query_level = level
+    while query_level > 1:
+        size = cell_size_deg(query_level)
+        rows = math.floor((north + 90.0) / size) - math.floor((south + 90.0) / size) + 1
+        cols = min(1 << query_level, math.floor(lng_span / size) + 2)
+        if rows * cols <= max_cells:
+            break
+        query_level -= 1
+
+    row_lo, _ = _row_col(south, west, query_level)
+    row_hi, _ = _row_col(north, west, query_level)
+    if lng_span >= 360.0:
+        cols = list(range(1 << query_level))
+    else:
+        _, col_lo = _row_col(south, west, query_level)
+        _, col_hi = _row_col(south, west + lng_span, query_level)
+        span = (col_hi - col_lo) % (1 << query_level)
+        cols = [(col_lo + step) % (1 << query_level) for step in range(span + 1)]
+
+    shift = 2 * (level - query_level)
+    cells = sorted(_interleave(row, col) for row in range(row_lo, row_hi + 1) for col in cols)
+    ranges: List[Tuple[int, int]] = []
+    for cell in cells:
+        lo, hi = cell << shift, ((cell + 1) << shift) - 1
+        if ranges and ranges[-1][1] + 1 == lo:
+            ranges[-1] = (ranges[-1][0], hi)
+        else:
+            ranges.append((lo, hi))
+    return ranges
+
+
+def cells_within(latitude: float, longitude: float, radius_km: float, level: int) -> List[int]:
+    """Level-`level` cells whose centers lie within radius_km of the point.
+
+    The cell containing the point is always included, so small circles
+    still map to one cell.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + lat_delta)))
+    lng_delta = min(180.0, radius_km / (KM_PER_DEGREE_LAT * max(cos_lat, 1e-6)))
+    size = cell_size_deg(level)
+    cols = 1 << level
+    row_lo, col_lo = _row_col(latitude - lat_delta, longitude - lng_delta, level)
+    row_hi, _ = _row_col(latitude + lat_delta, longitude, level)
+    col_span = min(cols - 1, math.ceil(2 * lng_delta / size) + 1)
+
+    rows_cols = [
+        (row, (col_lo + step) % cols)
+        for row in range(row_lo, row_hi + 1)
+        for step in range(col_span + 1)
+    ]
+    centers_lat = [-90.0 + (row + 0.5) * size for row, _ in rows_cols]
+    centers_lng = [-180.0 + (col + 0.5) * size for _, col in rows_cols]
+    inside = haversine_km_many(latitude, longitude, centers_lat, centers_lng) <= radius_km
+    cells = {_interleave(row, col) for (row, col), keep in zip(rows_cols, inside.tolist()) if keep}
+    cells.add(cell_id(latitude, longitude, level))
+    return sorted(cells)
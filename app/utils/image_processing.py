@@ -1,6 +1,52 @@
 from PIL import Image
+import io
+import threading
 import numpy as np
 
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like object (memoryview, mmap) without copying it."""
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+def open_image(data) -> Image.Image:
+    """Open encoded image bytes, memoryview or mmap without an extra copy."""
+    if isinstance(data, bytes):
+        return Image.open(io.BytesIO(data))
+    return Image.open(BufferReader(data))
+
+
 def preprocess_image(image: Image.Image, target_size=(224, 224)) -> np.ndarray:
     """
     Preprocess image for model input.
@@ -9,17 +55,107 @@ def preprocess_image(image: Image.Image, target_size=(224, 224)) -> np.ndarray:
     - Normalize to [0,1]
     - Convert to numpy array with shape (C, H, W)
     """
-    # Convert to RGB if not already
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    
-    # Resize
-    image = image.resize(target_size, Image.Resampling.LANCZOS)
-    
-    # Convert to numpy array and normalize
-    img_array = np.array(image) / 255.0
-    
-    # Transpose to (C, H, W) for PyTorch
-    img_array = img_array.transpose(2, 0, 1)
-    
-    return img_array.astype(np.float32)
\ No newline at end of file
+    # Same values as before up to float32 rounding (the caller's image is not
+    # drafted or modified), without the float64 intermediate copies
+    return get_preprocessor(target_size).process(image, out=np.empty((3, target_size[1], target_size[0]), dtype=np.float32))
+
+
+class ImagePreprocessor:
+    """
+    Reusable preprocessing engine with preallocated buffers.
+
+    - Large JPEGs given as bytes are decoded at reduced scale (draft mode)
+    - The resized RGB image is written straight into a preallocated uint8 buffer
+    - Normalization writes into a reusable float32 (C, H, W) output in place
+
+    Buffers are reused between calls, so one instance must not be shared
+    across threads (use get_preprocessor()). The array returned by process()
+    is overwritten by the next call unless an `out` array is passed.
+    """
+
+    def __init__(self, target_size=(224, 224), mean=(0.0, 0.0, 0.0), std=(1.0, 1.0, 1.0), use_draft=True):
+        self.target_size = tuple(target_size)
+        self.use_draft = use_draft
+        width, height = self.target_size
+
+        # x_norm = x * scale - offset  ==  (x / 255 - mean) / std
+        std = np.asarray(std, dtype=np.float32)
+        self._scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self._offset = (np.asarray(mean, dtype=np.float32) / std).astype(np.float32)
+
+        # RGBX: Pillow stores RGB as 4 bytes per pixel, so the buffer can be shared
+        self._rgbx = np.zeros((height, width, 4), dtype=np.uint8)
+        self._canvas = Image.frombuffer("RGBX", (width, height), self._rgbx, "raw", "RGBX", 0, 1)
+        self._canvas.readonly = 0
+        self._zero_copy = self._check_shared_canvas()
+        self._chw = np.empty((3, height, width), dtype=np.float32)
+
+    def load(self, source, draft_size=None) -> Image.Image:
+        """
+        Open bytes/memoryview, or pass through a PIL image unchanged.
+
+        JPEGs opened here are draft-decoded at reduced scale, no smaller than
+        draft_size (default: the target size). PIL images from the caller are
+        never drafted, as draft() would change the caller's image.
+        """
+        if isinstance(source, Image.Image):
+            return source
+        image = open_image(source)
+        if self.use_draft and image.format == "JPEG":
+            # Decoder picks the largest 1/2, 1/4, 1/8 scale still >= draft size
+            image.draft("RGB", tuple(draft_size or self.target_size))
+        return image
+
+    def to_uint8(self, source) -> np.ndarray:
+        """Decode and resize into the preallocated uint8 buffer; returns an (H, W, 3) view."""
+        image = self.load(source)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if image.size != self.target_size:
+            image = image.resize(self.target_size, Image.Resampling.LANCZOS)
+
+        if self._zero_copy:
+            self._canvas.paste(image)
+        else:
+            np.copyto(self._rgbx[:, :, :3], np.asarray(image))
+        return self._rgbx[:, :, :3]
+
+    def process(self, source, out: np.ndarray = None) -> np.ndarray:
+        """Preprocess one image into a float32 (C, H, W) array (reused unless `out` given)."""
+        out = self._chw if out is None else out
+        rgb = self.to_uint8(source)
+        for channel in range(3):
+            np.multiply(rgb[:, :, channel], self._scale[channel], out=out[channel], dtype=np.float32)
+            if self._offset[channel]:
+                np.subtract(out[channel], self._offset[channel], out=out[channel])
+        return out
+
+    def process_batch(self, sources, out: np.ndarray = None) -> np.ndarray:
+        """Preprocess several images into one float32 (N, C, H, W) array."""
+        width, height = self.target_size
+        if out is None:
+            out = np.empty((len(sources), 3, height, width), dtype=np.float32)
+        for index, source in enumerate(sources):
+            self.process(source, out=out[index])
+        return out
+
+    def _check_shared_canvas(self) -> bool:
+        """Confirm paste() writes into the numpy buffer (Pillow may copy instead)."""
+        probe = Image.new("RGB", (1, 1), (1, 2, 3))
+        self._canvas.paste(probe, (0, 0))
+        shared = tuple(self._rgbx[0, 0, :3]) == (1, 2, 3)
+        self._rgbx[0, 0] = 0
+        return shared
+
+
+_local = threading.local()
+
+def get_preprocessor(target_size=(224, 224), mean=(0.0, 0.0, 0.0), std=(1.0, 1.0, 1.0)) -> ImagePreprocessor:
+    """Per-thread preprocessing engine for the given target size and normalization."""
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+    key = (tuple(target_size), tuple(mean), tuple(std))
+    if key not in engines:
+        engines[key] = ImagePreprocessor(key[0], mean=key[1], std=key[2])
+    return engines[key]
@@ -0,0 +1,41 @@
+"""
+Import-time breakdown for heavy dependencies.
+
+Used at startup to log how much of worker cold start is spent importing
+each ML library, so it can be tracked across deploys. For a full tree use
+`python -X importtime -c "import app.main"`.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+from typing import Dict, Iterable, Optional
+
+
+def time_imports(modules: Iterable[str]) -> Dict[str, Optional[float]]:
+    """Import each module in order and return seconds spent per module.
+
+    Modules already imported report 0.0; missing modules report None.
+    Later modules do not include the cost of dependencies imported earlier.
+    """
+    timings: Dict[str, Optional[float]] = {}
+    for name in modules:
+        if name in sys.modules:
+            timings[name] = 0.0
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            timings[name] = None
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+def format_timings(timings: Dict[str, Optional[float]]) -> str:
+    return ", ".join(
+        f"{name}={'missing' if seconds is None else f'{seconds:.3f}s'}"
+        for name, seconds in timings.items()
+    )
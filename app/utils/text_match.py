@@ -0,0 +1,89 @@
+"""
+Multi-pattern keyword matching.
+
+KeywordMatcher compiles many keyword variants (product names, synonyms,
+local-language terms) into one Aho-Corasick automaton, so finding which
+keywords occur in a text is a single pass over the text, independent of how
+many variants there are. Matching is case-insensitive substring matching,
+like `variant in text.lower()`.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+class KeywordMatcher:
+    """Aho-Corasick matcher mapping keyword variants to canonical names.
+
+    Args:
+        keywords: canonical name -> variants to look for.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        # Trie: per-node transitions, failure links and canonical names ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        self.patterns = 0
+
+        for name, variants in keywords.items():
+            for variant in variants:
+                variant = variant.lower()
+                if variant:
+                    self._add(variant, name)
+        self._link()
+
+    def find(self, text: Optional[str]) -> Set[str]:
+        """Canonical names whose variants occur in text."""
+        found: Set[str] = set()
+        for names in self._scan(text):
+            found |= names
+        return found
+
+    def contains_any(self, text: Optional[str], allowed: Set[str]) -> bool:
+        """True if text mentions any of the allowed canonical names (stops at the first hit)."""
+        if not allowed:
+            return False
+        return any(not names.isdisjoint(allowed) for names in self._scan(text))
+
+    def _scan(self, text: Optional[str]) -> Iterator[Set[str]]:
+        """Yield the canonical names ending at each position that completes a match."""
+        if not text:
+            return
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield output[state]
+
+    def _add(self, pattern: str, name: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(name)
+        self.patterns += 1
+
+    def _link(self) -> None:
+        # Breadth-first so a node's failure target is always linked before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
@@ -0,0 +1,203 @@
+"""
+Size-capped ingestion for image uploads.
+
+- UploadSizeLimitMiddleware rejects oversized request bodies with 413 before
+  they are parsed: immediately from Content-Length, otherwise as soon as the
+  streamed body crosses the limit.
+- read_image_upload() checks the size of an UploadFile, validates the magic
+  bytes (JPEG/PNG, not the client's content_type) and exposes the image
+  without copying it again: Starlette has already streamed the part into a
+  spooled file, in memory for small images and on disk past its spool size.
+
+The result exposes the image as a memoryview (over the in-memory buffer or
+an mmap of the spooled file), which the decoders accept directly.
+"""
+
+import io
+import mmap
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+ALLOWED_IMAGE_TYPES = {"jpeg": "image/jpeg", "png": "image/png"}
+
+# Named HTTP_413_CONTENT_TOO_LARGE or HTTP_413_REQUEST_ENTITY_TOO_LARGE depending on the Starlette version
+HTTP_413_TOO_LARGE = 413
+
+# Room for multipart boundaries and the other form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def max_upload_bytes() -> int:
+    return settings.max_image_size_mb * 1024 * 1024
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Return "jpeg" or "png" from the leading bytes, or None."""
+    if header.startswith(JPEG_MAGIC):
+        return "jpeg"
+    if header.startswith(PNG_MAGIC):
+        return "png"
+    return None
+
+
+def _too_large_detail() -> str:
+    return f"Image too large. Maximum size: {settings.max_image_size_mb}MB"
+
+
+class ImageUpload:
+    """
+    An ingested image: `data` is a memoryview valid until close().
+
+    It does not depend on the UploadFile staying open, so it may outlive the
+    request (e.g. in a background task).
+    """
+
+    def __init__(self, data: memoryview, kind: str, filename: Optional[str] = None, mapped=None):
+        self.data = data
+        self.kind = kind
+        self.filename = filename
+        self.size = len(data)
+        self._mapped = mapped
+
+    @property
+    def content_type(self) -> str:
+        return ALLOWED_IMAGE_TYPES[self.kind]
+
+    @property
+    def on_disk(self) -> bool:
+        return self._mapped is not None
+
+    def close(self) -> None:
+        self.data.release()
+        if self._mapped is not None:
+            try:
+                self._mapped.close()
+            except BufferError:
+                pass  # a decoder still holds a view; closed when it is collected
+            self._mapped = None
+
+    def __enter__(self) -> "ImageUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _upload_size(upload: UploadFile) -> int:
+    if upload.size is not None:
+        return upload.size
+    position = upload.file.tell()
+    size = upload.file.seek(0, io.SEEK_END)
+    upload.file.seek(position)
+    return size
+
+
+async def read_image_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> ImageUpload:
+    """
+    Validate a JPEG/PNG upload and expose it without another copy.
+
+    Raises HTTPException 413 above the size limit and 400 when the content
+    is not a JPEG or PNG image.
+    """
+    max_bytes = max_upload_bytes() if max_bytes is None else max_bytes
+    size = _upload_size(upload)
+    if size > max_bytes:
+        raise HTTPException(status_code=HTTP_413_TOO_LARGE, detail=_too_large_detail())
+    if size == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty image upload.")
+
+    # SpooledTemporaryFile wraps a BytesIO until it rolls over to a real file
+    raw = getattr(upload.file, "_file", upload.file)
+    mapped = None
+    if isinstance(raw, io.BytesIO):
+        # getvalue() hands out the internal buffer when nothing else holds it,
+        # without exporting it (the form can still close the file)
+        data = memoryview(raw.getvalue())
+    else:
+        try:
+            raw.flush()
+            mapped = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+            data = memoryview(mapped)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            await upload.seek(0)
+            data = memoryview(await upload.read(max_bytes + 1))
+
+    kind = sniff_image_type(bytes(data[:len(PNG_MAGIC)]))
+    if kind is None or len(data) > max_bytes:
+        data.release()
+        if mapped is not None:
+            mapped.close()
+        if kind is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid image format. Please upload JPG or PNG.",
+            )
+        raise HTTPException(status_code=HTTP_413_TOO_LARGE, detail=_too_large_detail())
+    return ImageUpload(data, kind, upload.filename, mapped=mapped)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies larger than the image limit on upload routes.
+
+    Requests with a Content-Length above the limit get 413 without reading
+    the body; chunked bodies are counted as they stream in and the request
+    fails with 413 as soon as the limit is crossed.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefixes: Iterable[str], max_body_bytes: Optional[int] = None):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_body_bytes or (max_upload_bytes() + MULTIPART_OVERHEAD_BYTES)
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(
+                        status_code=HTTP_413_TOO_LARGE, detail=_too_large_detail()
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _matches(self, path: str) -> bool:
+        # "/api/detect-image" covers "/api/detect-image/..." but not "/api/detect-images"
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.path_prefixes)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            {"detail": _too_large_detail()},
+            status_code=HTTP_413_TOO_LARGE,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)